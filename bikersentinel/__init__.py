@@ -7,7 +7,10 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 
-from .const import DOMAIN
+from .const import CONF_GROUP_MEMBERS, DOMAIN
+from .coordinator import BikerSentinelCoordinator, entry_sources, fleet_mode, history_store, profile_from_entry
+from .fleet import fleet_key, fleet_store
+from .group import RideGroupCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,13 +24,70 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         service = BikerSentinelConfigService(hass)
         service.register()
         hass.data["bikersentinel_config_service"] = service
+
+    if CONF_GROUP_MEMBERS in entry.data:
+        # Club ride entry: aggregates the scores of its member entries
+        group = RideGroupCoordinator(hass, entry)
+        entry.runtime_data = {"group": group}
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        group.async_start()
+        entry.async_on_unload(entry.add_update_listener(async_update_options))
+        return True
+    
+    # One coordinator per entry: a single evaluation per update cycle for all entities
+    coordinator = BikerSentinelCoordinator(hass, entry)
+    entry.runtime_data = {"coordinator": coordinator}
+    await coordinator.async_restore()
+    await coordinator.async_bootstrap()
+    await coordinator.async_update_forecasts()
+    coordinator.async_refresh()
     
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    coordinator.async_start()
+    # New ratios are swapped into the running coordinator: no reload, history kept
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options (malus ratios and tuning settings) to the running coordinator."""
+    runtime_data = getattr(entry, "runtime_data", None) or {}
+    if "group" in runtime_data:
+        # Club ride: members or threshold changed; it keeps no history, so a reload is cheap
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    coordinator = runtime_data.get("coordinator")
+    if not coordinator:
+        return
+    settings_changed = coordinator.apply_settings()
+    if coordinator.async_set_profile(profile_from_entry(entry)):
+        _LOGGER.debug("BikerSentinel ratios of entry %s applied to the running engine", entry.entry_id)
+    elif settings_changed:
+        coordinator.async_refresh()
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unloaded and "group" in entry.runtime_data:
+        entry.runtime_data["group"].async_shutdown()
+    elif unloaded:
+        coordinator = entry.runtime_data["coordinator"]
+        coordinator.async_shutdown()
+        await coordinator.async_persist()
+    return unloaded
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the stored history of a removed entry (and of its fleet, if it was the last member)."""
+    await history_store(hass, entry.entry_id).async_remove()
+    if fleet_mode(entry):
+        key = fleet_key(entry_sources(entry))
+        if not any(
+            other.entry_id != entry.entry_id and CONF_GROUP_MEMBERS not in other.data
+            and fleet_mode(other) and fleet_key(entry_sources(other)) == key
+            for other in hass.config_entries.async_entries(DOMAIN)
+        ):
+            await fleet_store(hass, key).async_remove()
 
 
 async def async_get_options_flow(config_entry: ConfigEntry):
@@ -0,0 +1,191 @@
+"""Backtest: how the current profile would have scored a past period.
+
+Past states of the entry sensors are read from the recorder one page
+(BACKTEST_PAGE_HOURS) at a time in the recorder executor, parsed there, and
+streamed through a fresh history and the scoring kernel on a simulated clock.
+The kernel is sampled every ``step`` and only a fixed-size summary is kept,
+so memory does not grow with the length of the period and the event loop
+handles at most one page at a time.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+
+from .const import BACKTEST_PAGE_HOURS, DEFAULT_GROUP_THRESHOLD
+from .engine import MAX_SCORE, RiderProfile, ScoreInputs, ScoreResult, classify_status, evaluate
+from .history import EngineHistory
+from .hub import SensorReading
+from .sun import SunTable
+
+
+class BacktestSummary:
+    """Fixed-size running statistics of the sampled scores (weighted in hours)."""
+
+    def __init__(self, threshold: float = DEFAULT_GROUP_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.samples = 0
+        self.skipped = 0  # ticks without usable temperature/wind
+        self.hours = 0.0
+        self.rideable_hours = 0.0
+        self.histogram = [0.0] * (int(MAX_SCORE) + 1)  # hours per score unit, 10 included in the last bin
+        self.status_hours: Counter[str] = Counter()
+        self.veto_counts: Counter[str] = Counter()
+        self.veto_hours: Counter[str] = Counter()
+        self._score_hours = 0.0
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+
+    def add(self, result: ScoreResult, hours: float) -> None:
+        """Account one sampled result held for ``hours``."""
+        score = result.score
+        self.samples += 1
+        self.hours += hours
+        self._score_hours += score * hours
+        self.histogram[min(int(score), int(MAX_SCORE))] += hours
+        self.status_hours[classify_status(score)] += hours
+        if score > self.threshold:
+            self.rideable_hours += hours
+        if result.veto:
+            self.veto_counts[result.veto] += 1
+            self.veto_hours[result.veto] += hours
+        self.minimum = score if self.minimum is None else min(self.minimum, score)
+        self.maximum = score if self.maximum is None else max(self.maximum, score)
+
+    def as_dict(self) -> dict:
+        """Service response form."""
+        return {
+            "samples": self.samples,
+            "skipped": self.skipped,
+            "hours": round(self.hours, 2),
+            "rideable_hours": round(self.rideable_hours, 2),
+            "threshold": self.threshold,
+            "mean": round(self._score_hours / self.hours, 2) if self.hours else None,
+            "min": self.minimum,
+            "max": self.maximum,
+            "distribution": {f"{low}-{low + 1}": round(hours, 2) for low, hours in enumerate(self.histogram)},
+            "status_hours": {status: round(hours, 2) for status, hours in self.status_hours.items()},
+            "vetoes": dict(self.veto_counts),
+            "veto_hours": {veto: round(hours, 2) for veto, hours in self.veto_hours.items()},
+        }
+
+
+class Backtest:
+    """Replay sensor readings in time order and sample the kernel every ``step``."""
+
+    def __init__(self, profile: RiderProfile, sources: dict[str, str | None], start: datetime,
+                 step: timedelta, threshold: float = DEFAULT_GROUP_THRESHOLD, sun: SunTable | None = None) -> None:
+        self.profile = profile
+        self.sources = {entity_id: kind for kind, entity_id in sources.items() if entity_id}
+        self.step = step
+        self.sun = sun
+        self.history = EngineHistory()
+        self.summary = BacktestSummary(threshold)
+        self._next_tick = start
+        self._temperature: float | None = None
+        self._wind: float | None = None
+        self._rain = 0.0
+        self._weather = "clear"
+        self._humidity: float | None = None
+
+    def feed(self, when: datetime, reading: SensorReading) -> None:
+        """Apply one past reading; ticks before it are sampled with the previous values."""
+        self.advance(when)
+        kind = self.sources.get(reading.entity_id)
+        if kind == "weather":
+            self._weather = reading.state if reading.available else "clear"
+            humidity = reading.attributes.get("humidity")
+            self._humidity = float(humidity) if humidity else None
+        elif reading.value is None:
+            return
+        elif kind == "temperature":
+            self._temperature = reading.value
+            self.history.add_temperature(when, reading.value, self._wind or 0.0)
+        elif kind == "wind":
+            self._wind = reading.value
+        elif kind == "rain":
+            self.history.add_rain(when, reading.value, self._wind or 0.0, cumulative=reading.cumulative)
+            self._rain = self.history.surface.rain
+
+    def advance(self, until: datetime) -> None:
+        """Sample every tick strictly before ``until``."""
+        hours = self.step.total_seconds() / 3600
+        while self._next_tick < until:
+            self._sample(self._next_tick, hours)
+            self._next_tick += self.step
+
+    def _sample(self, when: datetime, hours: float) -> None:
+        if self._temperature is None or self._wind is None:
+            self.summary.skipped += 1
+            return
+        elevation = azimuth = None
+        if self.sun:
+            position = self.sun.position(when)
+            elevation, azimuth = position.elevation, position.azimuth
+        inputs = ScoreInputs(
+            temperature=self._temperature,
+            wind_speed=self._wind,
+            rain=self._rain,
+            weather=self._weather,
+            humidity=self._humidity,
+            sun_elevation=elevation,
+            sun_azimuth=azimuth,
+        )
+        self.record(self.history.summarize(inputs, when), hours)
+
+    def record(self, inputs: ScoreInputs, hours: float) -> None:
+        """Score one sampled snapshot into the summary."""
+        self.summary.add(evaluate(inputs, self.profile), hours)
+
+
+class BacktestInputs(Backtest):
+    """Replay that keeps the sampled snapshots instead of scoring them (input set of a ratio sweep)."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.rows: list[ScoreInputs] = []
+
+    def record(self, inputs: ScoreInputs, hours: float) -> None:
+        self.rows.append(inputs)
+
+
+def fetch_page(hass: HomeAssistant, entity_ids: list[str], start: datetime, end: datetime,
+               first: bool) -> list[tuple[datetime, SensorReading]]:
+    """Read and parse one page of past states, in time order (runs in the recorder executor)."""
+    from homeassistant.components.recorder import history
+
+    states = history.get_significant_states(
+        hass, start, end, entity_ids,
+        include_start_time_state=first, significant_changes_only=False, no_attributes=False,
+    )
+    series = [
+        [(state.last_updated, SensorReading.from_state(entity_id, state)) for state in entity_states]
+        for entity_id, entity_states in states.items()
+    ]
+    return list(heapq.merge(*series, key=lambda row: row[0]))
+
+
+async def async_run_backtest(hass: HomeAssistant, backtest: Backtest, start: datetime, end: datetime) -> dict:
+    """Stream the recorder history of ``backtest.sources`` between ``start`` and ``end`` and summarize."""
+    from homeassistant.components.recorder import get_instance
+
+    recorder = get_instance(hass)
+    entity_ids = list(backtest.sources)
+    page = timedelta(hours=BACKTEST_PAGE_HOURS)
+    page_start = start
+    while page_start < end:
+        page_end = min(page_start + page, end)
+        rows = await recorder.async_add_executor_job(
+            fetch_page, hass, entity_ids, page_start, page_end, page_start == start
+        )
+        for when, reading in rows:
+            backtest.feed(max(when, start), reading)
+        del rows
+        page_start = page_end
+        await asyncio.sleep(0)  # Let the loop run between pages
+    backtest.advance(end)
+    return backtest.summary.as_dict()
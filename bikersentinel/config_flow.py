@@ -31,11 +31,31 @@ from .const import (
     CONF_SENSOR_WIND,
     CONF_SENSOR_RAIN,
     CONF_WEATHER_ENTITY,
+    CONF_FLEET_MODE,
+    CONF_UPDATE_QUIET_PERIOD,
+    CONF_UPDATE_MAX_DELAY,
+    CONF_SCORE_EPSILON,
+    CONF_SCORE_MIN_INTERVAL,
+    CONF_STATUS_HYSTERESIS,
+    CONF_STATUS_MIN_DWELL,
+    CONF_RIDE_DURATION,
+    DEFAULT_UPDATE_QUIET_PERIOD,
+    DEFAULT_UPDATE_MAX_DELAY,
+    DEFAULT_SCORE_EPSILON,
+    DEFAULT_SCORE_MIN_INTERVAL,
+    DEFAULT_STATUS_HYSTERESIS,
+    DEFAULT_STATUS_MIN_DWELL,
+    DEFAULT_RIDE_DURATION,
+    CONF_GROUP_NAME,
+    CONF_GROUP_MEMBERS,
+    CONF_GROUP_THRESHOLD,
+    DEFAULT_GROUP_THRESHOLD,
     CONF_TRIP_ENABLED,
     CONF_TRIP_HOME_WEATHER,
     CONF_TRIP_OFFICE_WEATHER,
     CONF_TRIP_DEPART_TIME,
     CONF_TRIP_RETURN_TIME,
+    CONF_TRIP_WAYPOINTS,
     CONF_RAIN_RATIO,
     CONF_FOG_RATIO,
     CONF_CLOUDY_RATIO,
@@ -55,16 +75,34 @@ from .const import (
     DEFAULT_NIGHT_RATIO,
     DEFAULT_ROAD_STATE_RATIO,
 )
+from .engine import parse_waypoints
 
 _LOGGER = logging.getLogger(__name__)
 
+
 class BikerSentinelConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for BikerSentinel."""
 
     VERSION = 1
 
+    def _rider_entries(self) -> dict[str, str]:
+        """Existing rider entries (entry_id -> title), club rides excluded."""
+        return {
+            entry.entry_id: entry.title
+            for entry in self._async_current_entries()
+            if CONF_GROUP_MEMBERS not in entry.data
+        }
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Add a rider, or a club ride once riders exist."""
+        if self._rider_entries():
+            return self.async_show_menu(step_id="user", menu_options=["rider", "group"])
+        return await self.async_step_rider()
+
+    async def async_step_rider(
+        self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial configuration (Sensors + Rider Profile)."""
         if user_input is not None:
@@ -116,27 +154,71 @@ class BikerSentinelConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Optional(CONF_NIGHT_RATIO, default=DEFAULT_NIGHT_RATIO): vol.All(vol.Coerce(float), vol.Range(min=0.0, max=5.0)),
                 vol.Optional(CONF_ROAD_STATE_RATIO, default=DEFAULT_ROAD_STATE_RATIO): vol.All(vol.Coerce(float), vol.Range(min=0.0, max=5.0)),
                 
+                # --- OPTIONAL: FLEET MODE (shared sensors, many profiles) ---
+                vol.Optional(CONF_FLEET_MODE, default=False): bool,
+
                 # --- OPTIONAL: TRIP FORECASTING ---
                 vol.Required(CONF_TRIP_ENABLED, default=False): bool,
             }
         )
 
         return self.async_show_form(
-            step_id="user",
+            step_id="rider",
             data_schema=data_schema,
         )
 
+    async def async_step_group(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Configure a club ride over existing rider entries."""
+        errors: dict[str, str] = {}
+        riders = self._rider_entries()
+        if user_input is not None:
+            members = [entry_id for entry_id in user_input.get(CONF_GROUP_MEMBERS, []) if entry_id in riders]
+            if not members:
+                errors[CONF_GROUP_MEMBERS] = "no_members"
+            else:
+                return self.async_create_entry(
+                    title=f"BikerSentinel Club Ride ({user_input[CONF_GROUP_NAME]})",
+                    data={**user_input, CONF_GROUP_MEMBERS: members},
+                )
+
+        group_schema = vol.Schema(
+            {
+                vol.Required(CONF_GROUP_NAME): str,
+                vol.Required(CONF_GROUP_MEMBERS): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[{"value": entry_id, "label": title} for entry_id, title in riders.items()],
+                        multiple=True,
+                    )
+                ),
+                vol.Optional(CONF_GROUP_THRESHOLD, default=DEFAULT_GROUP_THRESHOLD): vol.All(vol.Coerce(float), vol.Range(min=0.0, max=10.0)),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="group",
+            data_schema=group_schema,
+            errors=errors,
+        )
+
     async def async_step_trips(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Configure trip forecasting (Outbound & Return journeys)."""
+        errors: dict[str, str] = {}
         if user_input is not None:
-            # Merge trip config with main data
-            config_data = {**self._data, **user_input}
-            return self.async_create_entry(
-                title=f"BikerSentinel ({self._data[CONF_BIKE_TYPE]})", 
-                data=config_data
-            )
+            try:
+                user_input[CONF_TRIP_WAYPOINTS] = parse_waypoints(user_input.get(CONF_TRIP_WAYPOINTS, ""))
+            except ValueError:
+                errors[CONF_TRIP_WAYPOINTS] = "invalid_waypoints"
+            else:
+                # Merge trip config with main data
+                config_data = {**self._data, **user_input}
+                return self.async_create_entry(
+                    title=f"BikerSentinel ({self._data[CONF_BIKE_TYPE]})",
+                    data=config_data
+                )
 
         # Trip configuration schema
         trips_schema = vol.Schema(
@@ -152,12 +234,16 @@ class BikerSentinelConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     selector.EntitySelectorConfig(domain="weather")
                 ),
                 vol.Required(CONF_TRIP_RETURN_TIME): str,  # Format: "HH:MM"
+
+                # --- WAYPOINTS (in outbound order) ---
+                vol.Optional(CONF_TRIP_WAYPOINTS, default=""): str,  # Format: "weather.x:25, weather.y:40"
             }
         )
 
         return self.async_show_form(
             step_id="trips",
             data_schema=trips_schema,
+            errors=errors,
         )
 
 
@@ -168,36 +254,47 @@ class BikerSentinelOptionsFlowHandler(config_entries.OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Manage the options for the custom component."""
+        if getattr(self, "config_entry", None) and CONF_GROUP_MEMBERS in self.config_entry.data:
+            # Club rides have no rider profile: only their members and threshold are options
+            return await self.async_step_group(user_input)
+        errors: dict[str, str] = {}
         if user_input is not None:
-            # Update the config entry with new ratio values
-            return self.async_create_entry(title="", data=user_input)
-
-        # Get current values from config entry data
-        current_rain_ratio = DEFAULT_RAIN_RATIO
-        current_fog_ratio = DEFAULT_FOG_RATIO
-        current_cloudy_ratio = DEFAULT_CLOUDY_RATIO
-        current_cold_ratio = DEFAULT_COLD_RATIO
-        current_hot_ratio = DEFAULT_HOT_RATIO
-        current_wind_ratio = DEFAULT_WIND_RATIO
-        current_humidity_ratio = DEFAULT_HUMIDITY_RATIO
-        current_night_ratio = DEFAULT_NIGHT_RATIO
-        current_road_state_ratio = DEFAULT_ROAD_STATE_RATIO
-
-        # Try to get current values from config entry if available
-        try:
-            if hasattr(self, 'config_entry') and self.config_entry:
-                current_rain_ratio = self.config_entry.data.get(CONF_RAIN_RATIO, DEFAULT_RAIN_RATIO)
-                current_fog_ratio = self.config_entry.data.get(CONF_FOG_RATIO, DEFAULT_FOG_RATIO)
-                current_cloudy_ratio = self.config_entry.data.get(CONF_CLOUDY_RATIO, DEFAULT_CLOUDY_RATIO)
-                current_cold_ratio = self.config_entry.data.get(CONF_COLD_RATIO, DEFAULT_COLD_RATIO)
-                current_hot_ratio = self.config_entry.data.get(CONF_HOT_RATIO, DEFAULT_HOT_RATIO)
-                current_wind_ratio = self.config_entry.data.get(CONF_WIND_RATIO, DEFAULT_WIND_RATIO)
-                current_humidity_ratio = self.config_entry.data.get(CONF_HUMIDITY_RATIO, DEFAULT_HUMIDITY_RATIO)
-                current_night_ratio = self.config_entry.data.get(CONF_NIGHT_RATIO, DEFAULT_NIGHT_RATIO)
-                current_road_state_ratio = self.config_entry.data.get(CONF_ROAD_STATE_RATIO, DEFAULT_ROAD_STATE_RATIO)
-        except Exception:
-            # If config_entry is not available, use defaults
-            pass
+            if user_input.get(CONF_UPDATE_MAX_DELAY, DEFAULT_UPDATE_MAX_DELAY) < user_input.get(
+                CONF_UPDATE_QUIET_PERIOD, DEFAULT_UPDATE_QUIET_PERIOD
+            ):
+                errors[CONF_UPDATE_MAX_DELAY] = "max_delay_below_quiet"
+            else:
+                # Keep options this form does not show (e.g. set by bikersentinel.set_malus_ratios)
+                saved = self.config_entry.options if getattr(self, "config_entry", None) else {}
+                return self.async_create_entry(title="", data={**saved, **user_input})
+
+        def current(key: str, default: float) -> float:
+            """Saved option, else the value from the initial setup, else the default."""
+            try:
+                if hasattr(self, 'config_entry') and self.config_entry:
+                    return self.config_entry.options.get(key, self.config_entry.data.get(key, default))
+            except Exception:
+                # If config_entry is not available, use defaults
+                pass
+            return default
+
+        current_rain_ratio = current(CONF_RAIN_RATIO, DEFAULT_RAIN_RATIO)
+        current_fog_ratio = current(CONF_FOG_RATIO, DEFAULT_FOG_RATIO)
+        current_cloudy_ratio = current(CONF_CLOUDY_RATIO, DEFAULT_CLOUDY_RATIO)
+        current_cold_ratio = current(CONF_COLD_RATIO, DEFAULT_COLD_RATIO)
+        current_hot_ratio = current(CONF_HOT_RATIO, DEFAULT_HOT_RATIO)
+        current_wind_ratio = current(CONF_WIND_RATIO, DEFAULT_WIND_RATIO)
+        current_humidity_ratio = current(CONF_HUMIDITY_RATIO, DEFAULT_HUMIDITY_RATIO)
+        current_night_ratio = current(CONF_NIGHT_RATIO, DEFAULT_NIGHT_RATIO)
+        current_road_state_ratio = current(CONF_ROAD_STATE_RATIO, DEFAULT_ROAD_STATE_RATIO)
+
+        def box(minimum: float, maximum: float, step: float, unit: str) -> selector.NumberSelector:
+            return selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=minimum, max=maximum, step=step, unit_of_measurement=unit,
+                    mode=selector.NumberSelectorMode.BOX,
+                )
+            )
 
         # Create the options schema with current values as defaults
         options_schema = vol.Schema(
@@ -274,10 +371,88 @@ class BikerSentinelOptionsFlowHandler(config_entries.OptionsFlow):
                         min=0.0, max=5.0, step=0.1, mode=selector.NumberSelectorMode.SLIDER
                     )
                 ),
+
+                # --- TUNING: update scheduling, score writes, status stability, departure ---
+                vol.Optional(
+                    CONF_UPDATE_QUIET_PERIOD,
+                    default=current(CONF_UPDATE_QUIET_PERIOD, DEFAULT_UPDATE_QUIET_PERIOD),
+                ): box(0.0, 60.0, 0.1, "s"),
+                vol.Optional(
+                    CONF_UPDATE_MAX_DELAY,
+                    default=current(CONF_UPDATE_MAX_DELAY, DEFAULT_UPDATE_MAX_DELAY),
+                ): box(0.0, 300.0, 0.1, "s"),
+                vol.Optional(
+                    CONF_SCORE_EPSILON,
+                    default=current(CONF_SCORE_EPSILON, DEFAULT_SCORE_EPSILON),
+                ): box(0.0, 5.0, 0.1, "pts"),
+                vol.Optional(
+                    CONF_SCORE_MIN_INTERVAL,
+                    default=current(CONF_SCORE_MIN_INTERVAL, DEFAULT_SCORE_MIN_INTERVAL),
+                ): box(0.0, 3600.0, 1.0, "s"),
+                vol.Optional(
+                    CONF_STATUS_HYSTERESIS,
+                    default=current(CONF_STATUS_HYSTERESIS, DEFAULT_STATUS_HYSTERESIS),
+                ): box(0.0, 2.0, 0.1, "pts"),
+                vol.Optional(
+                    CONF_STATUS_MIN_DWELL,
+                    default=current(CONF_STATUS_MIN_DWELL, DEFAULT_STATUS_MIN_DWELL),
+                ): box(0.0, 3600.0, 1.0, "s"),
+                vol.Optional(
+                    CONF_RIDE_DURATION,
+                    default=current(CONF_RIDE_DURATION, DEFAULT_RIDE_DURATION),
+                ): box(5, 600, 1, "min"),
             }
         )
 
         return self.async_show_form(
             step_id="init",
             data_schema=options_schema,
-        )
\ No newline at end of file
+            errors=errors,
+        )
+
+    async def async_step_group(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the members and threshold of a club ride."""
+        errors: dict[str, str] = {}
+        riders = {
+            entry.entry_id: entry.title
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if CONF_GROUP_MEMBERS not in entry.data
+        }
+        if user_input is not None:
+            members = [entry_id for entry_id in user_input.get(CONF_GROUP_MEMBERS, []) if entry_id in riders]
+            if not members:
+                errors[CONF_GROUP_MEMBERS] = "no_members"
+            else:
+                return self.async_create_entry(
+                    title="", data={**self.config_entry.options, **user_input, CONF_GROUP_MEMBERS: members}
+                )
+
+        def current(key: str, default: Any) -> Any:
+            """Saved option, else the value from the initial setup, else the default."""
+            return self.config_entry.options.get(key, self.config_entry.data.get(key, default))
+
+        group_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_GROUP_MEMBERS,
+                    default=[entry_id for entry_id in current(CONF_GROUP_MEMBERS, []) if entry_id in riders],
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[{"value": entry_id, "label": title} for entry_id, title in riders.items()],
+                        multiple=True,
+                    )
+                ),
+                vol.Optional(
+                    CONF_GROUP_THRESHOLD,
+                    default=current(CONF_GROUP_THRESHOLD, DEFAULT_GROUP_THRESHOLD),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.0, max=10.0)),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="group",
+            data_schema=group_schema,
+            errors=errors,
+        )
@@ -20,6 +20,7 @@ CONF_TRIP_HOME_WEATHER = "trip_home_weather"  # Weather at home (start location)
 CONF_TRIP_OFFICE_WEATHER = "trip_office_weather"  # Weather at office (end location)
 CONF_TRIP_DEPART_TIME = "trip_depart_time"
 CONF_TRIP_RETURN_TIME = "trip_return_time"
+CONF_TRIP_WAYPOINTS = "trip_waypoints"  # Ordered [{"entity_id": ..., "minutes": ...}] between home and office
 
 # Malus Ratio Configuration (User-adjustable multipliers)
 CONF_RAIN_RATIO = "rain_malus_ratio"
@@ -32,6 +33,28 @@ CONF_HUMIDITY_RATIO = "humidity_malus_ratio"
 CONF_NIGHT_RATIO = "night_malus_ratio"
 CONF_ROAD_STATE_RATIO = "road_state_malus_ratio"
 
+# Update scheduling (seconds) - bursts of sensor changes are coalesced into one evaluation
+CONF_UPDATE_QUIET_PERIOD = "update_quiet_period"
+CONF_UPDATE_MAX_DELAY = "update_max_delay"
+# Score writes: skip changes smaller than the epsilon, write at most once per min interval (seconds)
+CONF_SCORE_EPSILON = "score_epsilon"
+CONF_SCORE_MIN_INTERVAL = "score_min_interval"
+
+# Status classification: hysteresis band (score points) and minimum dwell time (seconds)
+CONF_STATUS_HYSTERESIS = "status_hysteresis"
+CONF_STATUS_MIN_DWELL = "status_min_dwell"
+
+# Best departure window: ride duration (minutes) integrated over the forecast
+CONF_RIDE_DURATION = "ride_duration"
+
+# Fleet mode: entries reading the same sensors are scored together in one pass
+CONF_FLEET_MODE = "fleet_mode"
+
+# Club ride group: a separate entry aggregating the scores of chosen rider entries
+CONF_GROUP_NAME = "group_name"
+CONF_GROUP_MEMBERS = "group_members"
+CONF_GROUP_THRESHOLD = "group_threshold"
+
 # Note: Night Mode, Precipitation History, Temperature/Humidity Trends, and Solar Blindness
 # are now always active and internal - no user toggles needed
 
@@ -43,6 +66,38 @@ DEFAULT_EQUIPMENT = "Standard"
 DEFAULT_SENSITIVITY = 3  # 1=Low (Viking), 3=Normal, 5=High (Cold)
 DEFAULT_RIDING_CONTEXT = "road"
 
+# Update scheduling defaults: wait for 0.5 s of quiet, never more than 2 s after the first change
+DEFAULT_UPDATE_QUIET_PERIOD = 0.5
+DEFAULT_UPDATE_MAX_DELAY = 2.0
+DEFAULT_SCORE_EPSILON = 0.0
+DEFAULT_SCORE_MIN_INTERVAL = 0.0
+
+# A score must cross a boundary by the hysteresis band, and a status must be held
+# for the dwell time, before the status changes (entering "dangerous" is always immediate)
+DEFAULT_STATUS_HYSTERESIS = 0.3
+DEFAULT_STATUS_MIN_DWELL = 60.0
+
+# Best departure window: a 45 min ride, searched over the next 12 h
+DEFAULT_RIDE_DURATION = 45
+DEPARTURE_HORIZON = 12  # hours
+
+# Club ride: a member can go when its score is above "degraded"
+DEFAULT_GROUP_THRESHOLD = 4.0
+
+# bikersentinel.evaluate: maximum input rows per call
+EVALUATE_MAX_ROWS = 10000
+
+# bikersentinel.backtest: recorder page size, longest period and default sampling step
+BACKTEST_PAGE_HOURS = 24
+BACKTEST_MAX_DAYS = 366
+DEFAULT_BACKTEST_STEP = 60  # minutes
+
+# bikersentinel.sweep: most ratio vectors per call, scores computed per block
+SWEEP_MAX_VECTORS = 20000  # a 3-value grid over the 9 ratios is 19683 vectors
+SWEEP_MAX_GRID_VALUES = 100  # values per ratio in a grid
+SWEEP_CHUNK_CELLS = 2_000_000
+SWEEP_MAX_ROWS = 50000  # about six months of 5-minute samples
+
 # Malus Ratio Defaults (1.0 = standard sensitivity)
 DEFAULT_RAIN_RATIO = 1.0
 DEFAULT_FOG_RATIO = 1.0
@@ -94,19 +149,69 @@ NIGHT_MODE_MALUS = {
     "night": -5.0            # Sun below -6° - Poor visibility
 }
 
-# Precipitation History window (hours) for correlation
+# Precipitation History window (hours) read from the recorder to warm up the road model
 PRECIP_HISTORY_WINDOW = 24  # Track 24-hour history
 
-# Road State Conditions (Precipitation-based)
-# Thresholds for inferring road surface conditions from rainfall
+# Trip route: time weight of the home and office ends (waypoints carry their own)
+TRIP_ENDPOINT_MINUTES = 10  # Time weight of the home and office ends of a route
+ANALYSIS_CACHE_SIZE = 256  # Weather analyses memoized across trips and entries
+
+# Trip weather rules, shared by analyze_weather_conditions and the departure planner:
+# malus per condition, then (threshold, malus) per forecast attribute; each malus is scaled by its ratio
+TRIP_CONDITION_MALUS = {"rainy": -1.5, "fog": -1.0, "cloudy": -0.3}
+TRIP_COLD_RULE = (5, -1.0)  # °C, below
+TRIP_HOT_RULE = (30, -0.3)  # °C, above
+TRIP_WIND_RULE = (40, -0.7)  # km/h, above
+TRIP_HUMIDITY_RULE = (85, -0.5)  # %, above
+
+# Trip forecasts (weather.get_forecasts, shared per weather entity)
+FORECAST_TTL = 1800  # Seconds before a cached hourly forecast is fetched again
+FORECAST_FETCH_TIMEOUT = 10  # Seconds per weather.get_forecasts call
+
+# Sun table (computed locally from the configured latitude/longitude)
+SUN_TABLE_STEP = 5  # Minutes between samples of the daily sun curve
+SUN_TABLE_DAYS = 3  # Days kept (yesterday/today/tomorrow lookups)
+SUN_UPDATE_INTERVAL = 300  # Seconds between night/glare re-evaluations
+
+# Source units converted to the integration units (°C, km/h, mm): unit -> (scale, offset)
+UNIT_CONVERSIONS = {
+    "°F": (5 / 9, -160 / 9),
+    "K": (1.0, -273.15),
+    "m/s": (3.6, 0.0),
+    "mph": (1.609344, 0.0),
+    "kn": (1.852, 0.0),
+    "ft/s": (1.09728, 0.0),
+    "in": (25.4, 0.0),
+    "in/h": (25.4, 0.0),
+    "cm": (10.0, 0.0),
+}
+# Rain sensors reporting accumulated precipitation (a depth), not a rate (mm/h, in/h)
+PRECIP_TOTAL_UNITS = ("mm", "in", "cm")
+PRECIP_TOTAL_STATE_CLASSES = ("total", "total_increasing")
+
+# History persistence (homeassistant.helpers.storage)
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60  # Seconds; batches many samples into one write
+
+# Road State Conditions (surface water model)
+# Thresholds on the water left on the road (rain minus evaporation)
 ROAD_STATE_THRESHOLDS = {
-    "dry": (0, 0.0),           # 0 - 0 mm
-    "damp": (0.1, 5.0),        # 0.1 - 5 mm
+    "dry": (0, 0.05),          # < 0.05 mm
+    "damp": (0.05, 5.0),       # 0.05 - 5 mm
     "wet": (5.0, 10.0),        # 5 - 10 mm
     "sludge": (10.0, 99.0),    # 10+ mm (with normal temp)
     "icy": (10.0, 99.0),       # 10+ mm (with temp < 0°C)
 }
 
+# Road drying rate (mm/h) = base + temp * °C above 0 + wind * km/h + sun * sin(elevation)
+ROAD_DRYING_RATE = {
+    "base": 0.05,
+    "temp": 0.015,
+    "wind": 0.01,
+    "sun": 0.4,
+}
+ROAD_WATER_MAX = 20.0  # mm; beyond this rain runs off
+
 # Road State Malus Values (applied to score)
 ROAD_STATE_MALUS = {
     "dry": 0.0,
@@ -118,7 +223,7 @@ ROAD_STATE_MALUS = {
 }
 
 # Temperature Trend Detection
-TEMP_HISTORY_WINDOW = 6  # Track last 6 readings for trend analysis
+TEMP_HISTORY_WINDOW = 6  # Trend window in 10-minute slots (1 hour)
 TEMP_DROP_THRESHOLD = 5.0  # Sudden drop > 5°C = risk of icing
 TEMP_TREND_MALUS = {
     "dropping": -2.0,  # Temperature falling rapidly
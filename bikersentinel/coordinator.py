@@ -0,0 +1,740 @@
+"""Per-entry update coordinator for BikerSentinel.
+
+One coordinator per config entry evaluates the scoring kernel once per update
+cycle and publishes an immutable ``EntrySnapshot``. Every entity of the entry
+reads from that snapshot and never recomputes.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_change, async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    CONF_HEIGHT,
+    CONF_WEIGHT,
+    CONF_BIKE_TYPE,
+    CONF_EQUIPMENT,
+    CONF_SENSITIVITY,
+    CONF_RIDING_CONTEXT,
+    CONF_SENSOR_TEMP,
+    CONF_SENSOR_WIND,
+    CONF_SENSOR_RAIN,
+    CONF_WEATHER_ENTITY,
+    CONF_TRIP_ENABLED,
+    CONF_TRIP_HOME_WEATHER,
+    CONF_TRIP_OFFICE_WEATHER,
+    CONF_TRIP_DEPART_TIME,
+    CONF_TRIP_RETURN_TIME,
+    CONF_TRIP_WAYPOINTS,
+    CONF_RAIN_RATIO,
+    CONF_FOG_RATIO,
+    CONF_CLOUDY_RATIO,
+    CONF_COLD_RATIO,
+    CONF_HOT_RATIO,
+    CONF_WIND_RATIO,
+    CONF_HUMIDITY_RATIO,
+    CONF_NIGHT_RATIO,
+    CONF_ROAD_STATE_RATIO,
+    CONF_UPDATE_QUIET_PERIOD,
+    CONF_UPDATE_MAX_DELAY,
+    CONF_SCORE_EPSILON,
+    CONF_SCORE_MIN_INTERVAL,
+    CONF_STATUS_HYSTERESIS,
+    CONF_STATUS_MIN_DWELL,
+    CONF_RIDE_DURATION,
+    DEFAULT_HEIGHT_CM,
+    DEFAULT_WEIGHT_KG,
+    DEFAULT_BIKE_TYPE,
+    DEFAULT_EQUIPMENT,
+    DEFAULT_SENSITIVITY,
+    DEFAULT_RIDING_CONTEXT,
+    DEFAULT_RAIN_RATIO,
+    DEFAULT_FOG_RATIO,
+    DEFAULT_CLOUDY_RATIO,
+    DEFAULT_COLD_RATIO,
+    DEFAULT_HOT_RATIO,
+    DEFAULT_WIND_RATIO,
+    DEFAULT_HUMIDITY_RATIO,
+    DEFAULT_NIGHT_RATIO,
+    DEFAULT_ROAD_STATE_RATIO,
+    DEFAULT_UPDATE_QUIET_PERIOD,
+    DEFAULT_UPDATE_MAX_DELAY,
+    DEFAULT_SCORE_EPSILON,
+    DEFAULT_SCORE_MIN_INTERVAL,
+    DEFAULT_STATUS_HYSTERESIS,
+    DEFAULT_STATUS_MIN_DWELL,
+    DEFAULT_RIDE_DURATION,
+    CONF_FLEET_MODE,
+    FORECAST_TTL,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    SUN_UPDATE_INTERVAL,
+    TRIP_ENDPOINT_MINUTES,
+)
+from .engine import (
+    AnalysisCache,
+    RiderProfile,
+    ScoreInputs,
+    RouteLeg,
+    ScoreResult,
+    StatusClassifier,
+    TripResult,
+    WeatherSnapshot,
+    evaluate,
+    evaluate_trip,
+)
+from .fleet import get_fleet, release_fleet
+from .forecast import get_forecast_cache
+from .history import EngineHistory
+from .hub import get_sensor_hub
+from .planner import DepartureOptimizer, DeparturePlan
+from .sun import get_sun_table
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Ratio option key -> RiderProfile field
+RATIO_FIELDS = {
+    CONF_RAIN_RATIO: ("rain_ratio", DEFAULT_RAIN_RATIO),
+    CONF_FOG_RATIO: ("fog_ratio", DEFAULT_FOG_RATIO),
+    CONF_CLOUDY_RATIO: ("cloudy_ratio", DEFAULT_CLOUDY_RATIO),
+    CONF_COLD_RATIO: ("cold_ratio", DEFAULT_COLD_RATIO),
+    CONF_HOT_RATIO: ("hot_ratio", DEFAULT_HOT_RATIO),
+    CONF_WIND_RATIO: ("wind_ratio", DEFAULT_WIND_RATIO),
+    CONF_HUMIDITY_RATIO: ("humidity_ratio", DEFAULT_HUMIDITY_RATIO),
+    CONF_NIGHT_RATIO: ("night_ratio", DEFAULT_NIGHT_RATIO),
+    CONF_ROAD_STATE_RATIO: ("road_state_ratio", DEFAULT_ROAD_STATE_RATIO),
+}
+
+
+def get_option(entry: ConfigEntry, key: str, default: Any) -> Any:
+    """Get a setting from options first, then data, then default."""
+    # Check options first (user-configurable)
+    if hasattr(entry, 'options') and entry.options and key in entry.options:
+        return entry.options[key]
+    # Then check data (from initial config)
+    if key in entry.data:
+        return entry.data[key]
+    # Finally use default
+    return default
+
+
+def profile_from_entry(entry: ConfigEntry) -> RiderProfile:
+    """Build the rider profile of a config entry (with fallbacks to defaults)."""
+    return RiderProfile.build(
+        entry.data.get(CONF_HEIGHT) or DEFAULT_HEIGHT_CM,
+        entry.data.get(CONF_WEIGHT) or DEFAULT_WEIGHT_KG,
+        entry.data.get(CONF_BIKE_TYPE, DEFAULT_BIKE_TYPE),
+        entry.data.get(CONF_EQUIPMENT, DEFAULT_EQUIPMENT),
+        entry.data.get(CONF_SENSITIVITY, DEFAULT_SENSITIVITY),
+        entry.data.get(CONF_RIDING_CONTEXT, DEFAULT_RIDING_CONTEXT),
+        **{field: get_option(entry, key, default) for key, (field, default) in RATIO_FIELDS.items()},
+    )
+
+
+def profile_from_settings(settings: Mapping[str, Any]) -> RiderProfile:
+    """Build a rider profile from inline settings (entry data keys, ratios by profile field name)."""
+    return RiderProfile.build(
+        settings.get(CONF_HEIGHT) or DEFAULT_HEIGHT_CM,
+        settings.get(CONF_WEIGHT) or DEFAULT_WEIGHT_KG,
+        settings.get(CONF_BIKE_TYPE, DEFAULT_BIKE_TYPE),
+        settings.get(CONF_EQUIPMENT, DEFAULT_EQUIPMENT),
+        settings.get(CONF_SENSITIVITY, DEFAULT_SENSITIVITY),
+        settings.get(CONF_RIDING_CONTEXT, DEFAULT_RIDING_CONTEXT),
+        **{field: settings.get(field, default) for field, default in RATIO_FIELDS.values()},
+    )
+
+
+def _next_occurrence(time_str: str, now: datetime | None = None) -> datetime:
+    """Next local datetime at HH:MM (today, or tomorrow once passed)."""
+    now = now or datetime.now().astimezone()
+    trip_time = datetime.strptime(time_str, "%H:%M").time()
+    when = now.replace(hour=trip_time.hour, minute=trip_time.minute, second=0, microsecond=0)
+    return when if when >= now else when + timedelta(days=1)
+
+
+class CoalescingScheduler:
+    """Coalesce bursts of update requests into a single call.
+
+    The action runs once the requests have been quiet for ``quiet_period``
+    seconds, and never later than ``max_delay`` seconds after the first
+    request of the burst.
+    """
+
+    def __init__(self, hass: HomeAssistant, quiet_period: float, max_delay: float,
+                 action: Callable[[], None]) -> None:
+        self.hass = hass
+        self.configure(quiet_period, max_delay)
+        self._action = action
+        self._handle = None
+        self._burst_start: float | None = None
+        self.requested = 0
+        self.coalesced = 0
+        self.executed = 0
+
+    def configure(self, quiet_period: float, max_delay: float) -> None:
+        """Set the delays; a pending call keeps its deadline, the next request uses the new ones."""
+        self.quiet_period = quiet_period
+        self.max_delay = max(max_delay, quiet_period)
+
+    @property
+    def pending(self) -> bool:
+        """Return True while a coalesced call is scheduled."""
+        return self._handle is not None
+
+    @callback
+    def async_request(self) -> None:
+        """Request a call; requests within the same burst share one call."""
+        loop = self.hass.loop
+        now = loop.time()
+        self.requested += 1
+        if self._handle is not None:
+            self.coalesced += 1
+            self._handle.cancel()
+        else:
+            self._burst_start = now
+        deadline = min(now + self.quiet_period, self._burst_start + self.max_delay)
+        self._handle = loop.call_at(deadline, self._fire)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop the pending call, if any."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    @callback
+    def _fire(self) -> None:
+        self._handle = None
+        self.executed += 1
+        self._action()
+
+
+@dataclass(frozen=True, slots=True)
+class EntrySnapshot:
+    """Everything the entities of one entry display, computed in one cycle."""
+
+    score: ScoreResult | None = None
+    trip_go: TripResult | None = None
+    trip_return: TripResult | None = None
+    status: str = "analyzing"
+    trip_go_status: str = "analyzing"
+    trip_return_status: str = "analyzing"
+    departure: DeparturePlan | None = None
+
+
+def get_analysis_cache(hass: HomeAssistant) -> AnalysisCache:
+    """Return the weather analysis cache shared by all entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "analysis" not in domain_data:
+        domain_data["analysis"] = AnalysisCache()
+    return domain_data["analysis"]
+
+
+def get_coordinators(hass: HomeAssistant) -> dict[str, BikerSentinelCoordinator]:
+    """Return the running rider coordinators by entry id (followed by club ride groups)."""
+    return hass.data.setdefault(DOMAIN, {}).setdefault("coordinators", {})
+
+
+def history_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Storage file holding the history buffers of one entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.history")
+
+
+def fleet_mode(entry: ConfigEntry) -> bool:
+    """Whether the entry joins the fleet of entries reading the same sensors."""
+    return bool(entry.options.get(CONF_FLEET_MODE, entry.data.get(CONF_FLEET_MODE, False)))
+
+
+def entry_sources(entry: ConfigEntry) -> tuple[str | None, ...]:
+    """Input entities of a rider entry: temperature, wind, rain and weather (the fleet key)."""
+    return tuple(
+        entry.data.get(key) for key in (CONF_SENSOR_TEMP, CONF_SENSOR_WIND, CONF_SENSOR_RAIN, CONF_WEATHER_ENTITY)
+    )
+
+
+class BikerSentinelCoordinator:
+    """Evaluate one config entry per update cycle and fan the result out."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self.entry = entry
+        self.profile = profile_from_entry(entry)
+        self.history = EngineHistory()
+        self._store = history_store(hass, entry.entry_id)
+        self.history_ready = False
+        self.data = EntrySnapshot()
+        self._listeners: list[Callable[[], None]] = []
+        self._unsub_state: Callable[[], None] | None = None
+        self._unsub_forecast: Callable[[], None] | None = None
+        self._unsub_sun: Callable[[], None] | None = None
+        self._unsub_fleet: Callable[[], None] | None = None
+        self._unsub_dwell: Callable[[], None] | None = None
+        self._forecasts = get_forecast_cache(hass)
+        self._analysis = get_analysis_cache(hass)
+        self._sun = get_sun_table(hass)
+        self._hub = get_sensor_hub(hass)
+        self._inputs: ScoreInputs | None = None
+
+        # Entity IDs for sensors
+        self._ent_temp = entry.data.get(CONF_SENSOR_TEMP)
+        self._ent_wind = entry.data.get(CONF_SENSOR_WIND)
+        self._ent_rain = entry.data.get(CONF_SENSOR_RAIN)
+        self._ent_weather = entry.data.get(CONF_WEATHER_ENTITY)
+        # Fleet mode: the shared sensors, their history and the scoring pass belong to the fleet
+        self._fleet = None
+        if fleet_mode(entry):
+            self._fleet = get_fleet(hass, entry_sources(entry))
+            self._fleet.profiles.set(entry.entry_id, self.profile)
+            self.history = self._fleet.history
+            self._store = self._fleet.store
+        self.trip_enabled = entry.data.get(CONF_TRIP_ENABLED, False)
+        # Ordered route points between home and office: (weather entity, minutes spent near it)
+        self._waypoints = [
+            (waypoint["entity_id"], float(waypoint.get("minutes", TRIP_ENDPOINT_MINUTES)))
+            for waypoint in entry.data.get(CONF_TRIP_WAYPOINTS) or []
+            if waypoint.get("entity_id")
+        ] if self.trip_enabled else []
+        self._ent_trip_weather = [
+            entity_id for entity_id in (
+                entry.data.get(CONF_TRIP_HOME_WEATHER),
+                *(entity_id for entity_id, _ in self._waypoints),
+                entry.data.get(CONF_TRIP_OFFICE_WEATHER),
+            )
+            if entity_id and self.trip_enabled
+        ]
+        # Best departure window: the home end of the commute, else the main weather entity
+        self._ent_departure_weather = (self._ent_trip_weather or [self._ent_weather])[0]
+        self._ent_forecasts = list(dict.fromkeys(
+            entity_id for entity_id in (*self._ent_trip_weather, self._ent_departure_weather) if entity_id
+        ))
+        self._optimizer: DepartureOptimizer | None = None
+
+        # Bursts of input changes (station publishing temp/wind/rain together) -> one evaluation
+        self._scheduler = CoalescingScheduler(
+            hass, DEFAULT_UPDATE_QUIET_PERIOD, DEFAULT_UPDATE_MAX_DELAY, self.async_refresh
+        )
+        self.writes = 0
+        self.writes_skipped = 0
+        # One stable classifier per status entity (instant, go, return)
+        self._classifiers = {
+            key: StatusClassifier() for key in ("status", "trip_go_status", "trip_return_status")
+        }
+        self._settings: tuple | None = None
+        self.apply_settings()
+
+    def apply_settings(self) -> bool:
+        """Read the tuning options of the entry into the running parts; return whether they changed.
+
+        Scheduler counters and classifier states are kept, so this runs at
+        setup and again whenever the options are saved.
+        """
+        entry = self.entry
+        settings = (
+            int(get_option(entry, CONF_RIDE_DURATION, DEFAULT_RIDE_DURATION)),
+            float(get_option(entry, CONF_UPDATE_QUIET_PERIOD, DEFAULT_UPDATE_QUIET_PERIOD)),
+            float(get_option(entry, CONF_UPDATE_MAX_DELAY, DEFAULT_UPDATE_MAX_DELAY)),
+            float(get_option(entry, CONF_SCORE_EPSILON, DEFAULT_SCORE_EPSILON)),
+            float(get_option(entry, CONF_SCORE_MIN_INTERVAL, DEFAULT_SCORE_MIN_INTERVAL)),
+            float(get_option(entry, CONF_STATUS_HYSTERESIS, DEFAULT_STATUS_HYSTERESIS)),
+            float(get_option(entry, CONF_STATUS_MIN_DWELL, DEFAULT_STATUS_MIN_DWELL)),
+        )
+        if settings == self._settings:
+            return False
+        self._settings = settings
+        # The optimizer is rebuilt on the next cycle when the ride duration changed
+        self.ride_minutes, quiet_period, max_delay, epsilon, min_interval, hysteresis, min_dwell = settings
+        self._scheduler.configure(quiet_period, max_delay)
+        # Significance filter for the numeric score (see BikerSentinelEntity)
+        self.score_epsilon = epsilon
+        self.score_min_interval = min_interval
+        for classifier in self._classifiers.values():
+            classifier.hysteresis = hysteresis
+            classifier.min_dwell = min_dwell
+        return True
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Update counters: input changes, coalesced changes, runs, state writes, shared analysis cache hits/misses."""
+        return {
+            "requested": self._scheduler.requested,
+            "coalesced": self._scheduler.coalesced,
+            "executed": self._scheduler.executed,
+            "writes": self.writes,
+            "writes_skipped": self.writes_skipped,
+            "analysis_hits": self._analysis.hits,
+            "analysis_misses": self._analysis.misses,
+        }
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Register an entity callback; returns a function removing it."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @property
+    def departure_enabled(self) -> bool:
+        """Whether a weather entity is available for the best departure window."""
+        return bool(self._ent_departure_weather)
+
+    @property
+    def tracked_entities(self) -> list[str]:
+        """Entities whose state changes can change the snapshot (the fleet tracks the shared sensors)."""
+        entity_ids = [] if self._fleet else [self._ent_temp, self._ent_wind, self._ent_rain, self._ent_weather]
+        entity_ids += self._ent_trip_weather
+        return list(dict.fromkeys(entity_id for entity_id in entity_ids if entity_id))
+
+    async def async_restore(self) -> None:
+        """Load the history saved by a previous run (before the first refresh)."""
+        if self._fleet and self._fleet.history_ready:
+            return  # Shared history already loaded by another fleet member
+        try:
+            data = await self._store.async_load()
+            if not data and self._fleet:
+                # Fleet history saved per member before it had its own file
+                data = await history_store(self.hass, self.entry.entry_id).async_load()
+            if data:
+                self.history.restore(data)
+        except Exception as e:
+            _LOGGER.warning("Could not restore BikerSentinel history, starting empty: %s", e)
+
+    async def async_bootstrap(self) -> None:
+        """Fill the history windows from the recorder, then mark the history ready.
+
+        One query for the temperature and rain entities runs in the recorder
+        executor; only the span not covered by the restored history is read.
+        """
+        if self._fleet and self._fleet.history_ready:
+            self.history_ready = True
+            return
+        try:
+            from homeassistant.components.recorder import get_instance
+
+            now = datetime.now().astimezone()
+            start = self.history.backfill_start(now)
+            rows = await get_instance(self.hass).async_add_executor_job(self._fetch_history, start, now)
+            rain = self._hub.get(self._ent_rain) if self._ent_rain else None
+            self.history.replay(
+                rows.get(self._ent_temp, ()), rows.get(self._ent_rain, ()), cumulative=bool(rain and rain.cumulative)
+            )
+        except Exception as e:
+            _LOGGER.debug("BikerSentinel history not bootstrapped from the recorder: %s", e)
+        self.history_ready = True
+        if self._fleet:
+            self._fleet.history_ready = True
+
+    def _fetch_history(self, start: datetime, end: datetime) -> dict[str, list[tuple[datetime, float]]]:
+        """Read numeric states of the temp/rain entities (runs in the recorder executor)."""
+        from homeassistant.components.recorder import history
+
+        entity_ids = [entity_id for entity_id in (self._ent_temp, self._ent_rain) if entity_id]
+        states = history.get_significant_states(
+            self.hass, start, end, entity_ids,
+            include_start_time_state=False, significant_changes_only=False, no_attributes=True,
+        )
+        rows: dict[str, list[tuple[datetime, float]]] = {}
+        for entity_id, entity_states in states.items():
+            series = rows.setdefault(entity_id, [])
+            for state in entity_states:
+                try:
+                    series.append((state.last_changed, float(state.state)))
+                except (ValueError, TypeError):
+                    continue  # unknown / unavailable
+        return rows
+
+    async def async_persist(self) -> None:
+        """Write the history immediately (on unload)."""
+        await self._store.async_save(self.history.as_dict())
+
+    @callback
+    def async_start(self) -> None:
+        """Recompute whenever one of the tracked inputs changes (push, no polling)."""
+        if self.tracked_entities:
+            # Subscriptions and parsing are shared with the other entries through the hub
+            self._unsub_state = self._hub.async_register(
+                self.entry.entry_id, self.tracked_entities, self._handle_state_change
+            )
+        if self._fleet:
+            self._unsub_fleet = self._fleet.async_add_listener(self.entry.entry_id, self._scheduler.async_request)
+        get_coordinators(self.hass)[self.entry.entry_id] = self
+        for group in list(self.hass.data[DOMAIN].get("groups", {}).values()):
+            group.async_attach(self)
+        if self._ent_forecasts:
+            unsub_ttl = async_track_time_interval(
+                self.hass, self._handle_forecast_ttl, timedelta(seconds=FORECAST_TTL)
+            )
+            # A new forecast is one more input change, coalesced with the others
+            unsub_listener = self._forecasts.async_add_listener(self._ent_forecasts, self._scheduler.async_request)
+
+            def unsub_forecast() -> None:
+                unsub_ttl()
+                unsub_listener()
+
+            self._unsub_forecast = unsub_forecast
+        if self._sun and not self._fleet:
+            # The sun moves without any state change: re-evaluate periodically, rebuild the table at midnight
+            # (fleet members are notified by the fleet, which samples the sun once for all of them)
+            unsub_tick = async_track_time_interval(
+                self.hass, self._handle_sun_tick, timedelta(seconds=SUN_UPDATE_INTERVAL)
+            )
+            unsub_midnight = async_track_time_change(
+                self.hass, self._handle_midnight, hour=0, minute=0, second=0
+            )
+
+            def unsub_sun() -> None:
+                unsub_tick()
+                unsub_midnight()
+
+            self._unsub_sun = unsub_sun
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop listening to input changes and drop listeners."""
+        if self._unsub_state:
+            self._unsub_state()
+            self._unsub_state = None
+        if self._unsub_forecast:
+            self._unsub_forecast()
+            self._unsub_forecast = None
+        if self._unsub_sun:
+            self._unsub_sun()
+            self._unsub_sun = None
+        if self._fleet:
+            if self._unsub_fleet:
+                self._unsub_fleet()
+                self._unsub_fleet = None
+            release_fleet(self.hass, self._fleet, self.entry.entry_id)
+        get_coordinators(self.hass).pop(self.entry.entry_id, None)
+        for group in list(self.hass.data[DOMAIN].get("groups", {}).values()):
+            group.async_detach(self.entry.entry_id)
+        if self._unsub_dwell:
+            self._unsub_dwell()
+            self._unsub_dwell = None
+        self._scheduler.async_cancel()
+        self._listeners.clear()
+
+    @callback
+    def async_set_profile(self, profile: RiderProfile) -> bool:
+        """Swap in new rider coefficients and re-evaluate once; return whether they changed.
+
+        The history, the subscriptions and the status classifiers are kept:
+        only the profile (an immutable value, replaced in one assignment) and
+        the cached score computed with the previous one are dropped.
+        """
+        if profile == self.profile:
+            return False
+        self.profile = profile
+        if self._fleet:
+            self._fleet.profiles.set(self.entry.entry_id, profile)
+        self._inputs = None
+        self.async_refresh()
+        return True
+
+    @callback
+    def _handle_state_change(self, event: Event) -> None:
+        """Handle a state change of a tracked input (coalesced with its burst)."""
+        self._scheduler.async_request()
+        entity_id = event.data.get("entity_id")
+        if entity_id in self._ent_forecasts:
+            # The provider refreshed: revalidate its forecast, scoring goes on with the cached one
+            self._forecasts.async_revalidate(entity_id)
+
+    @callback
+    def _handle_sun_tick(self, now: datetime) -> None:
+        self._scheduler.async_request()
+
+    @callback
+    def _handle_midnight(self, now: datetime) -> None:
+        self._sun.refresh(now)
+        self._scheduler.async_request()
+
+    @callback
+    def _handle_forecast_ttl(self, now: datetime) -> None:
+        for entity_id in self._ent_forecasts:
+            self._forecasts.async_revalidate(entity_id)
+
+    async def async_update_forecasts(self) -> None:
+        """Make sure the trip forecasts are cached (fetched concurrently, shared across entries)."""
+        if self._ent_forecasts:
+            await self._forecasts.async_get_many(self._ent_forecasts)
+
+    @callback
+    def async_refresh(self) -> None:
+        """Run one evaluation cycle and notify every entity once."""
+        self.data = self._compute()
+        self._schedule_dwell_check()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def _schedule_dwell_check(self) -> None:
+        """Re-evaluate when the first status held back by its dwell time may be taken.
+
+        Without it a pending status would wait for the next input change,
+        however long after the dwell time that comes.
+        """
+        if self._unsub_dwell:
+            self._unsub_dwell()
+            self._unsub_dwell = None
+        deadlines = [
+            classifier.pending_until for classifier in self._classifiers.values()
+            if classifier.pending_until is not None
+        ]
+        if deadlines:
+            delay = max(0.0, min(deadlines) - time.monotonic())
+            self._unsub_dwell = async_call_later(self.hass, delay, self._handle_dwell_elapsed)
+
+    @callback
+    def _handle_dwell_elapsed(self, _now: datetime) -> None:
+        self._unsub_dwell = None
+        self.async_refresh()
+
+    def _compute(self) -> EntrySnapshot:
+        """Evaluate the instant score and both trips into a new snapshot."""
+        score = self._compute_score()
+        trip_go = trip_return = None
+        if self.trip_enabled:
+            road_state = score.road_state if score else "dry"
+            trip_go = self._compute_trip(CONF_TRIP_DEPART_TIME, True, road_state)
+            trip_return = self._compute_trip(CONF_TRIP_RETURN_TIME, False, road_state)
+        now = time.monotonic()
+        classifiers = self._classifiers
+        return EntrySnapshot(
+            score=score,
+            trip_go=trip_go,
+            trip_return=trip_return,
+            status=classifiers["status"].update(score.score if score else None, now),
+            trip_go_status=classifiers["trip_go_status"].update(trip_go.score if trip_go else None, now),
+            trip_return_status=classifiers["trip_return_status"].update(
+                trip_return.score if trip_return else None, now
+            ),
+            departure=self._compute_departure(),
+        )
+
+    def _compute_departure(self) -> DeparturePlan | None:
+        """Best departure window; the forecast is only rescored when it (or the profile) changed."""
+        forecast = self._forecasts.get(self._ent_departure_weather) if self._ent_departure_weather else None
+        if forecast is None:
+            return None
+        try:
+            if self._optimizer is None or not self._optimizer.matches(
+                forecast, self.profile, self.ride_minutes, self._sun
+            ):
+                self._optimizer = DepartureOptimizer(forecast, self.profile, self.ride_minutes, self._sun)
+            return self._optimizer.plan(datetime.now().astimezone())
+        except Exception as e:
+            _LOGGER.error("Error computing the best departure window: %s", e)
+            return None
+
+    def _read_inputs(self) -> ScoreInputs | None:
+        """Build a frozen input snapshot from the parsed sensor readings."""
+        elevation = azimuth = None
+        if self._sun:
+            position = self._sun.position(datetime.now().astimezone())
+            elevation, azimuth = position.elevation, position.azimuth
+        sources = (self._ent_temp, self._ent_wind, self._ent_rain, self._ent_weather)
+        return self._hub.read_inputs(sources, elevation, azimuth)
+
+    def _compute_score(self) -> ScoreResult | None:
+        """Evaluate the instant score; unchanged snapshots reuse the last result."""
+        try:
+            if self._fleet:
+                # The fleet reads, ingests, saves and scores each snapshot once; members pick their row
+                result = self._fleet.result(self.entry.entry_id)
+                self._inputs = self._fleet.inputs
+                return result
+            inputs = self._read_inputs()
+            if inputs is None:
+                self._inputs = None
+                return None
+            if inputs == self._inputs and self.data.score is not None:
+                return self.data.score
+            self._inputs = inputs
+            # New snapshot: ingest it into history, then run the pure kernel
+            enriched = self.history.ingest(inputs, datetime.now())
+            # Batched: one write per STORAGE_SAVE_DELAY, however many samples arrive
+            self._store.async_delay_save(self.history.as_dict, STORAGE_SAVE_DELAY)
+            return evaluate(enriched, self.profile)
+        except Exception as e:
+            _LOGGER.error("Error calculating BikerSentinel score: %s", e)
+            return None
+
+    def _compute_trip(self, time_key: str, outbound: bool, road_state: str) -> TripResult | None:
+        """Evaluate one trip direction from the home/office weather entities."""
+        try:
+            home_weather_entity = self.entry.data.get(CONF_TRIP_HOME_WEATHER)
+            office_weather_entity = self.entry.data.get(CONF_TRIP_OFFICE_WEATHER)
+            time_str = self.entry.data.get(time_key)
+
+            if not home_weather_entity or not office_weather_entity or not time_str:
+                return None
+
+            # Each point is sampled at its estimated arrival time along the ride direction
+            when = _next_occurrence(time_str)
+            points = [
+                (home_weather_entity, TRIP_ENDPOINT_MINUTES),
+                *self._waypoints,
+                (office_weather_entity, TRIP_ENDPOINT_MINUTES),
+            ]
+            if not outbound:
+                points.reverse()
+            samples = {}  # outbound index -> (weather, source, from forecast)
+            arrival = when
+            for index, (entity_id, minutes) in enumerate(points):
+                samples[len(points) - 1 - index if not outbound else index] = self._trip_weather(entity_id, arrival)
+                arrival += timedelta(minutes=minutes)
+
+            (home_weather, home_source, _), (office_weather, office_source, _) = samples[0], samples[len(points) - 1]
+            if not home_weather or not office_weather:
+                return None
+            waypoints = [
+                RouteLeg(entity_id, samples[index][0], minutes, source=samples[index][1])
+                for index, (entity_id, minutes) in enumerate(self._waypoints, start=1)
+                if samples[index][0]
+            ]
+
+            result = evaluate_trip(
+                home_weather, office_weather, self.profile,
+                outbound=outbound, road_state=road_state, at_night=self._trip_at_night(when),
+                waypoints=waypoints, sources=(home_source, office_source), analysis_cache=self._analysis,
+            )
+            all_forecast = all(from_forecast for _, _, from_forecast in samples.values())
+            return replace(
+                result,
+                home_location=home_weather_entity,
+                office_location=office_weather_entity,
+                forecast_time=when.isoformat() if all_forecast else None,
+            )
+
+        except Exception as e:
+            _LOGGER.error("Error calculating trip score (%s): %s", "go" if outbound else "return", e)
+            return None
+
+    def _trip_weather(self, entity_id: str, when: datetime):
+        """Forecast conditions at ``when`` (current state outside the forecast), their cache source, and
+        whether they come from the forecast."""
+        forecast = self._forecasts.get(entity_id)
+        row = forecast.at(when) if forecast else None
+        if row is not None:
+            return WeatherSnapshot.from_forecast(row), (entity_id, forecast.fetched_at, row.get("datetime")), True
+        state = self._hub.get(entity_id)
+        return state, (entity_id, state.last_updated) if state else None, False
+
+    def _trip_at_night(self, when: datetime) -> bool:
+        """Check whether the trip departure falls outside daylight (on its own date)."""
+        return self._sun.is_night(when) if self._sun else False
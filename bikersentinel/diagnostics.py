@@ -0,0 +1,30 @@
+"""Diagnostics for BikerSentinel: update, write and cache counters of an entry."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .forecast import get_forecast_cache
+from .hub import get_sensor_hub
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return the counters of the entry's coordinator and of the caches shared by all entries."""
+    runtime_data = getattr(entry, "runtime_data", None) or {}
+    diagnostics: dict[str, Any] = {"options": dict(entry.options)}
+
+    coordinator = runtime_data.get("coordinator")
+    if coordinator is not None:
+        # requested/coalesced/executed runs, state writes, shared analysis cache hits/misses
+        diagnostics["coordinator"] = {**coordinator.stats, "history_ready": coordinator.history_ready}
+    group = runtime_data.get("group")
+    if group is not None:
+        diagnostics["group"] = {"members": list(group.members), "riders_scored": group.stats.count}
+
+    hub = get_sensor_hub(hass)
+    forecasts = get_forecast_cache(hass)
+    diagnostics["sensor_hub"] = {"subscriptions": len(hub.subscriptions), "parsed": hub.parsed}
+    diagnostics["forecasts"] = {"fetches": forecasts.fetches, "failures": forecasts.failures}
+    return diagnostics
@@ -0,0 +1,664 @@
+"""Scoring kernel for BikerSentinel.
+
+Everything in this module is pure: it never touches ``hass``, never mutates its
+arguments and returns immutable results. Entities and services build a
+``ScoreInputs`` snapshot, pass it with a ``RiderProfile`` to ``evaluate`` and
+publish the resulting ``ScoreResult``.
+"""
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from collections.abc import Hashable, Mapping, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from .const import (
+    PROTECTION_COEFS,
+    EQUIPMENT_COEFS,
+    RIDING_CONTEXTS,
+    NIGHT_MODE_MALUS,
+    ROAD_STATE_MALUS,
+    ROAD_STATE_THRESHOLDS,
+    TEMP_DROP_THRESHOLD,
+    TEMP_TREND_MALUS,
+    HUMIDITY_MALUS,
+    SOLAR_BLINDNESS_THRESHOLD,
+    SOLAR_BLINDNESS_MALUS,
+    TRIP_ENDPOINT_MINUTES,
+    TRIP_CONDITION_MALUS,
+    TRIP_COLD_RULE,
+    TRIP_HOT_RULE,
+    TRIP_WIND_RULE,
+    TRIP_HUMIDITY_RULE,
+    ANALYSIS_CACHE_SIZE,
+    DEFAULT_RAIN_RATIO,
+    DEFAULT_FOG_RATIO,
+    DEFAULT_CLOUDY_RATIO,
+    DEFAULT_COLD_RATIO,
+    DEFAULT_HOT_RATIO,
+    DEFAULT_WIND_RATIO,
+    DEFAULT_HUMIDITY_RATIO,
+    DEFAULT_NIGHT_RATIO,
+    DEFAULT_ROAD_STATE_RATIO,
+)
+
+# Weather conditions that immediately veto riding
+DANGEROUS_WEATHER = ("snowy", "snowy-rainy", "hail", "lightning-rainy")
+
+MAX_SCORE = 10.0
+
+
+def round_score(score):
+    """Clamp a raw score to [0, MAX_SCORE] and round it half up to 0.1.
+
+    The same IEEE operations run on a float and, element-wise, on a NumPy
+    array, so the scalar kernel and the vectorized passes round identically.
+    """
+    if isinstance(score, np.ndarray):
+        return np.floor(np.clip(score, 0.0, MAX_SCORE) * 10 + 0.5) / 10
+    return math.floor(min(max(score, 0.0), MAX_SCORE) * 10 + 0.5) / 10
+
+
+@dataclass(frozen=True, slots=True)
+class RiderProfile:
+    """Precomputed rider/bike coefficients and malus ratios."""
+
+    coef: float = 1.2
+    equip_coef: float = 1.0
+    surface: float = 1.96
+    sens_factor: float = 1.0
+    riding_speed: float = 80.0
+    rain_ratio: float = DEFAULT_RAIN_RATIO
+    fog_ratio: float = DEFAULT_FOG_RATIO
+    cloudy_ratio: float = DEFAULT_CLOUDY_RATIO
+    cold_ratio: float = DEFAULT_COLD_RATIO
+    hot_ratio: float = DEFAULT_HOT_RATIO
+    wind_ratio: float = DEFAULT_WIND_RATIO
+    humidity_ratio: float = DEFAULT_HUMIDITY_RATIO
+    night_ratio: float = DEFAULT_NIGHT_RATIO
+    road_state_ratio: float = DEFAULT_ROAD_STATE_RATIO
+
+    @classmethod
+    def build(cls, height, weight, bike_type, equipment, sensitivity, riding_context, **ratios) -> RiderProfile:
+        """Build a profile from raw rider settings (ratios passed as keyword arguments)."""
+        return cls(
+            coef=PROTECTION_COEFS.get(bike_type, 1.2),
+            equip_coef=EQUIPMENT_COEFS.get(equipment, 1.0),
+            # Body surface area using DuBois formula
+            surface=0.007184 * math.pow(height, 0.725) * math.pow(weight, 0.425),
+            # Sensitivity factor (1=Viking, 3=Normal, 5=Sensitive)
+            sens_factor=1.0 + ((sensitivity - 3) * 0.1),
+            riding_speed=RIDING_CONTEXTS.get(riding_context, 80),
+            **ratios,
+        )
+
+    @property
+    def weather_ratios(self) -> tuple[float, ...]:
+        """Ratios taken by analyze_weather_conditions, in its argument order."""
+        return (
+            self.rain_ratio, self.fog_ratio, self.cloudy_ratio, self.cold_ratio,
+            self.hot_ratio, self.wind_ratio, self.humidity_ratio,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ScoreInputs:
+    """Frozen snapshot of everything the score depends on.
+
+    ``rain`` is a rate in mm/h. A cumulative rain sensor gives ``rain_total``
+    (accumulated mm) instead, which the history ingestion step turns into the
+    rate. ``surface_water`` (mm left on the road), ``temp_rate`` (°C/h) and
+    ``temp_drop`` (°C below the window maximum) are summaries produced by that
+    same step; the kernel itself keeps no history.
+    """
+
+    temperature: float
+    wind_speed: float
+    rain: float = 0.0
+    weather: str = "clear"
+    humidity: float | None = None
+    sun_elevation: float | None = None
+    sun_azimuth: float | None = None
+    surface_water: float = 0.0
+    temp_rate: float | None = None
+    temp_drop: float = 0.0
+    rain_total: float | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Factor:
+    """A single contribution to the score."""
+
+    label: str
+    malus: float
+
+    def __str__(self) -> str:
+        return f"{self.label} ({self.malus:.2f})"
+
+
+@dataclass(frozen=True, slots=True)
+class ScoreResult:
+    """Immutable outcome of one evaluation."""
+
+    score: float
+    factors: tuple[Factor, ...] = ()
+    veto: str | None = None
+    night_mode: str = "day"
+    road_state: str = "unknown"
+    temperature_trend: str = "stable"
+    humidity: str = "moderate"
+    solar_glare: str = "safe"
+    temperature_rate: float | None = None
+    temperature_drop: float = 0.0
+
+    @property
+    def categories(self) -> tuple:
+        """The categorical outcome (veto and sub-states), without numeric details."""
+        return (self.veto, self.night_mode, self.road_state, self.temperature_trend, self.humidity, self.solar_glare)
+
+    @property
+    def reasons(self) -> list[str]:
+        """Human readable reasons, as shown by the Reasoning entity."""
+        if self.veto:
+            return [self.veto]
+        return [str(factor) for factor in self.factors] or ["Perfect Conditions"]
+
+    def as_attributes(self) -> dict:
+        """Return the Score entity state attributes."""
+        return {
+            "reasons": self.reasons,
+            "night_mode": self.night_mode,
+            "road_state": self.road_state,
+            "temperature_trend": self.temperature_trend,
+            "temperature_rate": round(self.temperature_rate, 1) if self.temperature_rate is not None else None,
+            "temperature_drop": round(self.temperature_drop, 1),
+            "humidity": self.humidity,
+            "solar_glare": self.solar_glare,
+        }
+
+    def as_dict(self) -> dict:
+        """Plain form with the factor breakdown (service responses)."""
+        return {
+            "score": self.score,
+            "status": classify_status(self.score),
+            "veto": self.veto,
+            "factors": [{"label": factor.label, "malus": round(factor.malus, 2)} for factor in self.factors],
+            **self.as_attributes(),
+        }
+
+
+def classify_night(elevation: float) -> str:
+    """Map solar elevation to a visibility category."""
+    if elevation > 10:
+        return "day"
+    if elevation > 0:
+        return "twilight"
+    if elevation > -6:
+        return "civil_twilight"
+    return "night"
+
+
+def classify_glare(elevation: float, azimuth: float) -> str:
+    """Map sun position to a glare risk (front azimuth is 90-270°)."""
+    diff = abs(azimuth - 180)
+    if diff > 180:
+        diff = 360 - diff
+    if diff < SOLAR_BLINDNESS_THRESHOLD and elevation > 5:
+        return "warning" if diff < 30 else "caution"
+    return "safe"
+
+
+def classify_road(surface_water: float, temperature: float) -> str:
+    """Infer road surface from the water left on it."""
+    if surface_water < ROAD_STATE_THRESHOLDS["damp"][0]:
+        return "dry"
+    if surface_water <= ROAD_STATE_THRESHOLDS["wet"][0]:
+        return "damp"
+    if surface_water <= ROAD_STATE_THRESHOLDS["sludge"][0]:
+        return "wet"
+    return "icy" if temperature < 0 else "sludge"
+
+
+def classify_trend(temp_rate: float | None, temp_drop: float = 0.0) -> str:
+    """Map the trend rate (°C/h) and drop below the window maximum to a trend."""
+    if temp_rate is None:
+        return "stable"
+    if temp_rate < 0 and temp_drop > TEMP_DROP_THRESHOLD:
+        return "dropping"
+    if temp_rate > 3:
+        return "rising"
+    return "stable"
+
+
+def classify_humidity(humidity: float | None) -> str:
+    """Map relative humidity to a visibility category."""
+    if humidity is None:
+        return "moderate"
+    if humidity > 70:
+        return "high"
+    if humidity > 30:
+        return "moderate"
+    return "low"
+
+
+def classify_inputs(inputs: ScoreInputs) -> dict:
+    """Sub-states of a snapshot; they do not depend on the rider profile."""
+    night_mode = "day"
+    solar_glare = "safe"
+    if inputs.sun_elevation is not None:
+        night_mode = classify_night(inputs.sun_elevation)
+        solar_glare = classify_glare(inputs.sun_elevation, inputs.sun_azimuth if inputs.sun_azimuth is not None else 180)
+    return {
+        "night_mode": night_mode,
+        "road_state": classify_road(inputs.surface_water, inputs.temperature),
+        "temperature_trend": classify_trend(inputs.temp_rate, inputs.temp_drop),
+        "humidity": classify_humidity(inputs.humidity),
+        "solar_glare": solar_glare,
+        "temperature_rate": inputs.temp_rate,
+        "temperature_drop": inputs.temp_drop,
+    }
+
+
+def safety_veto(inputs: ScoreInputs) -> str | None:
+    """Return the reason forcing the score to 0.0, if any (same for every profile)."""
+    if inputs.weather in DANGEROUS_WEATHER:
+        return "Dangerous Weather"
+    if inputs.temperature < 1:
+        return "Ice Risk"
+    if inputs.wind_speed > 85:
+        return "Storm Winds"
+    return None
+
+
+def evaluate(inputs: ScoreInputs, profile: RiderProfile) -> ScoreResult:
+    """Compute the score for one input snapshot. Pure function."""
+    t = inputs.temperature
+    v = inputs.wind_speed
+    p = inputs.rain
+
+    states = classify_inputs(inputs)
+    night_mode = states["night_mode"]
+    solar_glare = states["solar_glare"]
+    road_state = states["road_state"]
+    trend = states["temperature_trend"]
+    humidity = states["humidity"]
+
+    # 1. SAFETY VETOES (Immediate 0.0)
+    veto = safety_veto(inputs)
+    if veto:
+        return ScoreResult(0.0, veto=veto, **states)
+
+    factors: list[Factor] = []
+
+    # 2. FOG & VISIBILITY
+    if inputs.weather == "fog":
+        factors.append(Factor("Fog", -3.0 * profile.fog_ratio))
+
+    # 3. NIGHT MODE & SOLAR BLINDNESS
+    if night_mode != "day":
+        factors.append(Factor("Night", NIGHT_MODE_MALUS[night_mode] * profile.night_ratio))
+    if solar_glare != "safe":
+        factors.append(Factor("Sun Glare", SOLAR_BLINDNESS_MALUS[solar_glare] * profile.night_ratio))
+
+    # 4. WINDCHILL (Thermal Comfort - Core Algorithm)
+    total_wind = v + (profile.riding_speed * 0.1)
+    t_felt = t - (total_wind * 0.2 * profile.coef)
+    if t_felt < 15:
+        raw_malus = (15 - t_felt) * 0.2 * profile.surface
+        final_malus = raw_malus * profile.equip_coef * profile.sens_factor
+        factors.append(Factor(f"Wind Chill {t_felt:.1f}°C", -final_malus * profile.cold_ratio))
+
+    # 5. WIND STABILITY (Lateral Forces)
+    if v > 35:
+        malus_wind = (v - 35) * 0.15 * profile.coef
+        factors.append(Factor(f"Wind {v}km/h", -malus_wind * profile.wind_ratio))
+
+    # 6. RAIN (Immediate Road Hazard)
+    if p > 0:
+        factors.append(Factor(f"Rain {p}mm", -3.0 * profile.rain_ratio))
+
+    # 7. ROAD STATE (surface water model)
+    road_malus = ROAD_STATE_MALUS.get(road_state, 0.0)
+    if road_malus < 0:
+        factors.append(Factor(f"Road {road_state.capitalize()}", road_malus * profile.road_state_ratio))
+
+    # 8. TEMPERATURE TREND (Icing Risk)
+    if trend == "dropping":
+        factors.append(Factor("Temp Dropping", TEMP_TREND_MALUS["dropping"] * profile.cold_ratio))
+
+    # 9. HUMIDITY & VISIBILITY
+    if humidity == "high":
+        factors.append(Factor("High Humidity", HUMIDITY_MALUS["high"] * profile.humidity_ratio))
+
+    score = MAX_SCORE + sum(factor.malus for factor in factors)
+    return ScoreResult(round_score(score), tuple(factors), **states)
+
+
+def evaluate_batch(rows: Sequence[ScoreInputs], profile: RiderProfile) -> list[ScoreResult]:
+    """Evaluate many snapshots for one profile; identical snapshots are evaluated once."""
+    results: dict[ScoreInputs, ScoreResult] = {}
+    return [results[row] if row in results else results.setdefault(row, evaluate(row, profile)) for row in rows]
+
+
+# Status levels (best last) with their inclusive upper score bound
+STATUS_LEVELS = (
+    ("critical", 2.0),
+    ("degraded", 4.0),
+    ("favorable", 6.0),
+    ("optimal", MAX_SCORE),
+)
+
+
+def classify_status(score: float | None) -> str:
+    """Map a score to the Status entity category (no hysteresis)."""
+    if score is None:
+        return "analyzing"
+    if score == 0:
+        return "dangerous"
+    for status, upper in STATUS_LEVELS:
+        if score <= upper:
+            return status
+    return "optimal"
+
+
+class StatusClassifier:
+    """Edge-triggered status classification with hysteresis and minimum dwell time.
+
+    The current status is kept while the score stays within its range widened
+    by ``hysteresis`` on both sides, and a new status must wait until the
+    current one has been held for ``min_dwell`` seconds. Entering "analyzing"
+    or "dangerous" (a veto) is always immediate, and so is leaving "analyzing"
+    (the first real score is shown at once); leaving "dangerous" waits for the
+    dwell time. A status held back by the dwell time is kept in ``pending``
+    until ``pending_until``.
+    """
+
+    def __init__(self, hysteresis: float = 0.0, min_dwell: float = 0.0) -> None:
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.status: str | None = None
+        self.pending: str | None = None
+        self._since = 0.0
+
+    @property
+    def pending_until(self) -> float | None:
+        """When (on the ``now`` clock) the pending status may be taken, if one is waiting."""
+        return self._since + self.min_dwell if self.pending is not None else None
+
+    def _bounds(self, status: str) -> tuple[float, float] | None:
+        lower = 0.0
+        for level, upper in STATUS_LEVELS:
+            if level == status:
+                return lower, upper
+            lower = upper
+        return None
+
+    def _candidate(self, score: float | None) -> str:
+        raw = classify_status(score)
+        if raw in ("analyzing", "dangerous") or self.status is None:
+            return raw
+        bounds = self._bounds(self.status)
+        if bounds is not None:
+            lower, upper = bounds
+            if lower - self.hysteresis < score <= upper + self.hysteresis:
+                return self.status
+        return raw
+
+    def update(self, score: float | None, now: float) -> str:
+        """Feed the score of a new cycle (``now`` in seconds) and return the status."""
+        candidate = self._candidate(score)
+        if candidate == self.status:
+            self.pending = None
+            return self.status
+        immediate = (
+            self.status in (None, "analyzing")
+            or candidate in ("analyzing", "dangerous")
+            or now - self._since >= self.min_dwell
+        )
+        if immediate:
+            self.status = candidate
+            self._since = now
+            self.pending = None
+        else:
+            self.pending = candidate
+        return self.status
+
+
+def analyze_weather_conditions(weather_state, location_name, rain_ratio=1.0, fog_ratio=1.0, cloudy_ratio=1.0,
+                               cold_ratio=1.0, hot_ratio=1.0, wind_ratio=1.0, humidity_ratio=1.0):
+    """Analyze weather conditions and return malus + reasons."""
+    reasons = []
+    malus = 0.0
+    
+    # Safety vetoes
+    if weather_state.state in ["snowy", "lightning-rainy", "hail"]:
+        return {"malus": -8.0, "reasons": [f"{location_name}: Dangerous Weather"]}
+    
+    # Weather conditions
+    if weather_state.state == "rainy":
+        malus += TRIP_CONDITION_MALUS["rainy"] * rain_ratio
+        reasons.append(f"{location_name}: Rain ({TRIP_CONDITION_MALUS['rainy'] * rain_ratio:.1f})")
+    elif weather_state.state == "fog":
+        malus += TRIP_CONDITION_MALUS["fog"] * fog_ratio
+        reasons.append(f"{location_name}: Fog ({TRIP_CONDITION_MALUS['fog'] * fog_ratio:.1f})")
+    elif weather_state.state == "cloudy":
+        malus += TRIP_CONDITION_MALUS["cloudy"] * cloudy_ratio
+        reasons.append(f"{location_name}: Cloudy ({TRIP_CONDITION_MALUS['cloudy'] * cloudy_ratio:.1f})")
+    
+    # Temperature
+    try:
+        temp = weather_state.attributes.get("temperature")
+        if temp:
+            temp = float(temp)
+            if temp < TRIP_COLD_RULE[0]:
+                malus += TRIP_COLD_RULE[1] * cold_ratio
+                reasons.append(f"{location_name}: Cold {temp}°C ({TRIP_COLD_RULE[1] * cold_ratio:.1f})")
+            elif temp > TRIP_HOT_RULE[0]:
+                malus += TRIP_HOT_RULE[1] * hot_ratio
+                reasons.append(f"{location_name}: Hot {temp}°C ({TRIP_HOT_RULE[1] * hot_ratio:.1f})")
+    except Exception:
+        pass
+    
+    # Wind
+    try:
+        wind = weather_state.attributes.get("wind_speed")
+        if wind:
+            wind = float(wind)
+            if wind > TRIP_WIND_RULE[0]:
+                malus += TRIP_WIND_RULE[1] * wind_ratio
+                reasons.append(f"{location_name}: Wind {wind}km/h ({TRIP_WIND_RULE[1] * wind_ratio:.1f})")
+    except Exception:
+        pass
+    
+    # Humidity
+    try:
+        humidity = weather_state.attributes.get("humidity")
+        if humidity:
+            humidity = float(humidity)
+            if humidity > TRIP_HUMIDITY_RULE[0]:
+                malus += TRIP_HUMIDITY_RULE[1] * humidity_ratio
+                reasons.append(f"{location_name}: Humidity {humidity}% ({TRIP_HUMIDITY_RULE[1] * humidity_ratio:.1f})")
+    except Exception:
+        pass
+    
+    return {"malus": malus, "reasons": reasons}
+
+
+class AnalysisCache:
+    """LRU of analyze_weather_conditions results keyed by (source, location, ratio set).
+
+    ``source`` identifies the weather data, e.g. (entity_id, last_updated) for
+    a state or the forecast row for a forecast, so the same home/office weather
+    is analyzed once for every trip and entry using it.
+    """
+
+    def __init__(self, maxsize: int = ANALYSIS_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[float, tuple[str, ...]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, source: Hashable | None, weather_state, location_name: str, ratios: tuple[float, ...]) -> dict:
+        """analyze_weather_conditions, memoized unless ``source`` is None."""
+        if source is None:
+            return analyze_weather_conditions(weather_state, location_name, *ratios)
+        key = (source, location_name, ratios)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {"malus": cached[0], "reasons": list(cached[1])}
+        self.misses += 1
+        result = analyze_weather_conditions(weather_state, location_name, *ratios)
+        self._entries[key] = (result["malus"], tuple(result["reasons"]))
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return result
+
+
+@dataclass(frozen=True, slots=True)
+class WeatherSnapshot:
+    """State-like view of a forecast row (``condition`` as state, the row as attributes)."""
+
+    state: str
+    attributes: Mapping
+
+    @classmethod
+    def from_forecast(cls, row: Mapping) -> WeatherSnapshot:
+        """Wrap an hourly ``weather.get_forecasts`` row."""
+        return cls(row.get("condition") or "unknown", row)
+
+
+# Trip malus carried over from the instant road state (wet roads dry slowly)
+PREVIOUS_ROAD_MALUS = {
+    "damp": -0.5,
+    "wet": -1.0,
+    "sludge": -1.0,
+    "icy": -1.0,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class TripResult:
+    """Immutable outcome of one trip evaluation."""
+
+    score: float
+    reasons: tuple[str, ...] = ()
+    home_location: str | None = None
+    office_location: str | None = None
+    forecast_time: str | None = None  # Forecast hour scored, None for current conditions
+    worst_segment: str | None = None  # Route point with the largest weather malus
+
+    def as_attributes(self) -> dict:
+        """Return the Trip Score entity state attributes."""
+        return {
+            "reasons": list(self.reasons) or ["Good conditions"],
+            "home_location": self.home_location,
+            "office_location": self.office_location,
+            "forecast_time": self.forecast_time,
+            "worst_segment": self.worst_segment,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class RouteLeg:
+    """One point of a route: the weather near it and the minutes spent there."""
+
+    name: str
+    weather: object  # State or WeatherSnapshot (``state`` + ``attributes``)
+    minutes: float = TRIP_ENDPOINT_MINUTES
+    source: Hashable | None = None  # Identifies the weather data for AnalysisCache
+
+
+def parse_waypoints(text: str) -> list[dict[str, object]]:
+    """Parse "weather.pass:25, weather.coast:40" into ordered waypoints (minutes near each).
+
+    Raises ValueError for a non-weather entity or minutes that are not a positive number.
+    """
+    waypoints = []
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        entity_id, _, minutes = item.strip().partition(":")
+        entity_id = entity_id.strip()
+        if not entity_id.startswith("weather."):
+            raise ValueError(f"Not a weather entity: {entity_id}")
+        value = float(minutes) if minutes.strip() else float(TRIP_ENDPOINT_MINUTES)
+        if not math.isfinite(value) or value <= 0:
+            # The minutes weight the route average: nan, inf or 0 would break the trip score
+            raise ValueError(f"Minutes must be a positive number: {item.strip()}")
+        waypoints.append({"entity_id": entity_id, "minutes": value})
+    return waypoints
+
+
+def evaluate_route(legs: Sequence[RouteLeg], profile: RiderProfile, *,
+                   road_state: str = "dry", at_night: bool = False,
+                   analysis_cache: AnalysisCache | None = None) -> TripResult:
+    """Score an ordered route, each point's weather weighted by the time spent near it. Pure function."""
+    # Safety vetoes for trip (same as instant score)
+    dangerous = [leg for leg in legs if leg.weather.state in DANGEROUS_WEATHER]
+    if dangerous:
+        return TripResult(0.0, ("Dangerous Weather",), worst_segment=dangerous[0].name)
+
+    ratios = profile.weather_ratios
+    if analysis_cache is None:
+        analyses = [analyze_weather_conditions(leg.weather, leg.name, *ratios) for leg in legs]
+    else:
+        analyses = [analysis_cache.analyze(leg.source, leg.weather, leg.name, ratios) for leg in legs]
+
+    reasons = []
+    score = MAX_SCORE
+
+    # Time-weighted average of the weather malus along the route
+    total_minutes = sum(leg.minutes for leg in legs) or 1.0
+    avg_weather_malus = sum(leg.minutes * analysis["malus"] for leg, analysis in zip(legs, analyses)) / total_minutes
+    score += avg_weather_malus
+    weighted = len({leg.minutes for leg in legs}) > 1
+    weather_details = [
+        f"{leg.name} {analysis['malus']:+.2f}" + (f" ({leg.minutes:g} min)" if weighted else "")
+        for leg, analysis in sorted(zip(legs, analyses), key=lambda item: item[0].name != "Home")
+        if analysis["malus"] != 0
+    ]
+    if weather_details:
+        reasons.append(f"Weather average: {' + '.join(weather_details)} = {avg_weather_malus:+.2f}")
+
+    # Add individual weather details for transparency
+    for analysis in analyses:
+        reasons.extend(analysis["reasons"])
+
+    worst_leg, worst_analysis = min(zip(legs, analyses), key=lambda item: item[1]["malus"])
+    worst_segment = worst_leg.name if worst_analysis["malus"] < 0 else None
+
+    # Road state malus if the weather indicates rain
+    if any(leg.weather.state == "rainy" for leg in legs):
+        score += -0.5
+        reasons.append("Road state: Wet (-0.5)")
+
+    # Road state malus carried over from the instant score
+    previous_malus = PREVIOUS_ROAD_MALUS.get(road_state)
+    if previous_malus:
+        score += previous_malus
+        reasons.append(f"Previous day: Road state: {road_state.capitalize()} ({previous_malus})")
+
+    if at_night:
+        night_malus = NIGHT_MODE_MALUS["night"] * profile.night_ratio
+        score += night_malus
+        reasons.append(f"Trip at night ({night_malus:.1f})")
+
+    return TripResult(round_score(score), tuple(reasons), worst_segment=worst_segment)
+
+
+def evaluate_trip(home, office, profile: RiderProfile, *, outbound: bool = True,
+                  road_state: str = "dry", at_night: bool = False,
+                  waypoints: Sequence[RouteLeg] = (), sources: tuple[Hashable, Hashable] = (None, None),
+                  analysis_cache: AnalysisCache | None = None) -> TripResult:
+    """Score a home <-> office trip (through ``waypoints``, in outbound order). Pure function.
+
+    ``sources`` identify the home and office weather data for ``analysis_cache``.
+    """
+    legs = [RouteLeg("Home", home, source=sources[0]), *waypoints, RouteLeg("Office", office, source=sources[1])]
+    if not outbound:
+        legs.reverse()
+    return evaluate_route(legs, profile, road_state=road_state, at_night=at_night, analysis_cache=analysis_cache)
@@ -0,0 +1,335 @@
+"""Fleet mode: many rider profiles scored against one shared sensor snapshot.
+
+Entries in fleet mode that read the same temperature, wind, rain and weather
+entities join one ``Fleet``. The fleet registers those entities once, samples
+the sun on one timer, reads each snapshot once, ingests it into one shared
+history, and scores every profile in a single NumPy pass over a
+struct-of-arrays copy of the profiles. Each entry then only picks its row of
+the result.
+
+The sub-states and vetoes of a snapshot do not depend on the profile, so only
+the malus terms are vectorized. They are summed in the kernel's order and
+rounded with its ``round_score``, so the results match ``evaluate`` exactly.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Callable
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_change, async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    HUMIDITY_MALUS,
+    NIGHT_MODE_MALUS,
+    ROAD_STATE_MALUS,
+    SOLAR_BLINDNESS_MALUS,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    SUN_UPDATE_INTERVAL,
+    TEMP_TREND_MALUS,
+)
+from .engine import (
+    MAX_SCORE,
+    Factor,
+    RiderProfile,
+    ScoreInputs,
+    ScoreResult,
+    classify_inputs,
+    round_score,
+    safety_veto,
+)
+from .history import EngineHistory
+from .hub import get_sensor_hub
+from .sun import get_sun_table
+
+PROFILE_FIELDS = tuple(field.name for field in fields(RiderProfile))
+
+
+class ProfileArrays:
+    """Rider profiles keyed by entry id, exposed as one NumPy column per profile field.
+
+    Adding, updating or removing a profile is O(1) (removal swaps the last
+    profile into the freed row); the columns are rebuilt lazily, once, on the
+    next scoring pass.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[str] = []
+        self._profiles: list[RiderProfile] = []
+        self._index: dict[str, int] = {}
+        self._columns: dict[str, np.ndarray] | None = None
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @property
+    def keys(self) -> list[str]:
+        """Entry ids in row order."""
+        return list(self._keys)
+
+    def index(self, key: str) -> int:
+        """Row of ``key`` in the columns."""
+        return self._index[key]
+
+    def profile(self, key: str) -> RiderProfile:
+        """Profile stored for ``key``."""
+        return self._profiles[self._index[key]]
+
+    def set(self, key: str, profile: RiderProfile) -> None:
+        """Add or replace the profile of ``key``."""
+        index = self._index.get(key)
+        if index is None:
+            self._index[key] = len(self._keys)
+            self._keys.append(key)
+            self._profiles.append(profile)
+        elif self._profiles[index] == profile:
+            return
+        else:
+            self._profiles[index] = profile
+        self._changed()
+
+    def remove(self, key: str) -> None:
+        """Drop the profile of ``key`` (no-op if absent)."""
+        index = self._index.pop(key, None)
+        if index is None:
+            return
+        last_key, last_profile = self._keys.pop(), self._profiles.pop()
+        if index < len(self._keys):
+            self._keys[index], self._profiles[index] = last_key, last_profile
+            self._index[last_key] = index
+        self._changed()
+
+    def _changed(self) -> None:
+        self._columns = None
+        self.version += 1
+
+    @property
+    def columns(self) -> dict[str, np.ndarray]:
+        """One float array per RiderProfile field, rows in ``keys`` order."""
+        if self._columns is None:
+            self._columns = {
+                name: np.array([getattr(profile, name) for profile in self._profiles], dtype=float)
+                for name in PROFILE_FIELDS
+            }
+        return self._columns
+
+
+@dataclass(frozen=True, slots=True)
+class FleetScores:
+    """Scores of every profile for one snapshot; ``result`` gives one profile's ScoreResult."""
+
+    version: int
+    scores: np.ndarray
+    states: dict
+    veto: str | None = None
+    terms: tuple[tuple[str, np.ndarray, np.ndarray | None], ...] = ()  # (label, malus, mask)
+    felt_temperature: np.ndarray | None = None
+
+    def result(self, index: int) -> ScoreResult:
+        """ScoreResult of the profile at row ``index`` (same as ``evaluate`` would return)."""
+        if self.veto:
+            return ScoreResult(0.0, veto=self.veto, **self.states)
+        factors = []
+        for label, malus, mask in self.terms:
+            if mask is not None and not mask[index]:
+                continue
+            if label == "Wind Chill":
+                label = f"Wind Chill {self.felt_temperature[index]:.1f}°C"
+            factors.append(Factor(label, float(malus[index])))
+        return ScoreResult(float(self.scores[index]), tuple(factors), **self.states)
+
+
+def evaluate_fleet(inputs: ScoreInputs, profiles: ProfileArrays) -> FleetScores:
+    """Score every profile against one snapshot in a single vectorized pass."""
+    states = classify_inputs(inputs)
+    veto = safety_veto(inputs)
+    count = len(profiles)
+    if veto or not count:
+        return FleetScores(profiles.version, np.zeros(count), states, veto)
+
+    columns = profiles.columns
+    t, v, p = inputs.temperature, inputs.wind_speed, inputs.rain
+    terms: list[tuple[str, np.ndarray, np.ndarray | None]] = []
+
+    # Same factors, in the same order, as evaluate()
+    if inputs.weather == "fog":
+        terms.append(("Fog", -3.0 * columns["fog_ratio"], None))
+    if states["night_mode"] != "day":
+        terms.append(("Night", NIGHT_MODE_MALUS[states["night_mode"]] * columns["night_ratio"], None))
+    if states["solar_glare"] != "safe":
+        terms.append(("Sun Glare", SOLAR_BLINDNESS_MALUS[states["solar_glare"]] * columns["night_ratio"], None))
+
+    total_wind = v + columns["riding_speed"] * 0.1
+    felt = t - total_wind * 0.2 * columns["coef"]
+    chilled = felt < 15
+    if chilled.any():
+        raw_malus = (15 - felt) * 0.2 * columns["surface"]
+        final_malus = raw_malus * columns["equip_coef"] * columns["sens_factor"]
+        terms.append(("Wind Chill", np.where(chilled, -final_malus * columns["cold_ratio"], 0.0), chilled))
+
+    if v > 35:
+        terms.append((f"Wind {v}km/h", -((v - 35) * 0.15 * columns["coef"]) * columns["wind_ratio"], None))
+    if p > 0:
+        terms.append((f"Rain {p}mm", -3.0 * columns["rain_ratio"], None))
+    road_malus = ROAD_STATE_MALUS.get(states["road_state"], 0.0)
+    if road_malus < 0:
+        terms.append((f"Road {states['road_state'].capitalize()}", road_malus * columns["road_state_ratio"], None))
+    if states["temperature_trend"] == "dropping":
+        terms.append(("Temp Dropping", TEMP_TREND_MALUS["dropping"] * columns["cold_ratio"], None))
+    if states["humidity"] == "high":
+        terms.append(("High Humidity", HUMIDITY_MALUS["high"] * columns["humidity_ratio"], None))
+
+    total = np.zeros(count)
+    for _, malus, _ in terms:
+        total += malus
+    scores = round_score(MAX_SCORE + total)
+    return FleetScores(profiles.version, scores, states, None, tuple(terms), felt)
+
+
+class Fleet:
+    """Entries sharing the same input sensors, scored together.
+
+    The fleet registers the shared sensors with the sensor hub once, runs the
+    sun timers once, and fans each change out to its members, so setting up
+    or removing a member is O(1) whatever the number of sensors. A change
+    only marks the snapshot stale: the first member refreshing after it reads,
+    ingests and scores it for everyone, the others pick their row.
+    """
+
+    def __init__(self, hass: HomeAssistant, sources: tuple[str | None, ...]) -> None:
+        self.hass = hass
+        self.sources = tuple(sources)  # temperature, wind, rain, weather
+        self.entity_ids = fleet_key(sources)
+        self.profiles = ProfileArrays()
+        self.history = EngineHistory()
+        self.store = fleet_store(hass, self.entity_ids)  # The shared history is saved once, not per member
+        self.history_ready = False
+        self.passes = 0
+        self._hub = get_sensor_hub(hass)
+        self._sun = get_sun_table(hass)
+        self._listeners: dict[str, Callable[[], None]] = {}
+        self._unsub: Callable[[], None] | None = None
+        self._stale = True
+        self._inputs: ScoreInputs | None = None
+        self._enriched: ScoreInputs | None = None
+        self._scores: FleetScores | None = None
+
+    @property
+    def inputs(self) -> ScoreInputs | None:
+        """Last snapshot read from the shared sensors (None while one is missing)."""
+        return self._inputs
+
+    def result(self, key: str) -> ScoreResult | None:
+        """ScoreResult of member ``key`` for the current snapshot (None while an input is missing)."""
+        if self._stale:
+            self._stale = False
+            self._read_snapshot()
+        if self._enriched is None:
+            return None
+        if self._scores is None or self._scores.version != self.profiles.version:
+            self._scores = evaluate_fleet(self._enriched, self.profiles)
+            self.passes += 1
+        return self._scores.result(self.profiles.index(key))
+
+    def _read_snapshot(self) -> None:
+        """Read the shared sensors and the sun once; a new snapshot is ingested and saved for everyone."""
+        elevation = azimuth = None
+        if self._sun:
+            position = self._sun.position(datetime.now().astimezone())
+            elevation, azimuth = position.elevation, position.azimuth
+        inputs = self._hub.read_inputs(self.sources, elevation, azimuth)
+        if inputs == self._inputs:
+            return
+        self._inputs = inputs
+        self._scores = None
+        self._enriched = None
+        if inputs is not None:
+            self._enriched = self.history.ingest(inputs, datetime.now())
+            # Batched: one write per STORAGE_SAVE_DELAY, however many members and samples
+            self.store.async_delay_save(self.history.as_dict, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_add_listener(self, key: str, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``update_callback`` when the snapshot may have changed; subscribes on the first listener."""
+        self._listeners[key] = update_callback
+        if self._unsub is None:
+            unsubs = [self._hub.async_register(("fleet", self.entity_ids), self.entity_ids, self._handle_state_change)]
+            if self._sun:
+                # The sun moves without any state change: resample it periodically, rebuild the table at midnight
+                unsubs.append(async_track_time_interval(
+                    self.hass, self._handle_sun_tick, timedelta(seconds=SUN_UPDATE_INTERVAL)
+                ))
+                unsubs.append(async_track_time_change(self.hass, self._handle_midnight, hour=0, minute=0, second=0))
+
+            def unsub_all() -> None:
+                for unsub in unsubs:
+                    unsub()
+
+            self._unsub = unsub_all
+
+        @callback
+        def remove_listener() -> None:
+            if self._listeners.get(key) is update_callback:
+                del self._listeners[key]
+            if not self._listeners and self._unsub:
+                self._unsub()
+                self._unsub = None
+
+        return remove_listener
+
+    @callback
+    def _async_changed(self) -> None:
+        self._stale = True
+        for update_callback in list(self._listeners.values()):
+            update_callback()
+
+    @callback
+    def _handle_state_change(self, event: Event) -> None:
+        self._async_changed()
+
+    @callback
+    def _handle_sun_tick(self, now: datetime) -> None:
+        self._async_changed()
+
+    @callback
+    def _handle_midnight(self, now: datetime) -> None:
+        self._sun.refresh(now)
+        self._async_changed()
+
+
+def fleet_key(entity_ids) -> tuple[str, ...]:
+    """Fleet identifier: the shared input entities."""
+    return tuple(entity_id for entity_id in entity_ids if entity_id)
+
+
+def fleet_store(hass: HomeAssistant, entity_ids) -> Store:
+    """Storage file holding the shared history of the fleet reading ``entity_ids``."""
+    digest = hashlib.sha1("|".join(fleet_key(entity_ids)).encode()).hexdigest()[:16]
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.fleet_{digest}.history")
+
+
+def get_fleet(hass: HomeAssistant, entity_ids) -> Fleet:
+    """Return the fleet reading ``entity_ids``, shared by the entries in fleet mode."""
+    key = fleet_key(entity_ids)
+    fleets = hass.data.setdefault(DOMAIN, {}).setdefault("fleets", {})
+    if key not in fleets:
+        fleets[key] = Fleet(hass, tuple(entity_ids))
+    return fleets[key]
+
+
+def release_fleet(hass: HomeAssistant, fleet: Fleet, key: str) -> None:
+    """Remove member ``key``; the fleet is dropped with its last member."""
+    fleet.profiles.remove(key)
+    if not len(fleet.profiles):
+        hass.data.get(DOMAIN, {}).get("fleets", {}).pop(fleet.entity_ids, None)
@@ -0,0 +1,170 @@
+"""Shared hourly forecast cache for BikerSentinel trips.
+
+Trips are scored on the conditions forecast at the departure and return
+times. Forecasts come from the ``weather.get_forecasts`` service and are
+cached once per weather entity in ``hass.data[DOMAIN]``, so the go and return
+trips of every entry using the same weather entity share one fetch.
+
+Fetches for different entities run concurrently, each bounded by
+FORECAST_FETCH_TIMEOUT, and concurrent requests for the same entity share
+one in-flight call. A stale forecast keeps being served while it is
+revalidated in the background; listeners are called once the new one lands.
+Rows are converted once, on arrival, from the units of the weather entity to
+the integration units (``hub.normalize_weather``), so trips and the planner
+read °C, km/h and mm like every other input.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from collections.abc import Callable, Iterable, Mapping
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, FORECAST_FETCH_TIMEOUT, FORECAST_TTL
+from .hub import normalize_weather
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HourlyForecast:
+    """Hourly forecast rows of one weather entity, indexed by start time."""
+
+    def __init__(self, rows: list[dict], stamp=None, fetched_at: float | None = None,
+                 units: Mapping[str, Any] | None = None) -> None:
+        """``units`` are the weather entity attributes giving the units of the rows (None: already converted)."""
+        parsed = []
+        for row in rows:
+            try:
+                start = datetime.fromisoformat(str(row["datetime"])).timestamp()
+            except (KeyError, ValueError):
+                continue
+            parsed.append((start, normalize_weather(row, units) if units else row))
+        parsed.sort(key=lambda item: item[0])
+        self.times = [start for start, _ in parsed]
+        self.rows = [row for _, row in parsed]
+        self.stamp = stamp  # last_updated of the weather state when fetched
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+
+    def at(self, when: datetime) -> dict | None:
+        """Return the row of the hour containing ``when`` (None outside the forecast)."""
+        epoch = when.timestamp()
+        index = bisect_right(self.times, epoch) - 1
+        if index < 0 or epoch - self.times[index] >= 3600:
+            return None
+        return self.rows[index]
+
+
+class ForecastCache:
+    """Hourly forecasts per weather entity, refreshed on state change or after the TTL."""
+
+    def __init__(self, hass: HomeAssistant, ttl: float = FORECAST_TTL,
+                 timeout: float = FORECAST_FETCH_TIMEOUT) -> None:
+        self.hass = hass
+        self.ttl = ttl
+        self.timeout = timeout
+        self._forecasts: dict[str, HourlyForecast] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._listeners: dict[str, list[Callable[[], None]]] = {}
+        self.fetches = 0
+        self.failures = 0
+
+    def get(self, entity_id: str) -> HourlyForecast | None:
+        """Return the cached forecast, fresh or not."""
+        return self._forecasts.get(entity_id)
+
+    def is_fresh(self, entity_id: str) -> bool:
+        """Whether the cached forecast is within the TTL and the entity has not changed since."""
+        forecast = self._forecasts.get(entity_id)
+        if forecast is None or time.monotonic() - forecast.fetched_at >= self.ttl:
+            return False
+        state = self.hass.states.get(entity_id)
+        return state is None or state.last_updated == forecast.stamp
+
+    @callback
+    def async_add_listener(self, entity_ids: Iterable[str], update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``update_callback`` whenever a forecast of ``entity_ids`` is replaced."""
+        entity_ids = list(entity_ids)
+        for entity_id in entity_ids:
+            self._listeners.setdefault(entity_id, []).append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            for entity_id in entity_ids:
+                listeners = self._listeners.get(entity_id, [])
+                if update_callback in listeners:
+                    listeners.remove(update_callback)
+
+        return remove_listener
+
+    async def async_get(self, entity_id: str) -> HourlyForecast | None:
+        """Return the forecast of one entity (see async_get_many)."""
+        return (await self.async_get_many([entity_id]))[entity_id]
+
+    async def async_get_many(self, entity_ids: Iterable[str]) -> dict[str, HourlyForecast | None]:
+        """Return forecasts for several entities, fetching the missing ones concurrently.
+
+        A cached but stale forecast is returned at once and revalidated in the
+        background; only entities with nothing cached are waited for.
+        """
+        entity_ids = list(dict.fromkeys(entity_ids))
+        missing = []
+        for entity_id in entity_ids:
+            if entity_id not in self._forecasts:
+                missing.append(self._fetch_once(entity_id))
+            elif not self.is_fresh(entity_id):
+                self._fetch_once(entity_id)
+        if missing:
+            await asyncio.gather(*missing)
+        return {entity_id: self._forecasts.get(entity_id) for entity_id in entity_ids}
+
+    @callback
+    def async_revalidate(self, entity_id: str) -> None:
+        """Refetch in the background unless the cached forecast is still fresh."""
+        if not self.is_fresh(entity_id):
+            self._fetch_once(entity_id)
+
+    def _fetch_once(self, entity_id: str) -> asyncio.Task:
+        """Single-flight: concurrent requests for one entity share its in-flight fetch."""
+        task = self._inflight.get(entity_id)
+        if task is None:
+            task = self.hass.async_create_task(self._async_fetch(entity_id))
+            self._inflight[entity_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(entity_id, None))
+        return task
+
+    async def _async_fetch(self, entity_id: str) -> None:
+        state = self.hass.states.get(entity_id)
+        self.fetches += 1
+        try:
+            async with asyncio.timeout(self.timeout):
+                response = await self.hass.services.async_call(
+                    "weather", "get_forecasts", {"entity_id": entity_id, "type": "hourly"},
+                    blocking=True, return_response=True,
+                )
+            rows = response.get(entity_id, {}).get("forecast", [])
+        except TimeoutError:
+            self.failures += 1
+            _LOGGER.warning("Hourly forecast of %s timed out after %ss, keeping the cached one", entity_id, self.timeout)
+            return
+        except Exception as e:
+            self.failures += 1
+            _LOGGER.warning("Could not fetch the hourly forecast of %s: %s", entity_id, e)
+            return
+        self._forecasts[entity_id] = HourlyForecast(
+            rows, state.last_updated if state else None, units=state.attributes if state else None
+        )
+        for update_callback in list(self._listeners.get(entity_id, [])):
+            update_callback()
+
+
+def get_forecast_cache(hass: HomeAssistant) -> ForecastCache:
+    """Return the forecast cache shared by all entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "forecasts" not in domain_data:
+        domain_data["forecasts"] = ForecastCache(hass)
+    return domain_data["forecasts"]
@@ -0,0 +1,168 @@
+"""Club ride groups: can every chosen rider ride right now?
+
+A group is its own config entry listing member entries. The group keeps a
+running sum, count and count above the threshold, plus a lazy min-heap of
+member scores, so a member update costs O(log members) and never rescans
+the group.
+"""
+from __future__ import annotations
+
+import heapq
+from collections.abc import Callable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .const import CONF_GROUP_MEMBERS, CONF_GROUP_THRESHOLD, DEFAULT_GROUP_THRESHOLD, DOMAIN
+from .coordinator import get_coordinators, get_option
+
+
+class RideGroupStats:
+    """Incremental min / mean / count above threshold over member scores."""
+
+    def __init__(self, threshold: float = DEFAULT_GROUP_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._scores: dict[str, float | None] = {}
+        self._heap: list[tuple[float, str]] = []  # may hold outdated entries, skipped lazily
+        self._sum = 0.0
+        self.count = 0  # members with a score
+        self.above = 0  # members scoring above the threshold
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _account(self, score: float | None, sign: int) -> None:
+        if score is None:
+            return
+        self._sum += sign * score
+        self.count += sign
+        if score > self.threshold:
+            self.above += sign
+
+    def update(self, key: str, score: float | None) -> bool:
+        """Set the score of member ``key`` (None while it has no score); return whether it changed."""
+        previous = self._scores.get(key)
+        if key in self._scores and previous == score:
+            return False
+        self._account(previous, -1)
+        self._scores[key] = score
+        self._account(score, 1)
+        if score is not None:
+            heapq.heappush(self._heap, (score, key))
+            if len(self._heap) > 2 * len(self._scores) + 16:
+                self._compact()
+        return True
+
+    def remove(self, key: str) -> None:
+        """Forget member ``key``."""
+        if key in self._scores:
+            self._account(self._scores.pop(key), -1)
+
+    def _compact(self) -> None:
+        """Drop outdated heap entries (O(members), amortized over the updates that made them)."""
+        self._heap = [(score, key) for key, score in self._scores.items() if score is not None]
+        heapq.heapify(self._heap)
+
+    def _top(self) -> tuple[float, str] | None:
+        heap = self._heap
+        while heap and self._scores.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    @property
+    def minimum(self) -> float | None:
+        """Lowest member score."""
+        top = self._top()
+        return top[0] if top else None
+
+    @property
+    def limiting(self) -> str | None:
+        """Member with the lowest score."""
+        top = self._top()
+        return top[1] if top else None
+
+    @property
+    def mean(self) -> float | None:
+        """Mean member score."""
+        return self._sum / self.count if self.count else None
+
+
+class RideGroupCoordinator:
+    """Follow the member coordinators of one club ride entry and aggregate their scores."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self.entry = entry
+        self.members: list[str] = list(get_option(entry, CONF_GROUP_MEMBERS, None) or [])
+        self.stats = RideGroupStats(float(get_option(entry, CONF_GROUP_THRESHOLD, DEFAULT_GROUP_THRESHOLD)))
+        self.titles: dict[str, str] = {}
+        self.writes = 0
+        self.writes_skipped = 0
+        self._member_set = set(self.members)
+        self._unsub_members: dict[str, Callable[[], None]] = {}
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def data(self) -> RideGroupStats:
+        """The running aggregate, read by the group entity."""
+        return self.stats
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Register an entity callback; returns a function removing it."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_start(self) -> None:
+        """Follow the members already running; later ones attach themselves when they start."""
+        self.hass.data.setdefault(DOMAIN, {}).setdefault("groups", {})[self.entry.entry_id] = self
+        for coordinator in list(get_coordinators(self.hass).values()):
+            self.async_attach(coordinator)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop following the members."""
+        self.hass.data.get(DOMAIN, {}).get("groups", {}).pop(self.entry.entry_id, None)
+        for unsub in self._unsub_members.values():
+            unsub()
+        self._unsub_members.clear()
+        self._listeners.clear()
+
+    @callback
+    def async_attach(self, coordinator) -> None:
+        """Follow a member coordinator (ignored if it is not a member)."""
+        entry_id = coordinator.entry.entry_id
+        if entry_id not in self._member_set or entry_id in self._unsub_members:
+            return
+        self.titles[entry_id] = coordinator.entry.title
+        self._unsub_members[entry_id] = coordinator.async_add_listener(
+            lambda: self._handle_member_update(entry_id, coordinator)
+        )
+        self._handle_member_update(entry_id, coordinator)
+
+    @callback
+    def async_detach(self, entry_id: str) -> None:
+        """Stop following a member that is unloading."""
+        unsub = self._unsub_members.pop(entry_id, None)
+        if unsub is None:
+            return
+        unsub()
+        self.stats.remove(entry_id)
+        self._notify()
+
+    @callback
+    def _handle_member_update(self, entry_id: str, coordinator) -> None:
+        score = coordinator.data.score
+        if self.stats.update(entry_id, score.score if score else None):
+            self._notify()
+
+    def _notify(self) -> None:
+        for update_callback in list(self._listeners):
+            update_callback()
@@ -0,0 +1,314 @@
+"""Sensor history buffers feeding the BikerSentinel scoring kernel."""
+from __future__ import annotations
+
+import base64
+import heapq
+import math
+import sys
+from array import array
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+from .const import PRECIP_HISTORY_WINDOW, ROAD_DRYING_RATE, ROAD_WATER_MAX, TEMP_HISTORY_WINDOW
+from .engine import ScoreInputs
+
+
+def _pack(typecode: str, values) -> str:
+    """Encode numbers as a base64 little-endian packed array."""
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _unpack(typecode: str, data: str) -> array:
+    """Decode a string produced by _pack."""
+    packed = array(typecode)
+    packed.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed
+
+
+class SurfaceWater:
+    """Water left on the road surface, updated incrementally per sample.
+
+    The rain reading is a rate (mm/h). Between two samples the film grows by
+    the rain rate and shrinks by an evaporation rate driven by the
+    temperature, wind and sun elevation, both as seen at the previous sample,
+    so the film only depends on elapsed time and not on how often samples
+    arrive. A cumulative sensor gives accumulated totals instead: the rain
+    rate is the difference of two totals divided by the time elapsed between
+    them. Each sample is O(1) and the whole state is a handful of numbers, so
+    no rainfall window has to be kept.
+    """
+
+    def __init__(self) -> None:
+        self.water = 0.0  # mm
+        self.rain = 0.0  # mm/h since the last rain sample
+        self.total: float | None = None  # mm, last reading of a cumulative sensor
+        self._total_epoch: float | None = None  # epoch seconds of that reading
+        self._last: float | None = None  # epoch seconds
+        self._drying = 0.0  # mm/h since the last sample
+
+    @staticmethod
+    def drying_rate(temperature: float, wind_speed: float, sun_elevation: float | None) -> float:
+        """Evaporation rate in mm/h for the given conditions."""
+        rate = ROAD_DRYING_RATE["base"]
+        rate += ROAD_DRYING_RATE["temp"] * max(temperature, 0.0)
+        rate += ROAD_DRYING_RATE["wind"] * max(wind_speed, 0.0)
+        if sun_elevation is not None and sun_elevation > 0:
+            rate += ROAD_DRYING_RATE["sun"] * math.sin(math.radians(sun_elevation))
+        return rate
+
+    def add(self, when: datetime, rain: float | None, temperature: float, wind_speed: float = 0.0,
+            sun_elevation: float | None = None, total: float | None = None) -> float:
+        """Integrate rain and drying since the last sample, then take the new rates; return the water (mm).
+
+        ``rain`` is the current rain rate in mm/h (None keeps the previous one).
+        ``total`` is the reading of a cumulative sensor (mm): the water fallen
+        since the previous total, over the time since it, sets the rain rate.
+        """
+        epoch = when.timestamp()
+        if total is not None and (self._total_epoch is None or epoch > self._total_epoch):
+            if self.total is not None:
+                # A total below the previous one is a reset (daily counter): it all fell since then
+                fallen = total - self.total if total >= self.total else total
+                self.rain = fallen / ((epoch - self._total_epoch) / 3600)
+            self.total, self._total_epoch = total, epoch
+        if self._last is not None and epoch > self._last:
+            # Net rate is constant over the interval, so clamping at the end is exact
+            hours = (epoch - self._last) / 3600
+            self.water = min(ROAD_WATER_MAX, max(0.0, self.water + (self.rain - self._drying) * hours))
+        if self._last is None or epoch > self._last:
+            self._last = epoch
+        if rain is not None:
+            self.rain = max(rain, 0.0)
+        self._drying = self.drying_rate(temperature, wind_speed, sun_elevation)
+        return self.water
+
+    def as_dict(self) -> dict:
+        """Storage form: the state numbers."""
+        if self._last is None:
+            return {}
+        return {"epoch": self._last, "water": self.water, "rain": self.rain, "drying": self._drying,
+                "total": self.total, "total_epoch": self._total_epoch}
+
+    def restore(self, data: dict) -> None:
+        """Load a dict produced by as_dict."""
+        if not data:
+            return
+        self._last = data["epoch"]
+        self.water = data["water"]
+        self.rain = data.get("rain", 0.0)
+        self._drying = data["drying"]
+        self.total = data.get("total")
+        self._total_epoch = data.get("total_epoch")
+
+
+class TemperatureTrend:
+    """Streaming temperature trend over the trend window (TEMP_HISTORY_WINDOW x 10 min).
+
+    Keeps running sums for a least-squares slope and monotonic deques for the
+    window min/max, so each sample costs O(1) amortized regardless of the
+    window length.
+    """
+
+    _REBASE_HOURS = 24.0  # Re-center time offsets to keep the sums well conditioned
+
+    def __init__(self, window_slots: int = TEMP_HISTORY_WINDOW) -> None:
+        self._window = window_slots * 10 / 60  # hours
+        self._clear()
+
+    def _clear(self) -> None:
+        self._samples: deque[tuple[float, float]] = deque()  # (hours since base, °C)
+        self._max: deque[tuple[float, float]] = deque()  # decreasing temperatures
+        self._min: deque[tuple[float, float]] = deque()  # increasing temperatures
+        self._base: float | None = None  # epoch seconds
+        self._n = 0
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+
+    def _accumulate(self, t: float, y: float, sign: int) -> None:
+        self._n += sign
+        self._sum_t += sign * t
+        self._sum_y += sign * y
+        self._sum_tt += sign * t * t
+        self._sum_ty += sign * t * y
+
+    def _rebase(self, base: float) -> None:
+        """Shift every stored offset to a new base epoch (rare, O(window))."""
+        shift = (self._base - base) / 3600
+        self._base = base
+        self._samples = deque((t + shift, y) for t, y in self._samples)
+        self._max = deque((t + shift, y) for t, y in self._max)
+        self._min = deque((t + shift, y) for t, y in self._min)
+        self._n = 0
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+        for t, y in self._samples:
+            self._accumulate(t, y, 1)
+
+    def add(self, when: datetime, temperature: float) -> None:
+        """Record a temperature sample and expire those outside the window."""
+        epoch = when.timestamp()
+        if self._base is None:
+            self._base = epoch
+        elif (epoch - self._base) / 3600 > self._REBASE_HOURS:
+            self._rebase(epoch)
+        self._push((epoch - self._base) / 3600, temperature)
+
+    def _push(self, t: float, temperature: float) -> None:
+        self._samples.append((t, temperature))
+        self._accumulate(t, temperature, 1)
+        while self._max and self._max[-1][1] <= temperature:
+            self._max.pop()
+        self._max.append((t, temperature))
+        while self._min and self._min[-1][1] >= temperature:
+            self._min.pop()
+        self._min.append((t, temperature))
+
+        cutoff = t - self._window
+        while self._samples and self._samples[0][0] <= cutoff:
+            old_t, old_y = self._samples.popleft()
+            self._accumulate(old_t, old_y, -1)
+        while self._max[0][0] <= cutoff:
+            self._max.popleft()
+        while self._min[0][0] <= cutoff:
+            self._min.popleft()
+
+    def as_dict(self) -> dict:
+        """Compact storage form: base epoch plus packed offset (h) and temperature columns."""
+        if self._base is None:
+            return {}
+        return {
+            "epoch": self._base,
+            "t": _pack("f", (t for t, _ in self._samples)),
+            "temp": _pack("f", (y for _, y in self._samples)),
+        }
+
+    def restore(self, data: dict) -> None:
+        """Load a dict produced by as_dict."""
+        if not data:
+            return
+        self._clear()
+        self._base = data["epoch"]
+        for t, y in zip(_unpack("f", data["t"]), _unpack("f", data["temp"])):
+            self._push(t, y)
+
+    @property
+    def rate(self) -> float | None:
+        """Least-squares slope in °C/h, None with fewer than 2 samples."""
+        if self._n < 2:
+            return None
+        denominator = self._n * self._sum_tt - self._sum_t * self._sum_t
+        if denominator <= 1e-12:
+            return None
+        return (self._n * self._sum_ty - self._sum_t * self._sum_y) / denominator
+
+    @property
+    def drop(self) -> float:
+        """How far the latest temperature is below the window maximum (°C)."""
+        if not self._samples:
+            return 0.0
+        return self._max[0][1] - self._samples[-1][1]
+
+    @property
+    def spread(self) -> float:
+        """Window max minus window min (°C)."""
+        if not self._samples:
+            return 0.0
+        return self._max[0][1] - self._min[0][1]
+
+
+class EngineHistory:
+    """Per-entry history; ingestion is the only step that mutates it."""
+
+    def __init__(self) -> None:
+        self.surface = SurfaceWater()
+        self.temperature = TemperatureTrend()
+        self.last_sample: float | None = None  # epoch seconds of the newest ingested sample
+        self._last_temperature: float | None = None  # latest replayed temperature
+
+    def ingest(self, inputs: ScoreInputs, when: datetime) -> ScoreInputs:
+        """Record a new sensor snapshot and return it enriched with history summaries."""
+        total = inputs.rain_total
+        self.surface.add(
+            when, inputs.rain if total is None else None, inputs.temperature, inputs.wind_speed,
+            inputs.sun_elevation, total=total,
+        )
+        self.temperature.add(when, inputs.temperature)
+        self.last_sample = when.timestamp()
+        return replace(
+            inputs,
+            rain=inputs.rain if total is None else self.surface.rain,
+            surface_water=self.surface.water,
+            temp_rate=self.temperature.rate,
+            temp_drop=self.temperature.drop,
+        )
+
+    def backfill_start(self, now: datetime) -> datetime:
+        """Start of the span missing from the buffers: the window, or since the newest sample."""
+        start = now - timedelta(hours=PRECIP_HISTORY_WINDOW)
+        if self.last_sample is not None:
+            start = max(start, datetime.fromtimestamp(self.last_sample, tz=now.tzinfo))
+        return start
+
+    def replay(self, temperatures: Iterable[tuple[datetime, float]],
+               rainfall: Iterable[tuple[datetime, float]], cumulative: bool = False) -> None:
+        """Stream past samples (each series in time order) into the buffers.
+
+        Both series are merged by time so the road dries at the temperature
+        of the moment; wind and sun are not replayed (slower, safer drying).
+        ``cumulative`` tells that the rainfall series holds accumulated totals.
+        """
+        series = heapq.merge(
+            ((when, value, True) for when, value in temperatures),
+            ((when, value, False) for when, value in rainfall),
+            key=lambda row: row[0],
+        )
+        for when, value, is_temperature in series:
+            if is_temperature:
+                self.add_temperature(when, value)
+            else:
+                self.add_rain(when, value, cumulative=cumulative)
+
+    def add_temperature(self, when: datetime, temperature: float, wind_speed: float = 0.0) -> None:
+        """Replay one past temperature sample (the rain rate carries on)."""
+        self._last_temperature = temperature
+        self.temperature.add(when, temperature)
+        self.surface.add(when, None, temperature, wind_speed)
+        self.last_sample = max(self.last_sample or 0.0, when.timestamp())
+
+    def add_rain(self, when: datetime, rain: float, wind_speed: float = 0.0, cumulative: bool = False) -> None:
+        """Replay one past rain sample, a rate or a ``cumulative`` total (at the latest replayed temperature)."""
+        temperature = self._last_temperature if self._last_temperature is not None else 0.0
+        if cumulative:
+            self.surface.add(when, None, temperature, wind_speed, total=rain)
+        else:
+            self.surface.add(when, rain, temperature, wind_speed)
+        self.last_sample = max(self.last_sample or 0.0, when.timestamp())
+
+    def summarize(self, inputs: ScoreInputs, when: datetime) -> ScoreInputs:
+        """Enrich a snapshot with the history summaries at ``when``; the rain rate comes from add_rain."""
+        self.surface.add(when, None, inputs.temperature, inputs.wind_speed, inputs.sun_elevation)
+        return replace(
+            inputs,
+            surface_water=self.surface.water,
+            temp_rate=self.temperature.rate,
+            temp_drop=self.temperature.drop,
+        )
+
+    def as_dict(self) -> dict:
+        """Return the storage form of all buffers."""
+        return {
+            "last": self.last_sample,
+            "surface": self.surface.as_dict(),
+            "temperature": self.temperature.as_dict(),
+        }
+
+    def restore(self, data: dict) -> None:
+        """Restore buffers saved with as_dict."""
+        self.last_sample = data.get("last")
+        self.surface.restore(data.get("surface", {}))
+        self.temperature.restore(data.get("temperature", {}))
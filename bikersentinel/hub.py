@@ -0,0 +1,204 @@
+"""Shared sensor subscriptions for all BikerSentinel entries.
+
+Entries (and fleets) register the set of source entities they depend on.
+The hub subscribes once per source entity, parses and unit-normalizes each
+new state once into a ``SensorReading``, and fans the change out to every
+dependent. Entities nobody depends on any more are unsubscribed.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import DOMAIN, PRECIP_TOTAL_STATE_CLASSES, PRECIP_TOTAL_UNITS, UNIT_CONVERSIONS
+from .engine import ScoreInputs
+
+UNAVAILABLE_STATES = ("unknown", "unavailable")
+# Numeric weather attributes (and forecast row keys) with the weather entity attribute giving their unit
+WEATHER_UNITS = (
+    ("temperature", "temperature_unit"),
+    ("wind_speed", "wind_speed_unit"),
+    ("precipitation", "precipitation_unit"),
+)
+
+
+def normalize(value: Any, unit: str | None) -> float | None:
+    """Parse a number and convert it to the integration units (°C, km/h, mm)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    scale, offset = UNIT_CONVERSIONS.get(unit, (1.0, 0.0))
+    return number * scale + offset
+
+
+def normalize_weather(values: Mapping[str, Any], units: Mapping[str, Any]) -> dict[str, Any]:
+    """Copy of weather ``values`` (state attributes or a forecast row) in integration units.
+
+    ``units`` holds the ``*_unit`` attributes of the weather entity; values without a unit are kept.
+    """
+    values = dict(values)
+    for key, unit_key in WEATHER_UNITS:
+        if values.get(key) is not None and units.get(unit_key):
+            values[key] = normalize(values[key], units[unit_key])
+    return values
+
+
+@dataclass(frozen=True, slots=True)
+class SensorReading:
+    """Parsed state of one source entity.
+
+    ``value`` is the numeric state in integration units (None for a weather
+    entity or a non-numeric state). Weather entities keep their condition as
+    ``state`` and get ``temperature``/``wind_speed`` attributes normalized, so
+    a reading can stand in for the state object wherever one is analyzed.
+    """
+
+    entity_id: str
+    state: str
+    value: float | None = None
+    attributes: Mapping[str, Any] = field(default_factory=dict)
+    last_updated: datetime | None = None
+
+    @property
+    def available(self) -> bool:
+        """Whether the entity reports a usable state."""
+        return self.state not in UNAVAILABLE_STATES
+
+    @property
+    def cumulative(self) -> bool:
+        """Whether the value is accumulated precipitation (a depth in mm) rather than a rate."""
+        return (
+            self.attributes.get("state_class") in PRECIP_TOTAL_STATE_CLASSES
+            or self.attributes.get("unit_of_measurement") in PRECIP_TOTAL_UNITS
+        )
+
+    @classmethod
+    def from_state(cls, entity_id: str, state) -> SensorReading:
+        """Parse the Home Assistant state object of ``entity_id``."""
+        attributes = dict(state.attributes)
+        value = None
+        if entity_id.startswith("weather."):
+            attributes = normalize_weather(attributes, attributes)
+        elif state.state not in UNAVAILABLE_STATES:
+            value = normalize(state.state, attributes.get("unit_of_measurement"))
+        return cls(entity_id, state.state, value, attributes, state.last_updated)
+
+
+class SensorHub:
+    """One subscription and one parsed reading per source entity, shared by every dependent."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._readings: dict[str, SensorReading | None] = {}
+        self._dependents: dict[str, dict[Hashable, Callable[[Event], None]]] = {}
+        self._unsubs: dict[str, Callable[[], None]] = {}
+        self.parsed = 0
+
+    def get(self, entity_id: str) -> SensorReading | None:
+        """Current reading of ``entity_id`` (parsed on the fly if nobody subscribed to it)."""
+        if entity_id in self._readings:
+            return self._readings[entity_id]
+        return self._parse(entity_id, self.hass.states.get(entity_id))
+
+    def _parse(self, entity_id: str, state) -> SensorReading | None:
+        if state is None:
+            return None
+        self.parsed += 1
+        return SensorReading.from_state(entity_id, state)
+
+    def read_inputs(self, sources: tuple[str | None, ...], sun_elevation: float | None = None,
+                    sun_azimuth: float | None = None) -> ScoreInputs | None:
+        """Frozen input snapshot from the temperature, wind, rain and weather ``sources`` (None if one is missing)."""
+        ent_temp, ent_wind, ent_rain, ent_weather = sources
+        s_temp = self.get(ent_temp)
+        s_wind = self.get(ent_wind)
+        s_rain = self.get(ent_rain)
+
+        # Validate data availability
+        if not s_temp or not s_wind or not s_rain:
+            return None
+        if s_temp.value is None or s_wind.value is None:
+            return None
+
+        weather = "clear"
+        humidity = None
+        if ent_weather:
+            w_state = self.get(ent_weather)
+            if w_state:
+                if w_state.available:
+                    weather = w_state.state
+                if w_state.attributes.get("humidity"):
+                    humidity = float(w_state.attributes["humidity"])
+
+        rain = s_rain.value if s_rain.value is not None else 0.0
+        rain_total = None
+        if s_rain.cumulative and s_rain.value is not None:
+            # Accumulated precipitation: the history differences it into a rate
+            rain, rain_total = 0.0, s_rain.value
+
+        return ScoreInputs(
+            temperature=s_temp.value,
+            wind_speed=s_wind.value,
+            rain=rain,
+            weather=weather,
+            humidity=humidity,
+            sun_elevation=sun_elevation,
+            sun_azimuth=sun_azimuth,
+            rain_total=rain_total,
+        )
+
+    @property
+    def subscriptions(self) -> list[str]:
+        """Entities currently subscribed."""
+        return list(self._unsubs)
+
+    @callback
+    def async_register(self, key: Hashable, entity_ids: Iterable[str],
+                       update_callback: Callable[[Event], None]) -> Callable[[], None]:
+        """Call ``update_callback`` when any of ``entity_ids`` changes; returns the release function."""
+        entity_ids = list(dict.fromkeys(entity_id for entity_id in entity_ids if entity_id))
+        for entity_id in entity_ids:
+            self._dependents.setdefault(entity_id, {})[key] = update_callback
+            if entity_id not in self._unsubs:
+                self._readings[entity_id] = self._parse(entity_id, self.hass.states.get(entity_id))
+                self._unsubs[entity_id] = async_track_state_change_event(
+                    self.hass, [entity_id], self._handle_state_change
+                )
+
+        @callback
+        def release() -> None:
+            for entity_id in entity_ids:
+                dependents = self._dependents.get(entity_id, {})
+                if dependents.get(key) is update_callback:
+                    del dependents[key]
+                if not dependents:
+                    self._dependents.pop(entity_id, None)
+                    self._readings.pop(entity_id, None)
+                    unsub = self._unsubs.pop(entity_id, None)
+                    if unsub:
+                        unsub()
+
+        return release
+
+    @callback
+    def _handle_state_change(self, event: Event) -> None:
+        entity_id = event.data.get("entity_id")
+        if entity_id not in self._dependents:
+            return
+        self._readings[entity_id] = self._parse(entity_id, event.data.get("new_state"))
+        for update_callback in list(self._dependents[entity_id].values()):
+            update_callback(event)
+
+
+def get_sensor_hub(hass: HomeAssistant) -> SensorHub:
+    """Return the sensor hub shared by all entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "hub" not in domain_data:
+        domain_data["hub"] = SensorHub(hass)
+    return domain_data["hub"]
@@ -0,0 +1,189 @@
+"""Best departure window over the hourly forecast.
+
+The forecast is expanded once to a per-minute grid (numeric fields linearly
+interpolated between hours, the condition held for its hour) and scored with
+the trip weather rules of ``analyze_weather_conditions`` (the shared TRIP_*
+constants) in one vectorized pass, plus the kernel's night and sun-glare
+malus for the sun position of every minute when a sun table is given. Ride
+scores are the mean over the ride duration, taken from prefix sums, so every
+candidate departure minute costs O(1). Queries only slice the precomputed
+scores to the horizon and pick the best and runner-up windows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from .const import (
+    DEFAULT_RIDE_DURATION,
+    DEPARTURE_HORIZON,
+    NIGHT_MODE_MALUS,
+    SOLAR_BLINDNESS_MALUS,
+    SOLAR_BLINDNESS_THRESHOLD,
+    TRIP_COLD_RULE,
+    TRIP_CONDITION_MALUS,
+    TRIP_HOT_RULE,
+    TRIP_HUMIDITY_RULE,
+    TRIP_WIND_RULE,
+)
+from .engine import DANGEROUS_WEATHER, MAX_SCORE, RiderProfile
+from .forecast import HourlyForecast
+from .sun import SunTable
+
+
+@dataclass(frozen=True, slots=True)
+class DepartureWindow:
+    """One candidate ride."""
+
+    departure: datetime
+    arrival: datetime
+    score: float
+
+
+@dataclass(frozen=True, slots=True)
+class DeparturePlan:
+    """Best ride window in the horizon and the best one not overlapping it."""
+
+    best: DepartureWindow | None = None
+    runner_up: DepartureWindow | None = None
+
+    def as_attributes(self) -> dict:
+        """Return the Best Departure entity state attributes."""
+        best, runner_up = self.best, self.runner_up
+        return {
+            "score": best.score if best else None,
+            "arrival": best.arrival.isoformat() if best else None,
+            "runner_up_departure": runner_up.departure.isoformat() if runner_up else None,
+            "runner_up_score": runner_up.score if runner_up else None,
+        }
+
+
+def _column(rows: list[dict], key: str) -> np.ndarray:
+    values = []
+    for row in rows:
+        try:
+            values.append(float(row[key]))
+        except (KeyError, TypeError, ValueError):
+            values.append(np.nan)
+    return np.array(values, dtype=float)
+
+
+def sun_malus(epochs: np.ndarray, sun: SunTable, profile: RiderProfile) -> np.ndarray:
+    """Night and sun-glare malus of the kernel at each epoch.
+
+    Vectorized ``classify_night`` and ``classify_glare``: same thresholds, same categories.
+    """
+    elevation, azimuth = sun.positions(epochs)
+    night = np.select(
+        [elevation > 10, elevation > 0, elevation > -6],
+        [NIGHT_MODE_MALUS["day"], NIGHT_MODE_MALUS["twilight"], NIGHT_MODE_MALUS["civil_twilight"]],
+        NIGHT_MODE_MALUS["night"],
+    )
+    diff = np.abs(azimuth - 180)
+    diff = np.where(diff > 180, 360 - diff, diff)
+    glare = np.where(
+        (diff < SOLAR_BLINDNESS_THRESHOLD) & (elevation > 5),
+        np.where(diff < 30, SOLAR_BLINDNESS_MALUS["warning"], SOLAR_BLINDNESS_MALUS["caution"]),
+        SOLAR_BLINDNESS_MALUS["safe"],
+    )
+    return night * profile.night_ratio + glare * profile.night_ratio
+
+
+def minute_scores(forecast: HourlyForecast, profile: RiderProfile,
+                  sun: SunTable | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Per-minute weather score (0-10) and dangerous flag over the forecast span."""
+    times = np.array(forecast.times, dtype=float)
+    minutes = np.arange(times[0], times[-1] + 3600, 60.0)
+    hour = np.searchsorted(times, minutes, side="right") - 1
+
+    # Condition malus per forecast row, then held for the hour
+    ratios = {"rainy": profile.rain_ratio, "fog": profile.fog_ratio, "cloudy": profile.cloudy_ratio}
+    conditions = [row.get("condition") for row in forecast.rows]
+    condition_malus = np.array([
+        TRIP_CONDITION_MALUS[condition] * ratios[condition] if condition in TRIP_CONDITION_MALUS else 0.0
+        for condition in conditions
+    ])
+    dangerous = np.array([condition in DANGEROUS_WEATHER for condition in conditions])[hour]
+
+    def interpolated(key: str) -> np.ndarray:
+        values = _column(forecast.rows, key)
+        known = ~np.isnan(values)
+        if not known.any():
+            return np.full(minutes.shape, np.nan)
+        return np.interp(minutes, times[known], values[known])
+
+    temperature = interpolated("temperature")
+    wind = interpolated("wind_speed")
+    humidity = interpolated("humidity")
+
+    malus = condition_malus[hour]
+    malus += np.where(temperature < TRIP_COLD_RULE[0], TRIP_COLD_RULE[1] * profile.cold_ratio,
+                      np.where(temperature > TRIP_HOT_RULE[0], TRIP_HOT_RULE[1] * profile.hot_ratio, 0.0))
+    malus += np.where(wind > TRIP_WIND_RULE[0], TRIP_WIND_RULE[1] * profile.wind_ratio, 0.0)
+    malus += np.where(humidity > TRIP_HUMIDITY_RULE[0], TRIP_HUMIDITY_RULE[1] * profile.humidity_ratio, 0.0)
+    if sun is not None:
+        malus += sun_malus(minutes, sun, profile)
+    scores = np.clip(MAX_SCORE + malus, 0.0, MAX_SCORE)
+    return scores, dangerous
+
+
+class DepartureOptimizer:
+    """Ride scores for every departure minute of one forecast, computed once."""
+
+    def __init__(self, forecast: HourlyForecast, profile: RiderProfile,
+                 ride_minutes: int = DEFAULT_RIDE_DURATION, sun: SunTable | None = None) -> None:
+        self.forecast = forecast
+        self.profile = profile
+        self.ride_minutes = max(1, int(ride_minutes))
+        self.sun = sun
+        self.start = forecast.times[0] if forecast.times else None  # epoch of the first minute
+        self.scores = np.empty(0)
+        if self.start is None:
+            return
+
+        per_minute, dangerous = minute_scores(forecast, profile, sun)
+        duration = self.ride_minutes
+        if len(per_minute) < duration:
+            return
+        # Window sums from prefix sums: ride starting at minute i covers [i, i + duration)
+        score_sum = np.concatenate(([0.0], np.cumsum(per_minute)))
+        danger_sum = np.concatenate(([0], np.cumsum(dangerous)))
+        rides = (score_sum[duration:] - score_sum[:-duration]) / duration
+        vetoed = (danger_sum[duration:] - danger_sum[:-duration]) > 0
+        self.scores = np.where(vetoed, 0.0, rides)
+
+    def matches(self, forecast: HourlyForecast, profile: RiderProfile, ride_minutes: int,
+                sun: SunTable | None = None) -> bool:
+        """Whether this optimizer was built for the same forecast, profile, ride and sun table."""
+        return (
+            self.forecast is forecast and self.profile == profile
+            and self.ride_minutes == max(1, int(ride_minutes)) and self.sun is sun
+        )
+
+    def _window(self, index: int, tz) -> DepartureWindow:
+        departure = datetime.fromtimestamp(self.start + index * 60, tz=tz)
+        return DepartureWindow(
+            departure, departure + timedelta(minutes=self.ride_minutes), round(float(self.scores[index]), 1)
+        )
+
+    def plan(self, now: datetime, horizon_hours: float = DEPARTURE_HORIZON) -> DeparturePlan:
+        """Best departure in [now, now + horizon] and the best one not overlapping it."""
+        if not len(self.scores):
+            return DeparturePlan()
+        tz = now.tzinfo or timezone.utc
+        first = max(0, int(np.ceil((now.timestamp() - self.start) / 60)))
+        last = min(len(self.scores), int((now.timestamp() + horizon_hours * 3600 - self.start) // 60) + 1)
+        if first >= last:
+            return DeparturePlan()
+
+        candidates = self.scores[first:last]
+        best = int(np.argmax(candidates))
+        offsets = np.arange(len(candidates))
+        others = np.where(np.abs(offsets - best) >= self.ride_minutes, candidates, -np.inf)
+        runner_up = int(np.argmax(others))
+        return DeparturePlan(
+            self._window(first + best, tz),
+            self._window(first + runner_up, tz) if np.isfinite(others[runner_up]) else None,
+        )
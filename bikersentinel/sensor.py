@@ -2,8 +2,8 @@
 from __future__ import annotations
 
 import logging
-import math
-from datetime import datetime, time
+from datetime import datetime, timedelta
+from functools import partial
 
 from homeassistant.components.sensor import (
     SensorEntity,
@@ -11,7 +11,8 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import (
@@ -33,6 +34,15 @@ from .const import (
     CONF_SENSOR_WIND,
     CONF_SENSOR_RAIN,
     CONF_WEATHER_ENTITY,
+    CONF_GROUP_MEMBERS,
+    EVALUATE_MAX_ROWS,
+    BACKTEST_MAX_DAYS,
+    DEFAULT_BACKTEST_STEP,
+    DEFAULT_GROUP_THRESHOLD,
+    SWEEP_CHUNK_CELLS,
+    SWEEP_MAX_GRID_VALUES,
+    SWEEP_MAX_ROWS,
+    SWEEP_MAX_VECTORS,
     CONF_TRIP_ENABLED,
     CONF_TRIP_HOME_WEATHER,
     CONF_TRIP_OFFICE_WEATHER,
@@ -121,6 +131,19 @@ from .const import (
     DEFAULT_ROAD_STATE_RATIO,
 )
 
+from .backtest import Backtest, BacktestInputs, async_run_backtest
+from .coordinator import (
+    RATIO_FIELDS,
+    BikerSentinelCoordinator,
+    EntrySnapshot,
+    profile_from_entry,
+    profile_from_settings,
+)
+from .engine import ScoreInputs, evaluate_batch
+from .group import RideGroupCoordinator
+from .sun import SunTable, get_sun_table
+from .sweep import RATIO_NAMES, grid_size, ratio_grid, ratio_vectors, sweep
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -139,7 +162,10 @@ class BikerSentinelConfigService:
             "set_malus_ratios",
             self.async_handle_set_malus_ratios,
             schema=vol.Schema({
-                vol.Required("entry_id"): str,  # Specific entry to modify
+                # Entries to modify: one id, a list of ids, or every rider entry of a bike type
+                vol.Exclusive("entry_id", "target"): str,
+                vol.Exclusive("entry_ids", "target"): vol.All([str], vol.Length(min=1)),
+                vol.Exclusive("bike_type", "target"): vol.In(MACHINE_TYPES),
                 vol.Optional("rain_ratio"): float,
                 vol.Optional("fog_ratio"): float,
                 vol.Optional("cloudy_ratio"): float,
@@ -151,42 +177,259 @@ class BikerSentinelConfigService:
                 vol.Optional("road_state_ratio"): float,
             })
         )
+        row_schema = vol.Schema({
+            vol.Required("temperature"): vol.Coerce(float),
+            vol.Required("wind_speed"): vol.Coerce(float),
+            vol.Optional("rain"): vol.Coerce(float),
+            vol.Optional("weather"): str,
+            vol.Optional("humidity"): vol.Coerce(float),
+            vol.Optional("sun_elevation"): vol.Coerce(float),
+            vol.Optional("sun_azimuth"): vol.Coerce(float),
+            vol.Optional("surface_water"): vol.Coerce(float),
+            vol.Optional("temp_rate"): vol.Coerce(float),
+            vol.Optional("temp_drop"): vol.Coerce(float),
+        })
+        profile_schema = vol.Schema({
+            vol.Optional(CONF_HEIGHT): vol.Coerce(int),
+            vol.Optional(CONF_WEIGHT): vol.Coerce(int),
+            vol.Optional(CONF_BIKE_TYPE): vol.In(MACHINE_TYPES),
+            vol.Optional(CONF_EQUIPMENT): vol.In(EQUIPMENT_LEVELS),
+            vol.Optional(CONF_SENSITIVITY): vol.All(vol.Coerce(int), vol.Range(min=1, max=5)),
+            vol.Optional(CONF_RIDING_CONTEXT): vol.In(list(RIDING_CONTEXTS)),
+            **{vol.Optional(field): vol.Coerce(float) for field, _ in RATIO_FIELDS.values()},
+        })
+        self.hass.services.async_register(
+            DOMAIN,
+            "evaluate",
+            self.async_handle_evaluate,
+            schema=vol.Schema({
+                vol.Exclusive("entry_id", "profile"): str,
+                vol.Exclusive("profile", "profile"): profile_schema,
+                vol.Required("rows"): vol.All([row_schema], vol.Length(min=1, max=EVALUATE_MAX_ROWS)),
+            }),
+            supports_response=SupportsResponse.ONLY,
+        )
+        self.hass.services.async_register(
+            DOMAIN,
+            "backtest",
+            self.async_handle_backtest,
+            schema=vol.Schema({
+                vol.Required("entry_id"): str,
+                vol.Required("start"): str,
+                vol.Optional("end"): str,
+                vol.Optional("step_minutes", default=DEFAULT_BACKTEST_STEP): vol.All(
+                    vol.Coerce(int), vol.Range(min=5, max=1440)
+                ),
+                vol.Optional("threshold", default=DEFAULT_GROUP_THRESHOLD): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=10)
+                ),
+            }),
+            supports_response=SupportsResponse.ONLY,
+        )
+        self.hass.services.async_register(
+            DOMAIN,
+            "sweep",
+            self.async_handle_sweep,
+            schema=vol.Schema({
+                vol.Exclusive("entry_id", "profile"): str,
+                vol.Exclusive("profile", "profile"): profile_schema,
+                vol.Exclusive("grid", "ratios"): {
+                    vol.In(RATIO_NAMES): vol.All([vol.Coerce(float)], vol.Length(min=1, max=SWEEP_MAX_GRID_VALUES))
+                },
+                vol.Exclusive("vectors", "ratios"): vol.All(
+                    [{vol.In(RATIO_NAMES): vol.Coerce(float)}], vol.Length(min=1, max=SWEEP_MAX_VECTORS)
+                ),
+                vol.Exclusive("rows", "inputs"): vol.All([row_schema], vol.Length(min=1, max=SWEEP_MAX_ROWS)),
+                vol.Exclusive("start", "inputs"): str,
+                vol.Optional("end"): str,
+                vol.Optional("step_minutes", default=DEFAULT_BACKTEST_STEP): vol.All(
+                    vol.Coerce(int), vol.Range(min=5, max=1440)
+                ),
+                vol.Optional("threshold", default=DEFAULT_GROUP_THRESHOLD): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=10)
+                ),
+                vol.Optional("include_scores", default=False): bool,
+            }),
+            supports_response=SupportsResponse.ONLY,
+        )
         self._service_registered = True
         _LOGGER.info("BikerSentinel config service registered")
 
-    async def async_handle_set_malus_ratios(self, call):
+    def _rider_entry(self, entry_id: str) -> tuple[ConfigEntry, BikerSentinelCoordinator | None]:
+        """Rider entry ``entry_id`` and its running coordinator, if loaded."""
+        entry = self.hass.config_entries.async_get_entry(entry_id)
+        if entry is None or entry.domain != DOMAIN or CONF_GROUP_MEMBERS in entry.data:
+            raise ServiceValidationError(f"BikerSentinel rider entry {entry_id} not found")
+        runtime_data = getattr(entry, "runtime_data", None) or {}
+        return entry, runtime_data.get("coordinator")
+
+    async def async_handle_evaluate(self, call) -> dict:
+        """Score a batch of input rows for an entry profile or an inline profile."""
+        entry_id = call.data.get("entry_id")
+        if entry_id:
+            entry, coordinator = self._rider_entry(entry_id)
+            # The live profile includes ratios changed since the entry was loaded
+            profile = coordinator.profile if coordinator else profile_from_entry(entry)
+        else:
+            profile = profile_from_settings(call.data.get("profile") or {})
+
+        rows = [ScoreInputs(**row) for row in call.data["rows"]]
+        # Up to EVALUATE_MAX_ROWS rows scored in pure Python: keep them off the event loop
+        results = await self.hass.async_add_executor_job(evaluate_batch, rows, profile)
+        return {
+            "entry_id": entry_id,
+            "results": [result.as_dict() for result in results],
+        }
+
+    @staticmethod
+    def _period(call) -> tuple[datetime, datetime]:
+        """Validated ``start``/``end`` of a replay service call (``end`` defaults to now)."""
+        try:
+            start = datetime.fromisoformat(call.data["start"]).astimezone()
+            end = datetime.fromisoformat(call.data["end"]).astimezone() if call.data.get("end") \
+                else datetime.now().astimezone()
+        except ValueError as e:
+            raise ServiceValidationError(f"Invalid backtest period: {e}") from e
+        if not start < end <= start + timedelta(days=BACKTEST_MAX_DAYS):
+            raise ServiceValidationError(f"Backtest period must be positive and at most {BACKTEST_MAX_DAYS} days")
+        return start, end
+
+    def _replay(self, factory, entry: ConfigEntry, profile, start: datetime, step: timedelta, threshold: float):
+        """Backtest of ``entry``'s sensors built by ``factory`` (Backtest or BacktestInputs)."""
+        # Private sun table: a long period must not evict the live days from the shared one
+        shared_sun = get_sun_table(self.hass)
+        sun = SunTable(shared_sun.latitude, shared_sun.longitude) if shared_sun else None
+        return factory(
+            profile,
+            {
+                "temperature": entry.data.get(CONF_SENSOR_TEMP),
+                "wind": entry.data.get(CONF_SENSOR_WIND),
+                "rain": entry.data.get(CONF_SENSOR_RAIN),
+                "weather": entry.data.get(CONF_WEATHER_ENTITY),
+            },
+            start,
+            step,
+            threshold,
+            sun,
+        )
+
+    async def async_handle_backtest(self, call) -> dict:
+        """Replay the recorder history of an entry's sensors and summarize the scores."""
+        entry_id = call.data["entry_id"]
+        entry, coordinator = self._rider_entry(entry_id)
+        profile = coordinator.profile if coordinator else profile_from_entry(entry)
+        start, end = self._period(call)
+        backtest = self._replay(
+            Backtest, entry, profile, start, timedelta(minutes=call.data["step_minutes"]), call.data["threshold"]
+        )
+        summary = await async_run_backtest(self.hass, backtest, start, end)
+        return {"entry_id": entry_id, "start": start.isoformat(), "end": end.isoformat(), **summary}
+
+    async def async_handle_sweep(self, call) -> dict:
+        """Score a grid or list of ratio vectors over synthetic rows or an entry's recorded history."""
         entry_id = call.data.get("entry_id")
-        if not entry_id:
-            _LOGGER.error("entry_id is required for set_malus_ratios service")
-            return
-            
-        value_map = {k: v for k, v in call.data.items() if k.endswith("_ratio") and k != "entry_id"}
-        
-        # Find the specific config entry
         entry = None
-        for e in self.hass.config_entries.async_entries(DOMAIN):
-            if e.entry_id == entry_id:
-                entry = e
-                break
-        
-        if not entry:
-            _LOGGER.error("BikerSentinel entry with id %s not found", entry_id)
+        if entry_id:
+            entry, coordinator = self._rider_entry(entry_id)
+            profile = coordinator.profile if coordinator else profile_from_entry(entry)
+        else:
+            profile = profile_from_settings(call.data.get("profile") or {})
+
+        if "grid" in call.data:
+            # Check the size before building the product: a large grid would not fit in memory
+            size = grid_size(call.data["grid"])
+            if size > SWEEP_MAX_VECTORS:
+                raise ServiceValidationError(f"Sweep has {size} ratio vectors, at most {SWEEP_MAX_VECTORS} allowed")
+            ratios = ratio_grid(call.data["grid"], profile)
+        else:
+            ratios = ratio_vectors(call.data.get("vectors") or [{}], profile)
+
+        step = timedelta(minutes=call.data["step_minutes"])
+        threshold = call.data["threshold"]
+        if "rows" in call.data:
+            rows = [ScoreInputs(**row) for row in call.data["rows"]]
+        elif entry is not None and "start" in call.data:
+            start, end = self._period(call)
+            if (end - start) / step > SWEEP_MAX_ROWS:
+                raise ServiceValidationError(f"Sweep period has more than {SWEEP_MAX_ROWS} samples, use a longer step")
+            replay = self._replay(BacktestInputs, entry, profile, start, step, threshold)
+            await async_run_backtest(self.hass, replay, start, end)
+            rows = replay.rows
+        else:
+            raise ServiceValidationError("Sweep needs input rows, or an entry_id with a start time")
+
+        include_scores = call.data.get("include_scores", False)
+        if include_scores and len(ratios) * len(rows) > SWEEP_CHUNK_CELLS:
+            raise ServiceValidationError("Score matrix too large to return, sweep fewer vectors or rows")
+        # Seconds of NumPy work for large grids: keep it off the event loop
+        result = await self.hass.async_add_executor_job(partial(
+            sweep, rows, ratios, profile,
+            weights=step.total_seconds() / 3600, threshold=threshold, keep_scores=include_scores,
+        ))
+        vectors = [result.as_dict(index) for index in range(len(ratios))]
+        if include_scores:
+            for vector, scores in zip(vectors, result.scores.tolist()):
+                vector["scores"] = scores
+        best = int(result.rideable_hours.argmax()) if len(ratios) else None
+        return {
+            "entry_id": entry_id,
+            "samples": len(rows),
+            "hours": round(result.hours, 2),
+            "threshold": threshold,
+            "best": best,
+            "vectors": vectors,
+        }
+
+    async def async_handle_set_malus_ratios(self, call):
+        """Update the malus ratios of one entry, a list of entries or every entry of a bike type.
+
+        The entries are indexed once and all updated in the same pass: the
+        config entry store coalesces the updates into one write, and each
+        running entry gets one ratio swap from its update listener.
+        """
+        # Stored under the option keys read by the entry (and its update listener)
+        option_keys = {field: key for key, (field, _) in RATIO_FIELDS.items()}
+        value_map = {option_keys[k]: v for k, v in call.data.items() if k in option_keys}
+
+        riders = {
+            entry.entry_id: entry for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if CONF_GROUP_MEMBERS not in entry.data
+        }
+        if "bike_type" in call.data:
+            targets = [entry for entry in riders.values() if entry.data.get(CONF_BIKE_TYPE) == call.data["bike_type"]]
+        else:
+            entry_ids = call.data.get("entry_ids") or ([call.data["entry_id"]] if call.data.get("entry_id") else [])
+            if not entry_ids:
+                _LOGGER.error("entry_id, entry_ids or bike_type is required for set_malus_ratios service")
+                return
+            missing = [entry_id for entry_id in entry_ids if entry_id not in riders]
+            if missing:
+                _LOGGER.error("BikerSentinel entry with id %s not found", ", ".join(map(str, missing)))
+                return
+            targets = [riders[entry_id] for entry_id in dict.fromkeys(entry_ids)]
+        if not targets:
+            _LOGGER.error("No BikerSentinel entry matches %s", call.data.get("bike_type"))
             return
-            
+
         # Update options
-        options = dict(entry.options)
-        options.update(value_map)
-        self.hass.config_entries.async_update_entry(entry, options=options)
-        _LOGGER.warning("[BikerSentinel] Updated malus ratios for entry %s: %s", entry_id, value_map)
+        updated = [
+            entry.entry_id for entry in targets
+            if self.hass.config_entries.async_update_entry(entry, options={**entry.options, **value_map})
+        ]
+        _LOGGER.warning("[BikerSentinel] Updated malus ratios for entries %s: %s", ", ".join(updated), value_map)
 
 
 def _create_device_info(entry: ConfigEntry) -> DeviceInfo | None:
     """Create device info for BikerSentinel integration."""
     try:
         from homeassistant.helpers.device_registry import DeviceInfo
+        if CONF_GROUP_MEMBERS in entry.data:
+            name = entry.title
+        else:
+            name = f"BikerSentinel ({entry.data.get(CONF_BIKE_TYPE, DEFAULT_BIKE_TYPE)})"
         device_info = DeviceInfo(
             identifiers={(DOMAIN, entry.entry_id)},
-            name=f"BikerSentinel ({entry.data.get(CONF_BIKE_TYPE, DEFAULT_BIKE_TYPE)})",
+            name=name,
             manufacturer="BikerSentinel",
             model="Weather-Aware Bike Safety Monitor",
             sw_version="2.0.0",
@@ -199,78 +442,6 @@ def _create_device_info(entry: ConfigEntry) -> DeviceInfo | None:
         return None
 
 
-def _get_ratio_value(entry: ConfigEntry, ratio_key: str, default_value: float) -> float:
-    """Get ratio value from options first, then data, then default."""
-    # Check options first (user-configurable)
-    if hasattr(entry, 'options') and entry.options and ratio_key in entry.options:
-        return entry.options[ratio_key]
-    # Then check data (from initial config)
-    if ratio_key in entry.data:
-        return entry.data[ratio_key]
-    # Finally use default
-    return default_value
-
-
-def analyze_weather_conditions(weather_state, location_name, rain_ratio=1.0, fog_ratio=1.0, cloudy_ratio=1.0, 
-                               cold_ratio=1.0, hot_ratio=1.0, wind_ratio=1.0, humidity_ratio=1.0):
-    """Analyze weather conditions and return malus + reasons."""
-    reasons = []
-    malus = 0.0
-    
-    # Safety vetoes
-    if weather_state.state in ["snowy", "lightning-rainy", "hail"]:
-        return {"malus": -8.0, "reasons": [f"{location_name}: Dangerous Weather"]}
-    
-    # Weather conditions
-    if weather_state.state == "rainy":
-        malus -= 1.5 * rain_ratio
-        reasons.append(f"{location_name}: Rain ({-1.5 * rain_ratio:.1f})")
-    elif weather_state.state == "fog":
-        malus -= 1.0 * fog_ratio
-        reasons.append(f"{location_name}: Fog ({-1.0 * fog_ratio:.1f})")
-    elif weather_state.state == "cloudy":
-        malus -= 0.3 * cloudy_ratio
-        reasons.append(f"{location_name}: Cloudy ({-0.3 * cloudy_ratio:.1f})")
-    
-    # Temperature
-    try:
-        temp = weather_state.attributes.get("temperature")
-        if temp:
-            temp = float(temp)
-            if temp < 5:
-                malus -= 1.0 * cold_ratio
-                reasons.append(f"{location_name}: Cold {temp}°C ({-1.0 * cold_ratio:.1f})")
-            elif temp > 30:
-                malus -= 0.3 * hot_ratio
-                reasons.append(f"{location_name}: Hot {temp}°C ({-0.3 * hot_ratio:.1f})")
-    except Exception:
-        pass
-    
-    # Wind
-    try:
-        wind = weather_state.attributes.get("wind_speed")
-        if wind:
-            wind = float(wind)
-            if wind > 40:
-                malus -= 0.7 * wind_ratio
-                reasons.append(f"{location_name}: Wind {wind}km/h ({-0.7 * wind_ratio:.1f})")
-    except Exception:
-        pass
-    
-    # Humidity
-    try:
-        humidity = weather_state.attributes.get("humidity")
-        if humidity:
-            humidity = float(humidity)
-            if humidity > 85:
-                malus -= 0.5 * humidity_ratio
-                reasons.append(f"{location_name}: Humidity {humidity}% ({-0.5 * humidity_ratio:.1f})")
-    except Exception:
-        pass
-    
-    return {"malus": malus, "reasons": reasons}
-
-
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -278,66 +449,35 @@ async def async_setup_entry(
 ) -> None:
     """Set up the BikerSentinel sensors (v2.0 - Essential Only)."""
     _LOGGER.info("Setting up BikerSentinel sensors for entry: %s", entry.entry_id)
-    _LOGGER.info("Setting up BikerSentinel sensors for entry: %s", entry.entry_id)
-    
-    # Retrieve config data with fallbacks
-    height = entry.data.get(CONF_HEIGHT) or DEFAULT_HEIGHT_CM
-    weight = entry.data.get(CONF_WEIGHT) or DEFAULT_WEIGHT_KG
-    bike_type = entry.data.get(CONF_BIKE_TYPE, DEFAULT_BIKE_TYPE)
-    equipment = entry.data.get(CONF_EQUIPMENT, DEFAULT_EQUIPMENT)
-    sensitivity = entry.data.get(CONF_SENSITIVITY, DEFAULT_SENSITIVITY)
-    riding_context = entry.data.get(CONF_RIDING_CONTEXT, DEFAULT_RIDING_CONTEXT)
-    trip_enabled = entry.data.get(CONF_TRIP_ENABLED, False)
-    
-    # Malus ratios (check options first, then data)
-    rain_ratio = _get_ratio_value(entry, CONF_RAIN_RATIO, DEFAULT_RAIN_RATIO)
-    fog_ratio = _get_ratio_value(entry, CONF_FOG_RATIO, DEFAULT_FOG_RATIO)
-    cloudy_ratio = _get_ratio_value(entry, CONF_CLOUDY_RATIO, DEFAULT_CLOUDY_RATIO)
-    cold_ratio = _get_ratio_value(entry, CONF_COLD_RATIO, DEFAULT_COLD_RATIO)
-    hot_ratio = _get_ratio_value(entry, CONF_HOT_RATIO, DEFAULT_HOT_RATIO)
-    wind_ratio = _get_ratio_value(entry, CONF_WIND_RATIO, DEFAULT_WIND_RATIO)
-    humidity_ratio = _get_ratio_value(entry, CONF_HUMIDITY_RATIO, DEFAULT_HUMIDITY_RATIO)
-    night_ratio = _get_ratio_value(entry, CONF_NIGHT_RATIO, DEFAULT_NIGHT_RATIO)
-    road_state_ratio = _get_ratio_value(entry, CONF_ROAD_STATE_RATIO, DEFAULT_ROAD_STATE_RATIO)
-
-    # Create the Score entity - this is the core of all calculations
-    score_entity = BikerSentinelScore(
-        hass, entry, height, weight, bike_type, equipment, sensitivity, riding_context,
-        rain_ratio, fog_ratio, cloudy_ratio, cold_ratio, hot_ratio, wind_ratio, humidity_ratio, night_ratio, road_state_ratio
-    )
-    
-    # Create trip score entities if enabled (needed for status/reasoning references)
-    trip_score_go = None
-    trip_score_return = None
-    if trip_enabled:
-        trip_score_go = BikerSentinelTripScoreGo(hass, entry)
-        trip_score_return = BikerSentinelTripScoreReturn(hass, entry)
+
+    if "group" in entry.runtime_data:
+        async_add_entities([BikerSentinelClubRide(entry.runtime_data["group"])])
+        return
     
-    # Store references for Status and Reasoning sensors
-    entry.runtime_data = {
-        "score_entity": score_entity,
-        "trip_score_go": trip_score_go,
-        "trip_score_return": trip_score_return,
-    }
+    # All entities read from the entry coordinator (one evaluation per cycle)
+    coordinator: BikerSentinelCoordinator = entry.runtime_data["coordinator"]
 
     # Essential entities: Score, Status, Reasoning
     entities = [
-        score_entity,
-        BikerSentinelStatus(hass, entry),
-        BikerSentinelReasoning(hass, entry),
+        BikerSentinelScore(coordinator),
+        BikerSentinelStatus(coordinator),
+        BikerSentinelReasoning(coordinator),
     ]
     
     # Only add trip entities if enabled (9 total: 3 instant + 3 outbound + 3 return)
-    if trip_enabled:
-        entities.append(trip_score_go)
-        entities.append(BikerSentinelTripStatusGo(hass, entry))
-        entities.append(BikerSentinelTripReasoningGo(hass, entry))
-        entities.append(trip_score_return)
-        entities.append(BikerSentinelTripStatusReturn(hass, entry))
-        entities.append(BikerSentinelTripReasoningReturn(hass, entry))
+    if coordinator.trip_enabled:
+        entities.append(BikerSentinelTripScoreGo(coordinator))
+        entities.append(BikerSentinelTripStatusGo(coordinator))
+        entities.append(BikerSentinelTripReasoningGo(coordinator))
+        entities.append(BikerSentinelTripScoreReturn(coordinator))
+        entities.append(BikerSentinelTripStatusReturn(coordinator))
+        entities.append(BikerSentinelTripReasoningReturn(coordinator))
+
+    if coordinator.departure_enabled:
+        entities.append(BikerSentinelBestDeparture(coordinator))
 
     _LOGGER.info("Adding %d BikerSentinel entities", len(entities))
-    async_add_entities(entities, True)
+    async_add_entities(entities)
     
     # Log device info for debugging
     for entity in entities[:1]:  # Log only first entity to avoid spam
@@ -347,868 +487,365 @@ async def async_setup_entry(
             _LOGGER.warning("Entity %s has no device_info", entity._attr_unique_id)
 
 
-class BikerSentinelScore(SensorEntity):
-    """Main BikerSentinel Score (0-10) - Enhanced with all internal calculations."""
+def _freeze(value):
+    """Return a hashable version of a state attribute value."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class BikerSentinelEntity(SensorEntity):
+    """Base entity: a thin view onto the coordinator snapshot.
+
+    State is only written when something visible changed: the value and the
+    attributes are fingerprinted and identical cycles are not sent to the
+    recorder.
+    """
 
     _attr_has_entity_name = True
+    _attr_should_poll = False
+    _key: str = ""
+
+    def __init__(self, coordinator: BikerSentinelCoordinator):
+        self.coordinator = coordinator
+        self._hass = coordinator.hass
+        self._entry = coordinator.entry
+        self._attr_unique_id = f"{self._entry.entry_id}_{self._key}"
+        self._attr_device_info = _create_device_info(self._entry)
+        self._last_fingerprint: int | None = None
+
+    @property
+    def snapshot(self) -> EntrySnapshot:
+        """Return the snapshot published by the last update cycle."""
+        return self.coordinator.data
+
+    def _fingerprint(self) -> int:
+        """Hash of everything the state machine would show for this entity."""
+        return hash((self.native_value, _freeze(self.extra_state_attributes)))
+
+    def _is_significant(self) -> bool:
+        """Hook for entities that filter numeric noise; the fingerprint is always checked."""
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Write state once per coordinator cycle."""
+        # Home Assistant writes the initial state when the entity is added
+        self._last_fingerprint = self._fingerprint()
+        self.async_on_remove(self.coordinator.async_add_listener(self._handle_coordinator_update))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        fingerprint = self._fingerprint()
+        if fingerprint == self._last_fingerprint or not self._is_significant():
+            self.coordinator.writes_skipped += 1
+            return
+        self._last_fingerprint = fingerprint
+        self.coordinator.writes += 1
+        self.async_write_ha_state()
+
+
+class BikerSentinelScore(BikerSentinelEntity):
+    """Main BikerSentinel Score (0-10) - Enhanced with all internal calculations."""
+
+    _key = "score"
     _attr_translation_key = "score"
     _attr_native_unit_of_measurement = "/10"
     _attr_icon = "mdi:motorbike"
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, hass, entry, height, weight, bike_type, equipment, sensitivity, riding_context,
-                 rain_ratio, fog_ratio, cloudy_ratio, cold_ratio, hot_ratio, wind_ratio, humidity_ratio, night_ratio, road_state_ratio):
-        """Initialize the score sensor."""
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_score"
-        self._attr_device_info = _create_device_info(entry)
-        self._attr_extra_state_attributes = {}  # Initialize attribute storage
-        
-        # User profile parameters
-        self._attr_unique_id = f"{entry.entry_id}_score"
-        
-        # Malus ratios
-        self._rain_ratio = rain_ratio
-        self._fog_ratio = fog_ratio
-        self._cloudy_ratio = cloudy_ratio
-        self._cold_ratio = cold_ratio
-        self._hot_ratio = hot_ratio
-        self._wind_ratio = wind_ratio
-        self._humidity_ratio = humidity_ratio
-        self._night_ratio = night_ratio
-        self._road_state_ratio = road_state_ratio
-        
-        # Initialize tracking for trends
-        self._attr_extra_state_attributes = {
-            "reasons": [],
-            "night_mode": "day",
-            "road_state": "unknown",
-            "temperature_trend": "stable",
-            "humidity": "moderate",
-            "solar_glare": "safe",
-        }
-        
-        # Entity IDs for sensors
-        self._ent_temp = entry.data.get(CONF_SENSOR_TEMP)
-        self._ent_wind = entry.data.get(CONF_SENSOR_WIND)
-        self._ent_rain = entry.data.get(CONF_SENSOR_RAIN)
-        self._ent_weather = entry.data.get(CONF_WEATHER_ENTITY)
-        self._riding_context = riding_context
-        
-        # Load rider-specific coefficients
-        self._coef = PROTECTION_COEFS.get(bike_type, 1.2)
-        self._equip_coef = EQUIPMENT_COEFS.get(equipment, 1.0)
-        
-        # Calculate surface area using DuBois formula
-        self._surface = 0.007184 * math.pow(height, 0.725) * math.pow(weight, 0.425)
-        
-        # Sensitivity factor (1=Viking, 3=Normal, 5=Sensitive)
-        self._sens_factor = 1.0 + ((sensitivity - 3) * 0.1)
-        
-        # History tracking for trends
-        self._temp_history = []
-        self._precip_history = {}  # Timestamp -> rainfall
+    def __init__(self, coordinator: BikerSentinelCoordinator):
+        super().__init__(coordinator)
+        self._written_result = None
+        self._written_at: float | None = None
+        self._deferred_write = None
+
+    def _is_significant(self) -> bool:
+        """Skip score moves below the epsilon and throttle to the minimum interval."""
+        result = self.snapshot.score
+        written = self._written_result
+        if result is not None and written is not None:
+            # Reasons carry the exact malus values; only the categorical states must match
+            same_states = result.categories == written.categories
+            if same_states and abs(result.score - written.score) < self.coordinator.score_epsilon:
+                return False
+            loop = self._hass.loop
+            min_interval = self.coordinator.score_min_interval
+            if self._written_at is not None and loop.time() - self._written_at < min_interval:
+                # Write the latest value once the interval has elapsed
+                if self._deferred_write is None:
+                    self._deferred_write = loop.call_at(self._written_at + min_interval, self._flush_deferred)
+                return False
+        self._written_result = result
+        self._written_at = self._hass.loop.time()
+        return True
+
+    @callback
+    def _flush_deferred(self) -> None:
+        self._deferred_write = None
+        self._handle_coordinator_update()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop a pending throttled write."""
+        if self._deferred_write is not None:
+            self._deferred_write.cancel()
+            self._deferred_write = None
 
     @property
     def native_value(self):
-        """Calculate the complete BikerSentinel score with all advanced features."""
-        reasons = []
-        
-        try:
-            # Get current sensor states
-            s_temp = self._hass.states.get(self._ent_temp)
-            s_wind = self._hass.states.get(self._ent_wind)
-            s_rain = self._hass.states.get(self._ent_rain)
-            
-            # Validate data availability
-            if not s_temp or not s_wind or not s_rain:
-                return None
-            if s_temp.state in ["unknown", "unavailable"] or s_wind.state in ["unknown", "unavailable"]:
-                return None
-
-            t = float(s_temp.state)
-            v = float(s_wind.state)
-            p = float(s_rain.state) if s_rain.state not in ["unknown", "unavailable"] else 0.0
-            
-            # Get weather state
-            weather_state = "clear"
-            if self._ent_weather:
-                w_state = self._hass.states.get(self._ent_weather)
-                if w_state and w_state.state not in ["unknown", "unavailable"]:
-                    weather_state = w_state.state
-
-            # --- ALGORITHM STARTS ---
-            score = 10.0
-
-            # 1. SAFETY VETOES (Immediate 0.0)
-            if weather_state in ["snowy", "snowy-rainy", "hail", "lightning-rainy"]:
-                self._attr_extra_state_attributes["reasons"] = ["Dangerous Weather"]
-                return 0.0
-            if t < 1:
-                self._attr_extra_state_attributes["reasons"] = ["Ice Risk"]
-                return 0.0
-            if v > 85:
-                self._attr_extra_state_attributes["reasons"] = ["Storm Winds"]
-                return 0.0
-
-            # 2. FOG & VISIBILITY
-            if weather_state == "fog":
-                fog_malus = -3.0 * self._fog_ratio
-                score += fog_malus
-                reasons.append(f"Fog ({fog_malus:.2f})")
-
-            # 3. NIGHT MODE WITH SOLAR ELEVATION & AZIMUTH
-            try:
-                sun_state = self._hass.states.get("sun.sun")
-                if sun_state:
-                    elevation = float(sun_state.attributes.get("elevation", 10))
-                    azimuth = float(sun_state.attributes.get("azimuth", 180))
-                    
-                    # Determine night mode status
-                    if elevation > 10:
-                        night_status = "day"
-                        night_malus = 0.0
-                    elif elevation > 0:
-                        night_status = "twilight"
-                        night_malus = NIGHT_MODE_MALUS.get("twilight", -1.5)
-                    elif elevation > -6:
-                        night_status = "civil_twilight"
-                        night_malus = NIGHT_MODE_MALUS.get("civil_twilight", -3.0)
-                    else:
-                        night_status = "night"
-                        night_malus = NIGHT_MODE_MALUS.get("night", -5.0)
-                    
-                    self._attr_extra_state_attributes["night_mode"] = night_status
-                    
-                    if night_malus < 0:
-                        adjusted_night_malus = night_malus * self._night_ratio
-                        score += adjusted_night_malus
-                        reasons.append(f"Night ({adjusted_night_malus:.2f})")
-                    
-                    # SOLAR BLINDNESS - Glare detection
-                    # Front azimuth is 90-270° (Sun ahead causes glare)
-                    diff = abs(azimuth - 180)
-                    if diff > 180:
-                        diff = 360 - diff
-                    
-                    if diff < SOLAR_BLINDNESS_THRESHOLD and elevation > 5:
-                        if diff < 30:
-                            glare_status = "warning"
-                            solar_malus = SOLAR_BLINDNESS_MALUS["warning"]
-                        else:
-                            glare_status = "caution"
-                            solar_malus = SOLAR_BLINDNESS_MALUS["caution"]
-                        
-                        self._attr_extra_state_attributes["solar_glare"] = glare_status
-                        adjusted_solar_malus = solar_malus * self._night_ratio
-                        score += adjusted_solar_malus
-                        reasons.append(f"Sun Glare ({adjusted_solar_malus:.2f})")
-                    else:
-                        self._attr_extra_state_attributes["solar_glare"] = "safe"
-                        
-            except Exception as e:
-                _LOGGER.debug("Could not calculate sun position: %s", e)
-
-            # 4. WINDCHILL (Thermal Comfort - Core Algorithm)
-            riding_speed = RIDING_CONTEXTS.get(self._riding_context, 80)
-            total_wind = v + (riding_speed * 0.1)
-            t_felt = t - (total_wind * 0.2 * self._coef)
-            
-            if t_felt < 15:
-                raw_malus = (15 - t_felt) * 0.2 * self._surface
-                final_malus = raw_malus * self._equip_coef * self._sens_factor
-                adjusted_malus = final_malus * self._cold_ratio
-                score -= adjusted_malus
-            # 5. WIND STABILITY (Lateral Forces)
-            if v > 35:
-                malus_wind = (v - 35) * 0.15 * self._coef
-                adjusted_wind_malus = malus_wind * self._wind_ratio
-                score -= adjusted_wind_malus
-                reasons.append(f"Wind {v}km/h (-{adjusted_wind_malus:.2f})")
-
-            # 6. RAIN (Immediate Road Hazard)
-            if p > 0:
-                rain_malus = -3.0 * self._rain_ratio
-                score += rain_malus
-                reasons.append(f"Rain {p}mm ({rain_malus:.2f})")
-                reasons.append(f"Rain {p}mm (-3)")
-
-            # 7. PRECIPITATION HISTORY & ROAD STATE (24h correlation)
-            # Track precipitation to infer road surface conditions
-            try:
-                now = datetime.now()
-                self._precip_history[now] = p
-                
-                # Clean old history (24h window)
-                cutoff = datetime.fromtimestamp(now.timestamp() - PRECIP_HISTORY_WINDOW * 3600)
-                self._precip_history = {k: v for k, v in self._precip_history.items() if k > cutoff}
-                
-                # Calculate total rainfall in window
-                total_rainfall = sum(self._precip_history.values())
-                
-                # Determine road state based on rainfall and temperature
-                road_state = "unknown"
-                road_malus = 0.0
-                
-                if total_rainfall == 0:
-                    road_state = "dry"
-                elif total_rainfall <= 5:
-                    road_state = "damp"
-                    road_malus = ROAD_STATE_MALUS.get("damp", -1.0)
-                elif total_rainfall <= 10:
-                    road_state = "wet"
-                    road_malus = ROAD_STATE_MALUS.get("wet", -3.0)
-                else:
-                    # Check for icy conditions
-                    if t < 0:
-                        road_state = "icy"
-                        road_malus = ROAD_STATE_MALUS.get("icy", -8.0)
-                    else:
-                        road_state = "sludge"
-                
-                self._attr_extra_state_attributes["road_state"] = road_state
-                
-                if road_malus < 0:
-                    adjusted_road_malus = road_malus * self._road_state_ratio
-                    score += adjusted_road_malus
-                    reasons.append(f"Road {road_state.capitalize()} ({adjusted_road_malus:.2f})")
-                    
-            except Exception as e:
-                _LOGGER.debug("Could not calculate road state: %s", e)
-
-            # 8. TEMPERATURE TREND (Icing Risk)
-            try:
-                self._temp_history.append((datetime.now(), t))
-                
-                # Keep only last 6 readings
-                cutoff_time = datetime.fromtimestamp(datetime.now().timestamp() - TEMP_HISTORY_WINDOW * 600)
-                self._temp_history = [(ts, temp) for ts, temp in self._temp_history if ts > cutoff_time]
-                
-                if len(self._temp_history) >= 2:
-                    oldest_temp = self._temp_history[0][1]
-                    if temp_diff < -TEMP_DROP_THRESHOLD:
-                        trend = "dropping"
-                        trend_malus = TEMP_TREND_MALUS.get("dropping", -2.0)
-                        adjusted_trend_malus = trend_malus * self._cold_ratio
-                        score += adjusted_trend_malus
-                        reasons.append(f"Temp Dropping ({adjusted_trend_malus:.2f})")
-                    elif temp_diff > 3:
-                        reasons.append(f"Temp Dropping ({trend_malus:.2f})")
-                    elif temp_diff > 3:
-                        trend = "rising"
-                    else:
-                        trend = "stable"
-                    
-                    self._attr_extra_state_attributes["temperature_trend"] = trend
-                    
-            except Exception as e:
-                _LOGGER.debug("Could not calculate temperature trend: %s", e)
-
-            # 9. HUMIDITY & VISIBILITY
-            try:
-                if self._ent_weather:
-                    w_state = self._hass.states.get(self._ent_weather)
-                    if w_state:
-                        humidity = w_state.attributes.get("humidity")
-                        if humidity:
-                            if humidity > 70:
-                                humidity_status = "high"
-                                humidity_malus = HUMIDITY_MALUS.get("high", -1.5)
-                                adjusted_humidity_malus = humidity_malus * self._humidity_ratio
-                                score += adjusted_humidity_malus
-                                reasons.append(f"High Humidity ({adjusted_humidity_malus:.2f})")
-                            elif humidity > 30:
-                                humidity_status = "moderate"
-                            else:
-                                humidity_status = "low"
-                            
-                            self._attr_extra_state_attributes["humidity"] = humidity_status
-            except Exception as e:
-                _LOGGER.debug("Could not get humidity data: %s", e)
-
-            # Final score calculation
-            final_score = round(max(0, min(10, score)), 1)
-            
-            # Update reasons for Reasoning sensor
-            self._attr_extra_state_attributes["reasons"] = reasons if reasons else ["Perfect Conditions"]
-            
-            return final_score
-            
-        except Exception as e:
-            _LOGGER.error("Error calculating BikerSentinel score: %s", e)
-            return None
+        """Return the score of the current snapshot."""
+        result = self.snapshot.score
+        return result.score if result else None
     
     @property
     def extra_state_attributes(self):
         """Return extra state attributes with all score factors."""
-        return self._attr_extra_state_attributes
+        result = self.snapshot.score
+        if result is None:
+            attributes = {
+                "reasons": [],
+                "night_mode": "day",
+                "road_state": "unknown",
+                "temperature_trend": "stable",
+                "temperature_rate": None,
+                "temperature_drop": 0.0,
+                "humidity": "moderate",
+                "solar_glare": "safe",
+            }
+        else:
+            attributes = result.as_attributes()
+        attributes["history_ready"] = self.coordinator.history_ready
+        return attributes
 
 
-class BikerSentinelStatus(SensorEntity):
+class BikerSentinelStatus(BikerSentinelEntity):
     """Status categorization derived from score."""
 
-    _attr_has_entity_name = True
+    _key = "status"
     _attr_translation_key = "status"
     _attr_icon = "mdi:shield-check"
     _attr_device_class = SensorDeviceClass.ENUM
     _attr_options = ["optimal", "favorable", "degraded", "critical", "dangerous", "analyzing", "error"]
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_status"
-        self._attr_device_info = _create_device_info(entry)
-
     @property
     def native_value(self):
-        """Return status based on score."""
-        try:
-            score_entity = self._entry.runtime_data.get("score_entity")
-            if not score_entity:
-                return "analyzing"
-            
-            score = score_entity.native_value
-            
-            if score is None:
-                return "analyzing"
-            
-            if score == 0:
-                return "dangerous"
-            elif score <= 2:
-                return "critical"
-            elif score <= 4:
-                return "degraded"
-            elif score <= 6:
-                return "favorable"
-            else:
-                return "optimal"
-                
-        except Exception as e:
-            _LOGGER.error("Error calculating status: %s", e)
-            return "error"
-
-
-class BikerSentinelReasoning(SensorEntity):
+        """Return the stable status of the current snapshot."""
+        return self.snapshot.status
+
+
+class BikerSentinelReasoning(BikerSentinelEntity):
     """Detailed reasoning for the score (shows contributing factors)."""
 
-    _attr_has_entity_name = True
+    _key = "reasoning"
     _attr_translation_key = "reasoning"
     _attr_icon = "mdi:information"
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_reasoning"
-        self._attr_device_info = _create_device_info(entry)
-
     @property
     def native_value(self):
         """Return all reasons affecting the score with total malus."""
-        try:
-            score_entity = self._entry.runtime_data.get("score_entity")
-            if not score_entity:
-                return "Initializing..."
-            
-            reasons = score_entity.extra_state_attributes.get("reasons", [])
-            score = score_entity.native_value
-            
-            if not reasons or score is None:
-                return "Perfect Conditions"
-            
-            # Calculate total malus that explains the score
-            total_malus = 10.0 - score
-            
-            # Show all factors exhaustively
-            return f"{' + '.join(reasons)} = Total malus -{total_malus:.1f}"
-            
-        except Exception:
-            return "Calculating..."
+        result = self.snapshot.score
+        if result is None:
+            return "Perfect Conditions"
+        
+        # Calculate total malus that explains the score
+        total_malus = 10.0 - result.score
+        
+        # Show all factors exhaustively
+        return f"{' + '.join(result.reasons)} = Total malus -{total_malus:.1f}"
 
     @property
     def extra_state_attributes(self):
         """Return detailed breakdown of all factors affecting the score."""
-        try:
-            score_entity = self._entry.runtime_data.get("score_entity")
-            if not score_entity:
-                return {}
-            
-            score = score_entity.native_value
-            total_malus = (10.0 - score) if score is not None else 0.0
-            
-            return {
-                "all_factors": score_entity.extra_state_attributes.get("reasons", []),
-                "total_malus": round(total_malus, 1),
-                "score_final": score,
-                "night_mode": score_entity.extra_state_attributes.get("night_mode", "day"),
-                "road_state": score_entity.extra_state_attributes.get("road_state", "unknown"),
-                "temperature_trend": score_entity.extra_state_attributes.get("temperature_trend", "stable"),
-                "humidity": score_entity.extra_state_attributes.get("humidity", "moderate"),
-                "solar_glare": score_entity.extra_state_attributes.get("solar_glare", "safe"),
-            }
-        except Exception:
+        result = self.snapshot.score
+        if result is None:
             return {}
+        
+        return {
+            "all_factors": result.reasons,
+            "total_malus": round(10.0 - result.score, 1),
+            "score_final": result.score,
+            "night_mode": result.night_mode,
+            "road_state": result.road_state,
+            "temperature_trend": result.temperature_trend,
+            "temperature_rate": result.as_attributes()["temperature_rate"],
+            "humidity": result.humidity,
+            "solar_glare": result.solar_glare,
+        }
 
 
-class BikerSentinelTripScoreGo(SensorEntity):
-    """Trip Score for outbound journey (departure time)."""
+class BikerSentinelTripEntity(BikerSentinelEntity):
+    """Base for trip entities; ``_direction`` selects the snapshot trip."""
+
+    _direction: str = "go"
+
+    @property
+    def trip(self):
+        """Return the trip result of the current snapshot."""
+        return self.snapshot.trip_go if self._direction == "go" else self.snapshot.trip_return
+
+
+class BikerSentinelTripScore(BikerSentinelTripEntity):
+    """Trip Score (0-10) for one direction."""
 
-    _attr_has_entity_name = True
-    _attr_translation_key = "trip_score_go"
     _attr_native_unit_of_measurement = "/10"
-    _attr_icon = "mdi:bike"
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_trip_score_go"
-        self._attr_device_info = _create_device_info(entry)
-        self._attr_extra_state_attributes = {}  # Initialize attribute storage
-
     @property
     def native_value(self):
-        """Calculate score for outbound trip (home → office on full route)."""
-        try:
-            # Get trip configuration
-            home_weather_entity = self._entry.data.get(CONF_TRIP_HOME_WEATHER)
-            office_weather_entity = self._entry.data.get(CONF_TRIP_OFFICE_WEATHER)
-            depart_time_str = self._entry.data.get(CONF_TRIP_DEPART_TIME)
-            
-            if not home_weather_entity or not office_weather_entity or not depart_time_str:
-                return None
-            
-            # Get weather at both locations
-            home_weather = self._hass.states.get(home_weather_entity)
-            office_weather = self._hass.states.get(office_weather_entity)
-            
-            if not home_weather or not office_weather:
-                return None
-            
-            # Safety vetoes for trip (same as instant score)
-            if home_weather.state in ["snowy", "snowy-rainy", "hail", "lightning-rainy"] or \
-               office_weather.state in ["snowy", "snowy-rainy", "hail", "lightning-rainy"]:
-                self._attr_extra_state_attributes = {
-                    "reasons": ["Dangerous Weather"],
-                    "home_location": home_weather_entity,
-                    "office_location": office_weather_entity,
-                }
-                return 0.0
-            
-            reasons = []
-            score = 10.0  # Base score for trip forecasts
-            
-            # Analyze HOME weather (starting point)
-            rain_ratio = _get_ratio_value(self._entry, CONF_RAIN_RATIO, DEFAULT_RAIN_RATIO)
-            fog_ratio = _get_ratio_value(self._entry, CONF_FOG_RATIO, DEFAULT_FOG_RATIO)
-            cloudy_ratio = _get_ratio_value(self._entry, CONF_CLOUDY_RATIO, DEFAULT_CLOUDY_RATIO)
-            cold_ratio = _get_ratio_value(self._entry, CONF_COLD_RATIO, DEFAULT_COLD_RATIO)
-            hot_ratio = _get_ratio_value(self._entry, CONF_HOT_RATIO, DEFAULT_HOT_RATIO)
-            wind_ratio = _get_ratio_value(self._entry, CONF_WIND_RATIO, DEFAULT_WIND_RATIO)
-            humidity_ratio = _get_ratio_value(self._entry, CONF_HUMIDITY_RATIO, DEFAULT_HUMIDITY_RATIO)
-            home_reasons = analyze_weather_conditions(home_weather, "Home", rain_ratio, fog_ratio, cloudy_ratio, cold_ratio, hot_ratio, wind_ratio, humidity_ratio)
-            
-            # Analyze OFFICE weather (destination)
-            office_reasons = analyze_weather_conditions(office_weather, "Office", rain_ratio, fog_ratio, cloudy_ratio, cold_ratio, hot_ratio, wind_ratio, humidity_ratio)
-            
-            # Average the weather malus for the trip
-            avg_weather_malus = (home_reasons["malus"] + office_reasons["malus"]) / 2
-            score += avg_weather_malus
-            
-            # Create clear weather justification showing the average calculation
-            home_malus = home_reasons["malus"]
-            office_malus = office_reasons["malus"]
-            if home_malus != 0 or office_malus != 0:
-                weather_details = []
-                if home_malus != 0:
-                    weather_details.append(f"Home {home_malus:+.2f}")
-                if office_malus != 0:
-                    weather_details.append(f"Office {office_malus:+.2f}")
-                if weather_details:
-                    reasons.append(f"Weather average: {' + '.join(weather_details)} = {avg_weather_malus:+.2f}")
-            
-            # Add individual weather details for transparency
-            reasons.extend(home_reasons["reasons"])
-            reasons.extend(office_reasons["reasons"])
-            
-            # Add road state malus if forecast indicates rain
-            has_road_state = False  # Trip forecasts don't have road state sensors
-            if home_weather.state == "rainy" or office_weather.state == "rainy":
-                score += -0.5
-            if not has_road_state and (home_weather.state == "rainy" or office_weather.state == "rainy"):
-                score += -0.5
-                reasons.append("Road state: Wet (-0.5)")
-            
-            # Add road state malus from previous day (if any)
-            instant_reasons = self._entry.runtime_data["score_entity"].extra_state_attributes.get("reasons", [])
-            for reason in instant_reasons:
-                if "Road state:" in reason:
-                    if "(-0.5)" in reason:
-                        score += -0.5
-                        reasons.append(f"Previous day: {reason}")
-                    elif "(-1.0)" in reason:
-                        score += -1.0
-                        reasons.append(f"Previous day: {reason}")
-            
-            # Check for night mode at departure time
-            sun_state = self._hass.states.get("sun.sun")
-            if sun_state:
-                next_rising = sun_state.attributes.get("next_rising")
-                next_setting = sun_state.attributes.get("next_setting")
-                if next_rising and next_setting:
-                    try:
-                        rising_time = datetime.fromisoformat(next_rising).time()
-                        setting_time = datetime.fromisoformat(next_setting).time()
-                        depart_time = datetime.strptime(depart_time_str, "%H:%M").time()
-                        if setting_time <= depart_time or depart_time <= rising_time:
-                            score += NIGHT_MODE_MALUS
-                            reasons.append(f"Trip at night ({NIGHT_MODE_MALUS})")
-                    except (ValueError, TypeError):
-                        _LOGGER.warning("Failed to parse sun times for trip night check")
-            
-            # Store reasons in attributes
-            final_score = round(max(0, min(10, score)), 1)
-            
-            self._attr_extra_state_attributes = {
-                "reasons": reasons if reasons else ["Good conditions"],
-                "home_location": home_weather_entity,
-                "office_location": office_weather_entity,
-            }
-            
-            return final_score
-            
-        except Exception as e:
-            _LOGGER.error("Error calculating trip score (go): %s", e)
-            return None
+        """Return the trip score of the current snapshot."""
+        return self.trip.score if self.trip else None
     
     @property
     def extra_state_attributes(self):
         """Return extra state attributes with trip details."""
-        return self._attr_extra_state_attributes
+        return self.trip.as_attributes() if self.trip else {}
+
+
+class BikerSentinelTripScoreGo(BikerSentinelTripScore):
+    """Trip Score for outbound journey (departure time)."""
+
+    _key = "trip_score_go"
+    _attr_translation_key = "trip_score_go"
+    _attr_icon = "mdi:bike"
 
 
-class BikerSentinelTripScoreReturn(SensorEntity):
+class BikerSentinelTripScoreReturn(BikerSentinelTripScore):
     """Trip Score for return journey (return time)."""
 
-    _attr_has_entity_name = True
+    _key = "trip_score_return"
     _attr_translation_key = "trip_score_return"
-    _attr_native_unit_of_measurement = "/10"
     _attr_icon = "mdi:bike-fast"
-    _attr_state_class = SensorStateClass.MEASUREMENT
+    _direction = "return"
+
+
+class BikerSentinelTripStatus(BikerSentinelTripEntity):
+    """Trip Status for one direction (derived from score)."""
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_trip_score_return"
-        self._attr_device_info = _create_device_info(entry)
-        self._attr_extra_state_attributes = {}  # Initialize attribute storage
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = ["optimal", "favorable", "degraded", "critical", "dangerous", "analyzing", "error"]
 
     @property
     def native_value(self):
-        """Calculate score for return trip (office → home on full route)."""
-        try:
-            # Get trip configuration
-            home_weather_entity = self._entry.data.get(CONF_TRIP_HOME_WEATHER)
-            office_weather_entity = self._entry.data.get(CONF_TRIP_OFFICE_WEATHER)
-            return_time_str = self._entry.data.get(CONF_TRIP_RETURN_TIME)
-            
-            if not home_weather_entity or not office_weather_entity or not return_time_str:
-                return None
-            
-            # Get weather at both locations
-            home_weather = self._hass.states.get(home_weather_entity)
-            office_weather = self._hass.states.get(office_weather_entity)
-            
-            if not home_weather or not office_weather:
-                return None
-            
-            reasons = []
-            score = 10.0  # Base score for trip forecasts
-            
-            # Analyze OFFICE weather (starting point for return)
-            rain_ratio = _get_ratio_value(self._entry, CONF_RAIN_RATIO, DEFAULT_RAIN_RATIO)
-            fog_ratio = _get_ratio_value(self._entry, CONF_FOG_RATIO, DEFAULT_FOG_RATIO)
-            cloudy_ratio = _get_ratio_value(self._entry, CONF_CLOUDY_RATIO, DEFAULT_CLOUDY_RATIO)
-            cold_ratio = _get_ratio_value(self._entry, CONF_COLD_RATIO, DEFAULT_COLD_RATIO)
-            hot_ratio = _get_ratio_value(self._entry, CONF_HOT_RATIO, DEFAULT_HOT_RATIO)
-            wind_ratio = _get_ratio_value(self._entry, CONF_WIND_RATIO, DEFAULT_WIND_RATIO)
-            humidity_ratio = _get_ratio_value(self._entry, CONF_HUMIDITY_RATIO, DEFAULT_HUMIDITY_RATIO)
-            office_reasons = analyze_weather_conditions(office_weather, "Office", rain_ratio, fog_ratio, cloudy_ratio, cold_ratio, hot_ratio, wind_ratio, humidity_ratio)
-            
-            # Analyze HOME weather (destination for return)
-            home_reasons = analyze_weather_conditions(home_weather, "Home", rain_ratio, fog_ratio, cloudy_ratio, cold_ratio, hot_ratio, wind_ratio, humidity_ratio)
-            
-            # Average the weather malus for the trip
-            avg_weather_malus = (home_reasons["malus"] + office_reasons["malus"]) / 2
-            score += avg_weather_malus
-            
-            # Create clear weather justification showing the average calculation
-            home_malus = home_reasons["malus"]
-            office_malus = office_reasons["malus"]
-            if home_malus != 0 or office_malus != 0:
-                weather_details = []
-                if home_malus != 0:
-                    weather_details.append(f"Home {home_malus:+.2f}")
-                if office_malus != 0:
-                    weather_details.append(f"Office {office_malus:+.2f}")
-                if weather_details:
-                    reasons.append(f"Weather average: {' + '.join(weather_details)} = {avg_weather_malus:+.2f}")
-            
-            # Add individual weather details for transparency
-            reasons.extend(office_reasons["reasons"])
-            reasons.extend(home_reasons["reasons"])
-            
-            # Add road state malus from previous day (if any)
-            instant_reasons = self._entry.runtime_data["score_entity"].extra_state_attributes.get("reasons", [])
-            for reason in instant_reasons:
-                if "Road state:" in reason:
-                    if "(-0.5)" in reason:
-                        score += -0.5
-                        reasons.append(f"Previous day: {reason}")
-                    elif "(-1.0)" in reason:
-                        score += -1.0
-                        reasons.append(f"Previous day: {reason}")
-            
-            # Check for night mode at return time
-            sun_state = self._hass.states.get("sun.sun")
-            if sun_state:
-                next_rising = sun_state.attributes.get("next_rising")
-                next_setting = sun_state.attributes.get("next_setting")
-                if next_rising and next_setting:
-                    try:
-                        rising_time = datetime.fromisoformat(next_rising).time()
-                        setting_time = datetime.fromisoformat(next_setting).time()
-                        return_time = datetime.strptime(return_time_str, "%H:%M").time()
-                        if setting_time <= return_time or return_time <= rising_time:
-                            score += NIGHT_MODE_MALUS
-                            reasons.append(f"Trip at night ({NIGHT_MODE_MALUS})")
-                    except (ValueError, TypeError):
-                        _LOGGER.warning("Failed to parse sun times for trip night check")
-            
-            # Store reasons in attributes
-            final_score = round(max(0, min(10, score)), 1)
-            
-            self._attr_extra_state_attributes = {
-                "reasons": reasons if reasons else ["Good conditions"],
-                "office_location": office_weather_entity,
-                "home_location": home_weather_entity,
-            }
-            
-            return final_score
-            
-        except Exception as e:
-            _LOGGER.error("Error calculating trip score (return): %s", e)
-            return None
-    
-    @property
-    def extra_state_attributes(self):
-        """Return extra state attributes with trip details."""
-        return self._attr_extra_state_attributes
+        """Return the stable status of the trip in the current snapshot."""
+        return getattr(self.snapshot, f"trip_{self._direction}_status")
 
 
-class BikerSentinelTripStatusGo(SensorEntity):
+class BikerSentinelTripStatusGo(BikerSentinelTripStatus):
     """Trip Status for outbound journey (derived from score)."""
 
-    _attr_has_entity_name = True
+    _key = "trip_status_go"
     _attr_translation_key = "trip_status_go"
     _attr_icon = "mdi:bike"
-    _attr_device_class = SensorDeviceClass.ENUM
-    _attr_options = ["optimal", "favorable", "degraded", "critical", "dangerous", "analyzing", "error"]
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_trip_status_go"
-        self._attr_device_info = _create_device_info(entry)
 
-    @property
-    def native_value(self):
-        """Return status based on trip score go."""
-        try:
-            trip_score_go = self._entry.runtime_data.get("trip_score_go")
-            if not trip_score_go:
-                return "analyzing"
-            
-            score = trip_score_go.native_value
-            
-            if score is None:
-                return "analyzing"
-            
-            if score == 0:
-                return "dangerous"
-            elif score <= 2:
-                return "critical"
-            elif score <= 4:
-                return "degraded"
-            elif score <= 6:
-                return "favorable"
-            else:
-                return "optimal"
-                
-        except Exception as e:
-            _LOGGER.error("Error calculating trip status (go): %s", e)
-            return "error"
-
-
-class BikerSentinelTripStatusReturn(SensorEntity):
+class BikerSentinelTripStatusReturn(BikerSentinelTripStatus):
     """Trip Status for return journey (derived from score)."""
 
-    _attr_has_entity_name = True
+    _key = "trip_status_return"
     _attr_translation_key = "trip_status_return"
     _attr_icon = "mdi:bike-fast"
-    _attr_device_class = SensorDeviceClass.ENUM
-    _attr_options = ["optimal", "favorable", "degraded", "critical", "dangerous", "analyzing", "error"]
+    _direction = "return"
+
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_trip_status_return"
-        self._attr_device_info = _create_device_info(entry)
+class BikerSentinelTripReasoning(BikerSentinelTripEntity):
+    """Trip Reasoning for one direction (explains score factors)."""
 
     @property
     def native_value(self):
-        """Return status based on trip score return."""
-        try:
-            trip_score_return = self._entry.runtime_data.get("trip_score_return")
-            if not trip_score_return:
-                return "analyzing"
-            
-            score = trip_score_return.native_value
-            
-            if score is None:
-                return "analyzing"
-            
-            if score == 0:
-                return "dangerous"
-            elif score <= 2:
-                return "critical"
-            elif score <= 4:
-                return "degraded"
-            elif score <= 6:
-                return "favorable"
-            else:
-                return "optimal"
-                
-        except Exception as e:
-            _LOGGER.error("Error calculating trip status (return): %s", e)
-            return "error"
-
-
-class BikerSentinelTripReasoningGo(SensorEntity):
+        """Return all reasons affecting the trip score with total malus."""
+        if not self.trip:
+            return "Analyzing..."
+        
+        reasons = self.trip.as_attributes()["reasons"]
+        
+        # Total malus from perfect score (10.0)
+        total_malus = 10.0 - self.trip.score
+        
+        # Show all factors exhaustively
+        return f"{' + '.join(reasons)} = -{total_malus:.1f}"
+
+    @property
+    def extra_state_attributes(self):
+        """Return detailed breakdown of all factors affecting the trip score."""
+        if not self.trip:
+            return {}
+        
+        return {
+            "all_factors": list(self.trip.reasons),
+            "total_malus": round(10.0 - self.trip.score, 1),
+            "home_location": self.trip.home_location or "unknown",
+            "office_location": self.trip.office_location or "unknown",
+        }
+
+
+class BikerSentinelTripReasoningGo(BikerSentinelTripReasoning):
     """Trip Reasoning for outbound journey (explains score factors)."""
 
-    _attr_has_entity_name = True
+    _key = "trip_reasoning_go"
     _attr_translation_key = "trip_reasoning_go"
     _attr_icon = "mdi:bike"
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_trip_reasoning_go"
-        self._attr_device_info = _create_device_info(entry)
+
+class BikerSentinelTripReasoningReturn(BikerSentinelTripReasoning):
+    """Trip Reasoning for return journey (explains score factors)."""
+
+    _key = "trip_reasoning_return"
+    _attr_translation_key = "trip_reasoning_return"
+    _attr_icon = "mdi:bike-fast"
+    _direction = "return"
+
+
+class BikerSentinelBestDeparture(BikerSentinelEntity):
+    """Best departure time in the next hours, from the hourly forecast."""
+
+    _key = "best_departure"
+    _attr_translation_key = "best_departure"
+    _attr_icon = "mdi:clock-start"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
 
     @property
     def native_value(self):
-        """Return all reasons affecting the outbound trip score with total malus."""
-        try:
-            trip_score_go = self._entry.runtime_data.get("trip_score_go")
-            instant_score_entity = self._entry.runtime_data["score_entity"]
-            if not trip_score_go:
-                return "Analyzing..."
-            
-            reasons = trip_score_go.extra_state_attributes.get("reasons", [])
-            score = trip_score_go.native_value
-            
-            if not reasons or score is None:
-                return "Good conditions"
-            
-            # Total malus from perfect score (10.0)
-            total_malus = 10.0 - score
-            
-            # Show all factors exhaustively
-            return f"{' + '.join(reasons)} = -{total_malus:.1f}"
-            
-        except Exception as e:
-            _LOGGER.error("Error calculating trip reasoning (go): %s", e)
-            return "Calculating..."
+        """Return the departure time of the best window."""
+        plan = self.snapshot.departure
+        return plan.best.departure if plan and plan.best else None
 
     @property
     def extra_state_attributes(self):
-        """Return detailed breakdown of all factors affecting the trip score."""
-        try:
-            trip_score_go = self._entry.runtime_data.get("trip_score_go")
-            instant_score_entity = self._entry.runtime_data["score_entity"]
-            if not trip_score_go:
-                return {}
-            
-            score = trip_score_go.native_value
-            total_malus = (10.0 - score) if score is not None else 0.0
-            
-            return {
-                "all_factors": trip_score_go.extra_state_attributes.get("reasons", []),
-                "total_malus": round(total_malus, 1),
-                "home_location": trip_score_go.extra_state_attributes.get("home_location", "unknown"),
-                "office_location": trip_score_go.extra_state_attributes.get("office_location", "unknown"),
-            }
-        except Exception:
-            return {}
+        """Return the score, arrival and runner-up of the best window."""
+        plan = self.snapshot.departure
+        attributes = plan.as_attributes() if plan else {}
+        attributes["ride_duration"] = self.coordinator.ride_minutes
+        return attributes
 
 
-class BikerSentinelTripReasoningReturn(SensorEntity):
-    """Trip Reasoning for return journey (explains score factors)."""
+class BikerSentinelClubRide(BikerSentinelEntity):
+    """Club ride go/no-go: the lowest score of the group members."""
 
-    _attr_has_entity_name = True
-    _attr_translation_key = "trip_reasoning_return"
-    _attr_icon = "mdi:bike-fast"
+    _key = "club_ride"
+    _attr_translation_key = "club_ride"
+    _attr_native_unit_of_measurement = "/10"
+    _attr_icon = "mdi:account-group"
+    _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, hass, entry):
-        self._hass = hass
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_trip_reasoning_return"
-        self._attr_device_info = _create_device_info(entry)
+    coordinator: RideGroupCoordinator
 
     @property
     def native_value(self):
-        """Return all reasons affecting the return trip score with total malus."""
-        try:
-            trip_score_return = self._entry.runtime_data.get("trip_score_return")
-            instant_score_entity = self._entry.runtime_data["score_entity"]
-            if not trip_score_return:
-                return "Analyzing..."
-            
-            reasons = trip_score_return.extra_state_attributes.get("reasons", [])
-            score = trip_score_return.native_value
-            
-            if score is None:
-                return "Good conditions"
-            
-            # Total malus from perfect score (10.0)
-            total_malus = 10.0 - score
-            
-            # Show all factors exhaustively
-            return f"{' + '.join(reasons)} = -{total_malus:.1f}"
-            
-        except Exception as e:
-            _LOGGER.error("Error calculating trip reasoning (return): %s", e)
-            return "Calculating..."
+        """Return the score of the limiting member."""
+        return self.coordinator.stats.minimum
 
     @property
     def extra_state_attributes(self):
-        """Return detailed breakdown of all factors affecting the trip score."""
-        try:
-            trip_score_return = self._entry.runtime_data.get("trip_score_return")
-            instant_score_entity = self._entry.runtime_data["score_entity"]
-            if not trip_score_return:
-                return {}
-            
-            score = trip_score_return.native_value
-            total_malus = (10.0 - score) if score is not None else 0.0
-            
-            return {
-                "all_factors": trip_score_return.extra_state_attributes.get("reasons", []),
-                "total_malus": round(total_malus, 1),
-                "office_location": trip_score_return.extra_state_attributes.get("office_location", "unknown"),
-                "home_location": trip_score_return.extra_state_attributes.get("home_location", "unknown"),
-            }
-        except Exception:
-            return {}
+        """Return the group mean, the riders above the threshold and the limiting member."""
+        stats = self.coordinator.stats
+        limiting = stats.limiting
+        return {
+            "mean": round(stats.mean, 1) if stats.mean is not None else None,
+            "riders_above": stats.above,
+            "riders_scored": stats.count,
+            "members": len(self.coordinator.members),
+            "threshold": stats.threshold,
+            "limiting_member": self.coordinator.titles.get(limiting, limiting),
+            "everyone_can_ride": 0 < stats.count == len(self.coordinator.members) and stats.above == stats.count,
+        }
@@ -0,0 +1,174 @@
+"""Local sun position and daily sun-event table.
+
+Solar elevation and azimuth come from the NOAA solar position equations,
+evaluated from the configured latitude/longitude for a whole day at once
+(one NumPy pass every SUN_TABLE_STEP minutes). Sunrise, sunset and civil
+twilight are the interpolated crossings of that curve. Night and glare checks
+for any time are then a table lookup, with no dependency on ``sun.sun``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, SUN_TABLE_DAYS, SUN_TABLE_STEP
+
+SUNRISE_ELEVATION = -0.833  # Upper limb on the horizon, with refraction
+CIVIL_TWILIGHT_ELEVATION = -6.0
+
+
+def solar_position(epochs: np.ndarray, latitude: float, longitude: float) -> tuple[np.ndarray, np.ndarray]:
+    """Solar elevation and azimuth (degrees) at UTC epoch seconds (NOAA algorithm)."""
+    julian_day = epochs / 86400.0 + 2440587.5
+    jc = (julian_day - 2451545.0) / 36525.0
+
+    mean_long = np.mod(280.46646 + jc * (36000.76983 + jc * 0.0003032), 360.0)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccentricity = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    center = (
+        np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mean_anom) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = np.radians(mean_long + center - 0.00569 - 0.00478 * np.sin(omega))
+    mean_obliquity = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliquity = np.radians(mean_obliquity + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_long))
+
+    var_y = np.tan(obliquity / 2) ** 2
+    mean_long_rad = np.radians(mean_long)
+    equation_of_time = 4 * np.degrees(
+        var_y * np.sin(2 * mean_long_rad)
+        - 2 * eccentricity * np.sin(mean_anom)
+        + 4 * eccentricity * var_y * np.sin(mean_anom) * np.cos(2 * mean_long_rad)
+        - 0.5 * var_y ** 2 * np.sin(4 * mean_long_rad)
+        - 1.25 * eccentricity ** 2 * np.sin(2 * mean_anom)
+    )  # minutes
+
+    true_solar_time = np.mod(np.mod(epochs, 86400.0) / 60.0 + equation_of_time + 4 * longitude, 1440.0)
+    hour_angle = np.radians(true_solar_time / 4 - 180)
+    lat = np.radians(latitude)
+    cos_zenith = np.clip(
+        np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle), -1.0, 1.0
+    )
+    zenith = np.arccos(cos_zenith)
+    elevation = 90.0 - np.degrees(zenith)
+
+    denominator = np.cos(lat) * np.sin(zenith)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_azimuth = np.clip((np.sin(lat) * cos_zenith - np.sin(declination)) / denominator, -1.0, 1.0)
+    azimuth = np.degrees(np.arccos(np.nan_to_num(cos_azimuth)))
+    azimuth = np.where(hour_angle > 0, np.mod(azimuth + 180, 360), np.mod(540 - azimuth, 360))
+    return elevation, azimuth
+
+
+@dataclass(frozen=True, slots=True)
+class SunPosition:
+    """Sun elevation and azimuth in degrees."""
+
+    elevation: float
+    azimuth: float
+
+
+class SunDay:
+    """Sun curve and events of one local day."""
+
+    def __init__(self, day: date, tzinfo, latitude: float, longitude: float, step_minutes: float = SUN_TABLE_STEP):
+        self.date = day
+        self.start = datetime(day.year, day.month, day.day, tzinfo=tzinfo).timestamp()
+        self.step = step_minutes * 60
+        self.times = self.start + np.arange(0, 86400 + self.step, self.step)
+        self.elevation, azimuth = solar_position(self.times, latitude, longitude)
+        self.azimuth = np.degrees(np.unwrap(np.radians(azimuth)))  # Continuous for interpolation
+        self._tzinfo = tzinfo
+        self.dawn, self.dusk = self._crossings(CIVIL_TWILIGHT_ELEVATION)
+        self.sunrise, self.sunset = self._crossings(SUNRISE_ELEVATION)
+
+    def _crossings(self, elevation: float) -> tuple[datetime | None, datetime | None]:
+        """First upward and last downward crossing of ``elevation`` (None during polar day/night)."""
+        above = self.elevation >= elevation
+        changes = np.flatnonzero(above[1:] != above[:-1])
+        rising = setting = None
+        for index in changes:
+            e0, e1 = self.elevation[index], self.elevation[index + 1]
+            epoch = self.times[index] + (elevation - e0) / (e1 - e0) * self.step
+            when = datetime.fromtimestamp(float(epoch), tz=self._tzinfo)
+            if e1 > e0 and rising is None:
+                rising = when
+            elif e1 < e0:
+                setting = when
+        return rising, setting
+
+    def position(self, when: datetime) -> SunPosition:
+        """Interpolated sun position at ``when`` (within this day)."""
+        epoch = when.timestamp()
+        elevation = float(np.interp(epoch, self.times, self.elevation))
+        azimuth = float(np.interp(epoch, self.times, self.azimuth)) % 360
+        return SunPosition(round(elevation, 2), round(azimuth, 2))
+
+    def as_attributes(self) -> dict:
+        """Sun events of the day."""
+        return {
+            "dawn": self.dawn.isoformat() if self.dawn else None,
+            "sunrise": self.sunrise.isoformat() if self.sunrise else None,
+            "sunset": self.sunset.isoformat() if self.sunset else None,
+            "dusk": self.dusk.isoformat() if self.dusk else None,
+        }
+
+
+class SunTable:
+    """Per-day sun tables for one location, computed once per day and kept for a few days."""
+
+    def __init__(self, latitude: float, longitude: float) -> None:
+        self.latitude = latitude
+        self.longitude = longitude
+        self._days: dict[date, SunDay] = {}
+
+    def day(self, when: datetime) -> SunDay:
+        """Table of the local day containing ``when``."""
+        when = when if when.tzinfo else when.astimezone()
+        key = when.date()
+        table = self._days.get(key)
+        if table is None:
+            table = SunDay(key, when.tzinfo, self.latitude, self.longitude)
+            self._days[key] = table
+            while len(self._days) > SUN_TABLE_DAYS:
+                del self._days[min(self._days)]
+        return table
+
+    def refresh(self, now: datetime) -> None:
+        """Drop past days and precompute today and tomorrow (run at midnight)."""
+        now = now if now.tzinfo else now.astimezone()
+        for key in [key for key in self._days if key < now.date()]:
+            del self._days[key]
+        self.day(now)
+        self.day(now + timedelta(days=1))
+
+    def position(self, when: datetime) -> SunPosition:
+        """Sun position at any time."""
+        return self.day(when).position(when)
+
+    def positions(self, epochs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Sun elevation and azimuth at many UTC epochs (one NumPy pass, not cached)."""
+        return solar_position(np.asarray(epochs, dtype=float), self.latitude, self.longitude)
+
+    def is_night(self, when: datetime) -> bool:
+        """Whether the sun is below the horizon at ``when``."""
+        return self.position(when).elevation < SUNRISE_ELEVATION
+
+
+def get_sun_table(hass: HomeAssistant) -> SunTable | None:
+    """Return the sun table of the configured location (None without one), shared by all entries."""
+    latitude, longitude = hass.config.latitude, hass.config.longitude
+    if not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float)):
+        return None
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    table = domain_data.get("sun")
+    if table is None or (table.latitude, table.longitude) != (latitude, longitude):
+        table = domain_data["sun"] = SunTable(float(latitude), float(longitude))
+    return table
@@ -0,0 +1,167 @@
+"""Ratio sweep: score many malus-ratio vectors against one set of inputs.
+
+Every malus of the kernel is a base value (set by the inputs and the rider
+coefficients) times one ratio. ``malus_terms`` computes those base values
+once per input row, in the kernel's factor order; ``sweep`` then scores
+whole blocks of ratio vectors by broadcasting each term over the block and
+summing in that same order, and rounds with the kernel's ``round_score``, so
+every score matches ``evaluate`` exactly. ``cloudy_ratio`` and ``hot_ratio``
+are not used by the kernel, so no term depends on them.
+"""
+from __future__ import annotations
+
+import math
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+
+from .const import (
+    DEFAULT_GROUP_THRESHOLD,
+    HUMIDITY_MALUS,
+    NIGHT_MODE_MALUS,
+    ROAD_STATE_MALUS,
+    SOLAR_BLINDNESS_MALUS,
+    SWEEP_CHUNK_CELLS,
+    TEMP_TREND_MALUS,
+)
+from .engine import MAX_SCORE, RiderProfile, ScoreInputs, classify_inputs, round_score, safety_veto
+
+RATIO_NAMES = tuple(field.name for field in fields(RiderProfile) if field.name.endswith("_ratio"))
+_COLUMN = {name: index for index, name in enumerate(RATIO_NAMES)}
+
+
+def malus_terms(rows: Sequence[ScoreInputs], profile: RiderProfile) -> tuple[list[tuple[int, np.ndarray]], np.ndarray]:
+    """Per-row malus per unit of ratio, as (ratio column, values) in the kernel's factor order, and the vetoed rows.
+
+    Rows where a factor does not apply hold 0.0, which leaves the sum unchanged.
+    """
+    count = len(rows)
+    t, v, p = (np.array([getattr(row, name) for row in rows], dtype=float)
+               for name in ("temperature", "wind_speed", "rain"))
+    veto = np.zeros(count, dtype=bool)
+    fog = np.zeros(count)
+    night = np.zeros(count)
+    glare = np.zeros(count)
+    road = np.zeros(count)
+    dropping = np.zeros(count)
+    humid = np.zeros(count)
+    # The sub-states are categorical: classify each distinct row once, in Python
+    seen: dict[ScoreInputs, int] = {}
+    for index, row in enumerate(rows):
+        first = seen.setdefault(row, index)
+        if first != index:
+            veto[index], fog[index], night[index], glare[index] = veto[first], fog[first], night[first], glare[first]
+            road[index], dropping[index], humid[index] = road[first], dropping[first], humid[first]
+            continue
+        states = classify_inputs(row)
+        veto[index] = safety_veto(row) is not None
+        fog[index] = -3.0 if row.weather == "fog" else 0.0
+        night[index] = NIGHT_MODE_MALUS[states["night_mode"]] if states["night_mode"] != "day" else 0.0
+        glare[index] = SOLAR_BLINDNESS_MALUS[states["solar_glare"]] if states["solar_glare"] != "safe" else 0.0
+        road[index] = min(ROAD_STATE_MALUS.get(states["road_state"], 0.0), 0.0)
+        dropping[index] = TEMP_TREND_MALUS["dropping"] if states["temperature_trend"] == "dropping" else 0.0
+        humid[index] = HUMIDITY_MALUS["high"] if states["humidity"] == "high" else 0.0
+
+    # Same expressions as evaluate(), so each term is bit-identical
+    felt = t - ((v + (profile.riding_speed * 0.1)) * 0.2 * profile.coef)
+    final_malus = (15 - felt) * 0.2 * profile.surface * profile.equip_coef * profile.sens_factor
+    chill = np.where(felt < 15, -final_malus, 0.0)
+    wind = np.where(v > 35, -((v - 35) * 0.15 * profile.coef), 0.0)
+    rain = np.where(p > 0, -3.0, 0.0)
+    terms = [
+        (_COLUMN["fog_ratio"], fog),
+        (_COLUMN["night_ratio"], night),
+        (_COLUMN["night_ratio"], glare),
+        (_COLUMN["cold_ratio"], chill),
+        (_COLUMN["wind_ratio"], wind),
+        (_COLUMN["rain_ratio"], rain),
+        (_COLUMN["road_state_ratio"], road),
+        (_COLUMN["cold_ratio"], dropping),
+        (_COLUMN["humidity_ratio"], humid),
+    ]
+    return [(column, values) for column, values in terms if values.any()], veto
+
+
+def grid_size(grid: Mapping[str, Sequence[float]]) -> int:
+    """Number of vectors ``ratio_grid`` would build, without building them."""
+    return math.prod(len(values) for values in grid.values())
+
+
+def ratio_grid(grid: Mapping[str, Sequence[float]], profile: RiderProfile) -> np.ndarray:
+    """Cartesian product of the listed ratio values; other ratios keep the profile value."""
+    axes = [np.asarray(grid.get(name, [getattr(profile, name)]), dtype=float) for name in RATIO_NAMES]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(RATIO_NAMES))
+
+
+def ratio_vectors(vectors: Sequence[Mapping[str, float]], profile: RiderProfile) -> np.ndarray:
+    """Ratio vectors given as partial mappings; missing ratios keep the profile value."""
+    return np.array(
+        [[float(vector.get(name, getattr(profile, name))) for name in RATIO_NAMES] for vector in vectors],
+        dtype=float,
+    ).reshape(-1, len(RATIO_NAMES))
+
+
+@dataclass(frozen=True, slots=True)
+class SweepResult:
+    """Scores of every ratio vector (rows of ``ratios``) over the same inputs."""
+
+    ratios: np.ndarray  # vectors x RATIO_NAMES
+    rideable_hours: np.ndarray  # per vector, hours scoring above the threshold
+    mean: np.ndarray  # per vector, time-weighted mean score
+    hours: float
+    threshold: float
+    scores: np.ndarray | None = None  # vectors x rows, when kept
+
+    def profile(self, index: int, base: RiderProfile) -> RiderProfile:
+        """``base`` with the ratios of vector ``index``."""
+        return replace(base, **dict(zip(RATIO_NAMES, self.ratios[index].tolist())))
+
+    def as_dict(self, index: int) -> dict:
+        """Service response form of vector ``index``."""
+        return {
+            "ratios": dict(zip(RATIO_NAMES, self.ratios[index].tolist())),
+            "rideable_hours": round(float(self.rideable_hours[index]), 2),
+            "mean": round(float(self.mean[index]), 2) if self.hours else None,
+        }
+
+
+def sweep(rows: Sequence[ScoreInputs], ratios: np.ndarray, profile: RiderProfile, *,
+          weights: np.ndarray | float = 1.0, threshold: float = DEFAULT_GROUP_THRESHOLD,
+          keep_scores: bool = False) -> SweepResult:
+    """Score every ratio vector against every row.
+
+    ``weights`` is the duration of each row in hours (a scalar for evenly
+    spaced samples). Ratio vectors are scored in blocks of about
+    SWEEP_CHUNK_CELLS scores, so only the kept score matrix (if any) grows
+    with vectors x rows.
+    """
+    ratios = np.asarray(ratios, dtype=float).reshape(-1, len(RATIO_NAMES))
+    terms, veto = malus_terms(rows, profile)
+    # Vectors differing only in ratios no term uses score the same: score each once
+    used = sorted({column for column, _ in terms})
+    distinct, inverse = np.unique(ratios[:, used], axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    terms = [(used.index(column), values) for column, values in terms]
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), (len(rows),))
+    hours = float(weights.sum())
+    rideable = np.zeros(len(distinct))
+    total = np.zeros(len(distinct))
+    scores = np.empty((len(distinct), len(rows))) if keep_scores else None
+    block = max(1, SWEEP_CHUNK_CELLS // max(1, len(rows)))
+    for start in range(0, len(distinct), block):
+        chunk = distinct[start:start + block]
+        sums = np.zeros((len(chunk), len(rows)))
+        for column, values in terms:
+            sums += chunk[:, column, None] * values  # Broadcast: block x rows, in the kernel's order
+        chunk_scores = round_score(MAX_SCORE + sums)
+        chunk_scores[:, veto] = 0.0  # Safety vetoes score 0.0 whatever the ratios
+        rideable[start:start + block] = (chunk_scores > threshold) @ weights
+        total[start:start + block] = chunk_scores @ weights
+        if scores is not None:
+            scores[start:start + block] = chunk_scores
+    mean = total / hours if hours else np.zeros(len(distinct))
+    return SweepResult(
+        ratios, rideable[inverse], mean[inverse], hours, threshold,
+        scores[inverse] if scores is not None else None,
+    )
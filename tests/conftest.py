@@ -19,6 +19,21 @@ def create_ha_mocks():
     core_mock = MagicMock()
     sys.modules['homeassistant.core'] = core_mock
     core_mock.HomeAssistant = MagicMock
+    core_mock.callback = lambda func: func
+    core_mock.SupportsResponse = MagicMock()
+
+    # homeassistant.exceptions
+    exceptions_mock = MagicMock()
+    sys.modules['homeassistant.exceptions'] = exceptions_mock
+
+    class HomeAssistantError(Exception):
+        pass
+
+    class ServiceValidationError(HomeAssistantError):
+        pass
+
+    exceptions_mock.HomeAssistantError = HomeAssistantError
+    exceptions_mock.ServiceValidationError = ServiceValidationError
     
     # homeassistant.const
     const_mock = MagicMock()
@@ -41,6 +56,14 @@ def create_ha_mocks():
     sys.modules['homeassistant.helpers.entity_platform'] = entity_platform_mock
     entity_platform_mock.AddEntitiesCallback = MagicMock
     
+    # homeassistant.helpers.event
+    event_mock = MagicMock()
+    sys.modules['homeassistant.helpers.event'] = event_mock
+    
+    # homeassistant.helpers.storage
+    storage_mock = MagicMock()
+    sys.modules['homeassistant.helpers.storage'] = storage_mock
+
     # homeassistant.helpers.entity_registry
     entity_registry_mock = MagicMock()
     sys.modules['homeassistant.helpers.entity_registry'] = entity_registry_mock
@@ -78,6 +101,9 @@ def create_ha_mocks():
         @property
         def native_value(self):
             return None
+        @property
+        def extra_state_attributes(self):
+            return self._attr_extra_state_attributes
     
     sensor_mock.SensorEntity = MockSensorEntity
     sensor_mock.SensorDeviceClass = MagicMock()
@@ -1,7 +1,8 @@
 """Unit tests for BikerSentinel v2.0 - Refactored Core Algorithm."""
+import itertools
 import pytest
 from unittest.mock import MagicMock, patch, PropertyMock
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from bikersentinel.const import (
     CONF_HEIGHT, CONF_WEIGHT, CONF_BIKE_TYPE, CONF_EQUIPMENT,
@@ -22,9 +23,56 @@ from bikersentinel.const import (
 class MockState:
     """Mock Home Assistant state object."""
     
-    def __init__(self, state, attributes=None):
+    _updates = itertools.count()
+
+    def __init__(self, state, attributes=None, last_updated=None):
         self.state = state
         self.attributes = attributes or {}
+        # Every new state object is a new update unless told otherwise
+        self.last_updated = last_updated or datetime(2024, 1, 1) + timedelta(seconds=next(self._updates))
+
+
+def fixed_sun(elevation, azimuth=180):
+    """Sun table stand-in reporting the same position at any time."""
+    from bikersentinel.sun import SunPosition
+
+    sun = MagicMock()
+    sun.position.return_value = SunPosition(elevation, azimuth)
+    sun.is_night.return_value = elevation < -0.833
+    return sun
+
+
+RATIO_KEYS = ("rain_ratio", "fog_ratio", "cloudy_ratio", "cold_ratio", "hot_ratio", "wind_ratio",
+              "humidity_ratio", "night_ratio", "road_state_ratio")
+
+
+def random_profile(rng):
+    """Rider profile with random settings and non-default ratios (for parity tests)."""
+    from bikersentinel.engine import RiderProfile
+
+    return RiderProfile.build(
+        rng.randint(150, 200), rng.randint(50, 120), rng.choice(["Roadster", "Sportive", "GT", "Trail"]),
+        rng.choice(["Standard", "Winter", "Heated"]), rng.randint(1, 5), rng.choice(["urban", "road", "highway"]),
+        **{key: round(rng.uniform(0.0, 3.0), 2) for key in RATIO_KEYS},
+    )
+
+
+def random_inputs(rng):
+    """Input snapshot covering every factor of the kernel (for parity tests)."""
+    from bikersentinel.engine import ScoreInputs
+
+    return ScoreInputs(
+        temperature=round(rng.uniform(-3.0, 32.0), 1),
+        wind_speed=round(rng.uniform(0.0, 90.0), 1),
+        rain=rng.choice([0.0, 0.0, 0.4, 2.5]),
+        weather=rng.choice(["sunny", "cloudy", "fog", "rainy", "hail"]),
+        humidity=rng.choice([None, 40.0, 92.0]),
+        sun_elevation=rng.choice([None, -12.0, -3.0, 4.0, 12.0, 45.0]),
+        sun_azimuth=rng.uniform(0.0, 360.0),
+        surface_water=rng.choice([0.0, 0.2, 6.0, 12.0]),
+        temp_rate=rng.choice([None, -6.0, 0.0, 2.0]),
+        temp_drop=rng.choice([0.0, 6.0]),
+    )
 
 
 class TestBikerSentinelScoreCore:
@@ -34,6 +82,7 @@ class TestBikerSentinelScoreCore:
     def mock_hass(self):
         """Create a mock Home Assistant instance."""
         hass = MagicMock()
+        hass.data = {}
         hass.states = MagicMock()
         return hass
     
@@ -64,35 +113,21 @@ class TestBikerSentinelScoreCore:
             CONF_NIGHT_RATIO: DEFAULT_NIGHT_RATIO,
             CONF_ROAD_STATE_RATIO: DEFAULT_ROAD_STATE_RATIO,
         }
+        entry.options = {}
         entry.runtime_data = {}
         return entry
 
     @pytest.fixture
     def score_entity(self, mock_hass, mock_entry):
-        """Create a BikerSentinelScore instance."""
+        """Create a BikerSentinelScore instance on top of its coordinator."""
+        from bikersentinel.coordinator import BikerSentinelCoordinator
         from bikersentinel.sensor import BikerSentinelScore
-        return BikerSentinelScore(
-            mock_hass, mock_entry,
-            height=175, weight=80,
-            bike_type="Roadster",
-            equipment="Standard",
-            sensitivity=3,
-            riding_context="road",
-            rain_ratio=DEFAULT_RAIN_RATIO,
-            fog_ratio=DEFAULT_FOG_RATIO,
-            cloudy_ratio=DEFAULT_CLOUDY_RATIO,
-            cold_ratio=DEFAULT_COLD_RATIO,
-            hot_ratio=DEFAULT_HOT_RATIO,
-            wind_ratio=DEFAULT_WIND_RATIO,
-            humidity_ratio=DEFAULT_HUMIDITY_RATIO,
-            night_ratio=DEFAULT_NIGHT_RATIO,
-            road_state_ratio=DEFAULT_ROAD_STATE_RATIO
-        )
+        return BikerSentinelScore(BikerSentinelCoordinator(mock_hass, mock_entry))
 
     def test_score_initialization(self, score_entity):
         """Test that score entity initializes correctly."""
         assert score_entity._attr_unique_id == "test_entry_123_score"
-        assert score_entity._riding_context == "road"
+        assert score_entity.coordinator.profile.riding_speed == RIDING_CONTEXTS["road"]
 
     def test_score_perfect_conditions(self, mock_hass, score_entity):
         """Test score with perfect weather conditions (high score expected)."""
@@ -104,9 +139,10 @@ class TestBikerSentinelScoreCore:
             "sensor.wind": MockState("10"),
             "sensor.rain": MockState("0"),
             "weather.home": weather_state,
-            "sun.sun": MockState("above_horizon", {"elevation": 45, "azimuth": 180}),
         }.get(entity_id)
         
+        score_entity.coordinator._sun = fixed_sun(45, 180)
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         # Score should be relatively high with good conditions
         # Note: Internal calculations may reduce slightly from 10.0
@@ -121,6 +157,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("sunny"),
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         assert score == 0.0
 
@@ -133,6 +170,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("snowy"),  # Dangerous weather
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         assert score == 0.0
 
@@ -145,6 +183,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("sunny"),
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         assert score == 0.0
 
@@ -157,6 +196,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("fog"),  # Fog penalty
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         assert score == 7.0  # 10.0 - 3.0 for fog
 
@@ -169,6 +209,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("rainy"),
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         # Should be reduced due to rain (base -3.0) and possibly road state
         assert score <= 7.5 and score >= 6.0, f"Expected score between 6.0 and 7.5, got {score}"
@@ -182,6 +223,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("sunny"),
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         # Should be less than 10.0 due to windchill penalty
         assert score < 10.0
@@ -195,6 +237,7 @@ class TestBikerSentinelScoreCore:
             "weather.home": MockState("sunny"),
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         # Should be reduced due to wind stability penalty
         assert score < 10.0
@@ -206,9 +249,10 @@ class TestBikerSentinelScoreCore:
             "sensor.wind": MockState("10"),
             "sensor.rain": MockState("0"),
             "weather.home": MockState("sunny"),
-            "sun.sun": MockState("at_horizon", {"elevation": 5, "azimuth": 180}),  # Twilight
         }.get(entity_id)
         
+        score_entity.coordinator._sun = fixed_sun(5, 180)
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         # Should be reduced due to night mode
         assert score < 10.0
@@ -221,6 +265,7 @@ class TestBikerSentinelScoreCore:
             "sensor.rain": MockState("0"),
         }.get(entity_id)
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         assert score is None
 
@@ -228,6 +273,7 @@ class TestBikerSentinelScoreCore:
         """Test that missing sensor returns None."""
         mock_hass.states.get.side_effect = lambda entity_id: None
         
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
         assert score is None
 
@@ -238,11 +284,12 @@ class TestBikerSentinelScoreCore:
             "sensor.wind": MockState("45"),  # High wind
             "sensor.rain": MockState("0"),
             "weather.home": MockState("sunny"),
-            "sun.sun": MockState("above_horizon", {"elevation": 45, "azimuth": 180}),
         }.get(entity_id)
         
+        score_entity.coordinator._sun = fixed_sun(45, 180)
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
-        reasons = score_entity._attr_extra_state_attributes.get("reasons", [])
+        reasons = score_entity.extra_state_attributes.get("reasons", [])
         assert len(reasons) > 0
         assert any("Wind" in reason for reason in reasons)
 
@@ -253,11 +300,12 @@ class TestBikerSentinelScoreCore:
             "sensor.wind": MockState("50"),
             "sensor.rain": MockState("2"),
             "weather.home": MockState("rainy", {"humidity": 80}),
-            "sun.sun": MockState("above_horizon", {"elevation": 0, "azimuth": 180}),
         }.get(entity_id)
         
+        score_entity.coordinator._sun = fixed_sun(0, 180)
+        score_entity.coordinator.async_refresh()
         score = score_entity.native_value
-        reasons = score_entity._attr_extra_state_attributes.get("reasons", [])
+        reasons = score_entity.extra_state_attributes.get("reasons", [])
         total_malus = 0.0
         for r in reasons:
             if "(" in r and ")" in r:
@@ -272,6 +320,7 @@ class TestBikerSentinelScoreCore:
     @pytest.mark.parametrize("bike_type", MACHINE_TYPES)
     def test_score_all_bike_types(self, mock_hass, bike_type):
         """Test score calculation for all supported bike types."""
+        from bikersentinel.coordinator import BikerSentinelCoordinator
         from bikersentinel.sensor import BikerSentinelScore
         
         entry = MagicMock()
@@ -299,11 +348,10 @@ class TestBikerSentinelScoreCore:
             "sensor.rain": MockState("0"),
         }.get(entity_id)
         
-        score = BikerSentinelScore(mock_hass, entry, 175, 80, bike_type, "Standard", 3, "road",
-                                   DEFAULT_RAIN_RATIO, DEFAULT_FOG_RATIO, DEFAULT_CLOUDY_RATIO,
-                                   DEFAULT_COLD_RATIO, DEFAULT_HOT_RATIO, DEFAULT_WIND_RATIO,
-                                   DEFAULT_HUMIDITY_RATIO, DEFAULT_NIGHT_RATIO, DEFAULT_ROAD_STATE_RATIO)
-        result = score.native_value
+        entry.data[CONF_BIKE_TYPE] = bike_type
+        coordinator = BikerSentinelCoordinator(mock_hass, entry)
+        coordinator.async_refresh()
+        result = BikerSentinelScore(coordinator).native_value
         
         assert result is not None
         assert 0 <= result <= 10
@@ -311,6 +359,7 @@ class TestBikerSentinelScoreCore:
     @pytest.mark.parametrize("equipment", EQUIPMENT_LEVELS)
     def test_score_all_equipment_levels(self, mock_hass, equipment):
         """Test score calculation for all equipment levels."""
+        from bikersentinel.coordinator import BikerSentinelCoordinator
         from bikersentinel.sensor import BikerSentinelScore
         
         entry = MagicMock()
@@ -338,11 +387,10 @@ class TestBikerSentinelScoreCore:
             "sensor.rain": MockState("0"),
         }.get(entity_id)
         
-        score = BikerSentinelScore(mock_hass, entry, 175, 80, "Roadster", equipment, 3, "road",
-                                   DEFAULT_RAIN_RATIO, DEFAULT_FOG_RATIO, DEFAULT_CLOUDY_RATIO,
-                                   DEFAULT_COLD_RATIO, DEFAULT_HOT_RATIO, DEFAULT_WIND_RATIO,
-                                   DEFAULT_HUMIDITY_RATIO, DEFAULT_NIGHT_RATIO, DEFAULT_ROAD_STATE_RATIO)
-        result = score.native_value
+        entry.data[CONF_EQUIPMENT] = equipment
+        coordinator = BikerSentinelCoordinator(mock_hass, entry)
+        coordinator.async_refresh()
+        result = BikerSentinelScore(coordinator).native_value
         
         assert result is not None
         # Heated equipment should reduce cold penalty
@@ -354,95 +402,124 @@ class TestBikerSentinelStatus:
     """Test cases for BikerSentinelStatus entity."""
     
     @pytest.fixture
-    def mock_hass(self):
-        """Create a mock Home Assistant instance."""
-        hass = MagicMock()
-        return hass
-    
-    @pytest.fixture
-    def mock_entry(self):
-        """Create a mock config entry with runtime_data."""
-        from unittest.mock import MagicMock
-        entry = MagicMock()
-        entry.entry_id = "test_entry_123"
-        entry.data = {
-            CONF_BIKE_TYPE: "Roadster",
-            CONF_EQUIPMENT: "Standard",
-            CONF_SENSOR_TEMP: "sensor.temp",
-            CONF_SENSOR_WIND: "sensor.wind",
-            CONF_SENSOR_RAIN: "sensor.rain",
-            CONF_RIDING_CONTEXT: "road",
-        }
-        
-        # Create a mock score entity
-        mock_score = MagicMock()
-        mock_score.native_value = 8.0
-        entry.runtime_data = {"score_entity": mock_score}
-        
-        return entry
+    def mock_coordinator(self):
+        """Create a mock coordinator publishing a score snapshot."""
+        from bikersentinel.coordinator import EntrySnapshot
+        from bikersentinel.engine import ScoreResult
+        coordinator = MagicMock()
+        coordinator.entry.entry_id = "test_entry_123"
+        coordinator.data = EntrySnapshot(score=ScoreResult(8.0))
+        return coordinator
 
     @pytest.fixture
-    def status_entity(self, mock_hass, mock_entry):
+    def status_entity(self, mock_coordinator):
         """Create a BikerSentinelStatus instance."""
         from bikersentinel.sensor import BikerSentinelStatus
-        return BikerSentinelStatus(mock_hass, mock_entry)
+        return BikerSentinelStatus(mock_coordinator)
+
+    def _publish(self, entity, score):
+        from bikersentinel.coordinator import EntrySnapshot
+        from bikersentinel.engine import ScoreResult, StatusClassifier
+        status = StatusClassifier().update(score, 0.0)
+        entity.coordinator.data = EntrySnapshot(score=ScoreResult(score), status=status)
 
     def test_status_optimal(self, status_entity):
         """Test that high score returns 'optimal' status."""
-        status_entity._entry.runtime_data["score_entity"].native_value = 8.5
+        self._publish(status_entity, 8.5)
         assert status_entity.native_value == "optimal"
 
     def test_status_favorable(self, status_entity):
         """Test that medium-high score returns 'favorable' status."""
-        status_entity._entry.runtime_data["score_entity"].native_value = 6.0
+        self._publish(status_entity, 6.0)
         assert status_entity.native_value == "favorable"
 
     def test_status_degraded(self, status_entity):
         """Test that medium-low score returns 'degraded' status."""
-        status_entity._entry.runtime_data["score_entity"].native_value = 4.0
+        self._publish(status_entity, 4.0)
         assert status_entity.native_value == "degraded"
 
     def test_status_critical(self, status_entity):
         """Test that low score returns 'critical' status."""
-        status_entity._entry.runtime_data["score_entity"].native_value = 1.5
+        self._publish(status_entity, 1.5)
         assert status_entity.native_value == "critical"
 
     def test_status_dangerous(self, status_entity):
         """Test that zero score returns 'dangerous' status."""
-        status_entity._entry.runtime_data["score_entity"].native_value = 0.0
+        self._publish(status_entity, 0.0)
         assert status_entity.native_value == "dangerous"
 
 
+class TestStatusClassifier:
+    """Test cases for the hysteresis status classifier."""
+
+    def test_jitter_around_boundary_is_stable(self):
+        """A score hovering around 6.0 does not flap between favorable and optimal."""
+        from bikersentinel.engine import StatusClassifier
+        classifier = StatusClassifier(hysteresis=0.3, min_dwell=0)
+        statuses = {classifier.update(score, t) for t, score in enumerate([6.1, 5.9, 6.2, 6.0, 5.8, 6.1])}
+        assert statuses == {"optimal"}
+        assert classifier.update(5.6, 10) == "favorable"
+
+    def test_min_dwell_delays_transition(self):
+        """A new status waits for the minimum dwell time."""
+        from bikersentinel.engine import StatusClassifier
+        classifier = StatusClassifier(hysteresis=0.0, min_dwell=60)
+        assert classifier.update(8.0, 0) == "optimal"
+        assert classifier.update(3.0, 30) == "optimal"
+        assert classifier.update(3.0, 61) == "degraded"
+
+    def test_pending_status_deadline(self):
+        """A status waiting out the dwell time reports when it may be taken."""
+        from bikersentinel.engine import StatusClassifier
+        classifier = StatusClassifier(hysteresis=0.0, min_dwell=60)
+        classifier.update(8.0, 10)
+        assert classifier.pending_until is None
+        classifier.update(3.0, 30)
+        assert (classifier.pending, classifier.pending_until) == ("degraded", 70)
+        classifier.update(8.0, 40)  # Back in range: nothing pending
+        assert classifier.pending_until is None
+
+    def test_veto_is_immediate(self):
+        """Entering dangerous ignores hysteresis and dwell; leaving it does not."""
+        from bikersentinel.engine import StatusClassifier
+        classifier = StatusClassifier(hysteresis=0.5, min_dwell=60)
+        assert classifier.update(8.0, 0) == "optimal"
+        assert classifier.update(0.0, 1) == "dangerous"
+        assert classifier.update(8.0, 2) == "dangerous"
+        assert classifier.update(8.0, 62) == "optimal"
+
+    def test_leaving_analyzing_is_immediate(self):
+        """The first score after missing data is shown at once, whatever the dwell time."""
+        from bikersentinel.engine import StatusClassifier
+        classifier = StatusClassifier(hysteresis=0.5, min_dwell=60)
+        assert classifier.update(None, 0) == "analyzing"
+        assert classifier.update(8.0, 1) == "optimal"
+        assert classifier.pending is None
+        assert classifier.update(None, 2) == "analyzing"  # Data lost again: immediate as well
+        assert classifier.update(8.0, 3) == "optimal"
+
+
 class TestBikerSentinelReasoning:
     """Test cases for BikerSentinelReasoning entity."""
     
     @pytest.fixture
-    def mock_hass(self):
-        """Create a mock Home Assistant instance."""
-        return MagicMock()
-    
-    @pytest.fixture
-    def mock_entry(self):
-        """Create a mock config entry."""
-        entry = MagicMock()
-        entry.entry_id = "test_entry_123"
-        
-        # Create a mock score entity with reasons and native_value
-        mock_score = MagicMock()
-        mock_score.extra_state_attributes = {
-            "reasons": ["Wind 50km/h (-1.5)", "Cold Temperature (-2.0)"],
-            "night_mode": "day",
-        }
-        mock_score.native_value = 6.5  # 10.0 - 3.5 malus
-        entry.runtime_data = {"score_entity": mock_score}
-        
-        return entry
+    def mock_coordinator(self):
+        """Create a mock coordinator whose snapshot has two factors."""
+        from bikersentinel.coordinator import EntrySnapshot
+        from bikersentinel.engine import Factor, ScoreResult
+        coordinator = MagicMock()
+        coordinator.entry.entry_id = "test_entry_123"
+        coordinator.data = EntrySnapshot(score=ScoreResult(
+            6.5,  # 10.0 - 3.5 malus
+            factors=(Factor("Wind 50km/h", -1.5), Factor("Cold Temperature", -2.0)),
+        ))
+        return coordinator
 
     @pytest.fixture
-    def reasoning_entity(self, mock_hass, mock_entry):
+    def reasoning_entity(self, mock_coordinator):
         """Create a BikerSentinelReasoning instance."""
         from bikersentinel.sensor import BikerSentinelReasoning
-        return BikerSentinelReasoning(mock_hass, mock_entry)
+        return BikerSentinelReasoning(mock_coordinator)
 
     def test_reasoning_primary_reason(self, reasoning_entity):
         """Test that reasons are included in output."""
@@ -465,6 +542,7 @@ class TestTripScoreEntities:
     def mock_hass(self):
         """Create a mock Home Assistant instance."""
         hass = MagicMock()
+        hass.data = {}
         hass.states = MagicMock()
         return hass
     
@@ -480,23 +558,20 @@ class TestTripScoreEntities:
             CONF_TRIP_DEPART_TIME: "08:00",
             CONF_TRIP_RETURN_TIME: "18:00",
         }
-        # Mock score entity
-        mock_score_entity = MagicMock()
-        mock_score_entity.native_value = 10.0
-        mock_score_entity.extra_state_attributes = {"reasons": []}
-        # Initialize runtime_data with trip score entities
-        entry.runtime_data = {
-            "score_entity": mock_score_entity,
-            "trip_score_go": None,
-            "trip_score_return": None,
-        }
+        entry.options = {}
         return entry
 
     @pytest.fixture
-    def trip_score_go(self, mock_hass, mock_entry_with_trips):
+    def coordinator(self, mock_hass, mock_entry_with_trips):
+        """Create the entry coordinator."""
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+        return BikerSentinelCoordinator(mock_hass, mock_entry_with_trips)
+
+    @pytest.fixture
+    def trip_score_go(self, coordinator):
         """Create a BikerSentinelTripScoreGo instance."""
         from bikersentinel.sensor import BikerSentinelTripScoreGo
-        return BikerSentinelTripScoreGo(mock_hass, mock_entry_with_trips)
+        return BikerSentinelTripScoreGo(coordinator)
 
     def test_trip_score_go_initialization(self, trip_score_go):
         """Test that trip score go initializes correctly."""
@@ -505,6 +580,7 @@ class TestTripScoreEntities:
     def test_trip_score_go_sunny_weather(self, mock_hass, trip_score_go):
         """Test trip score with sunny weather."""
         mock_hass.states.get.return_value = MockState("sunny")
+        trip_score_go.coordinator.async_refresh()
         score = trip_score_go.native_value
         assert score is not None
         assert score >= 0 and score <= 10
@@ -512,21 +588,22 @@ class TestTripScoreEntities:
     def test_trip_score_go_dangerous_weather(self, mock_hass, trip_score_go):
         """Test trip score with dangerous weather."""
         mock_hass.states.get.return_value = MockState("snowy")
+        trip_score_go.coordinator.async_refresh()
         score = trip_score_go.native_value
         assert score == 0.0
 
 
     @pytest.fixture
-    def trip_status_go(self, mock_hass, mock_entry_with_trips):
+    def trip_status_go(self, coordinator):
         """Create a BikerSentinelTripStatusGo instance."""
         from bikersentinel.sensor import BikerSentinelTripStatusGo
-        return BikerSentinelTripStatusGo(mock_hass, mock_entry_with_trips)
+        return BikerSentinelTripStatusGo(coordinator)
 
     @pytest.fixture
-    def trip_status_return(self, mock_hass, mock_entry_with_trips):
+    def trip_status_return(self, coordinator):
         """Create a BikerSentinelTripStatusReturn instance."""
         from bikersentinel.sensor import BikerSentinelTripStatusReturn
-        return BikerSentinelTripStatusReturn(mock_hass, mock_entry_with_trips)
+        return BikerSentinelTripStatusReturn(coordinator)
 
     def test_trip_status_go_initialization(self, trip_status_go):
         """Test that trip status go initializes correctly."""
@@ -539,60 +616,65 @@ class TestTripScoreEntities:
     def test_trip_status_go_analyzing_default(self, trip_status_go):
         """Test trip status defaulting to analyzing."""
         status = trip_status_go.native_value
-        # Should default to analyzing if no score entity found
+        # Should default to analyzing before the first update cycle
         assert status in ["analyzing", "error"]
 
     def test_trip_status_return_analyzing_default(self, trip_status_return):
         """Test trip status defaulting to analyzing."""
         status = trip_status_return.native_value
-        # Should default to analyzing if no score entity found
+        # Should default to analyzing before the first update cycle
         assert status in ["analyzing", "error"]
 
+    def test_one_evaluation_per_cycle(self, mock_hass, coordinator):
+        """All entities of an entry share one evaluation and write once per cycle."""
+        from bikersentinel import coordinator as coordinator_module
+        from bikersentinel import sensor
+
+        mock_hass.states.get.return_value = MockState("sunny")
+        entities = [
+            cls(coordinator) for cls in (
+                sensor.BikerSentinelScore, sensor.BikerSentinelStatus, sensor.BikerSentinelReasoning,
+                sensor.BikerSentinelTripScoreGo, sensor.BikerSentinelTripStatusGo,
+                sensor.BikerSentinelTripReasoningGo, sensor.BikerSentinelTripScoreReturn,
+                sensor.BikerSentinelTripStatusReturn, sensor.BikerSentinelTripReasoningReturn,
+            )
+        ]
+        writes = MagicMock()
+        for entity in entities:
+            coordinator.async_add_listener(writes)
+
+        with patch.object(coordinator_module, "evaluate_trip", wraps=coordinator_module.evaluate_trip) as spy:
+            coordinator.async_refresh()
+            for entity in entities:
+                entity.native_value
+                entity.extra_state_attributes
+        assert spy.call_count == 2  # go + return, computed once
+        assert writes.call_count == len(entities)
+
 
 class TestTripReasoningEntities:
     """Test cases for Trip Reasoning entities."""
     
     @pytest.fixture
-    def mock_hass(self):
-        """Create a mock Home Assistant instance."""
-        hass = MagicMock()
-        hass.states = MagicMock()
-        return hass
-    
-    @pytest.fixture
-    def mock_entry_with_trips(self):
-        """Create a config entry with trip configuration."""
-        entry = MagicMock()
-        entry.entry_id = "test_entry_with_trips"
-        entry.data = {
-            CONF_TRIP_ENABLED: True,
-            CONF_TRIP_HOME_WEATHER: "weather.office",
-            CONF_TRIP_OFFICE_WEATHER: "weather.home",
-            CONF_TRIP_DEPART_TIME: "08:00",
-            CONF_TRIP_RETURN_TIME: "18:00",
-        }
-        # Mock score entity
-        mock_score_entity = MagicMock()
-        mock_score_entity.native_value = 10.0
-        # Initialize runtime_data with trip score entities
-        entry.runtime_data = {
-            "score_entity": mock_score_entity,
-            "trip_score_go": None,
-            "trip_score_return": None,
-        }
-        return entry
+    def mock_coordinator(self):
+        """Create a mock coordinator with an empty snapshot."""
+        from bikersentinel.coordinator import EntrySnapshot
+        coordinator = MagicMock()
+        coordinator.entry.entry_id = "test_entry_with_trips"
+        coordinator.data = EntrySnapshot()
+        return coordinator
 
     @pytest.fixture
-    def trip_reasoning_go(self, mock_hass, mock_entry_with_trips):
+    def trip_reasoning_go(self, mock_coordinator):
         """Create a BikerSentinelTripReasoningGo instance."""
         from bikersentinel.sensor import BikerSentinelTripReasoningGo
-        return BikerSentinelTripReasoningGo(mock_hass, mock_entry_with_trips)
+        return BikerSentinelTripReasoningGo(mock_coordinator)
 
     @pytest.fixture
-    def trip_reasoning_return(self, mock_hass, mock_entry_with_trips):
+    def trip_reasoning_return(self, mock_coordinator):
         """Create a BikerSentinelTripReasoningReturn instance."""
         from bikersentinel.sensor import BikerSentinelTripReasoningReturn
-        return BikerSentinelTripReasoningReturn(mock_hass, mock_entry_with_trips)
+        return BikerSentinelTripReasoningReturn(mock_coordinator)
 
     def test_trip_reasoning_go_initialization(self, trip_reasoning_go):
         """Test that trip reasoning go initializes correctly."""
@@ -612,29 +694,25 @@ class TestTripReasoningEntities:
         reasoning = trip_reasoning_return.native_value
         assert reasoning in ["Analyzing...", "Calculating..."]
 
-    def test_trip_reasoning_go_matches_score_drop(self, mock_hass, mock_entry_with_trips, trip_reasoning_go):
+    def test_trip_reasoning_go_matches_score_drop(self, mock_coordinator, trip_reasoning_go):
         """Test that trip reasoning total matches score drop from 10.0."""
-        # Mock trip score entity
-        mock_trip_score = MagicMock()
-        mock_trip_score.native_value = 7.0
-        mock_trip_score.extra_state_attributes = {
-            "reasons": ["Home: Rain (-1.5)", "Home: Humidity 90.0% (-0.5)", "Office: Cold 6.4°C (-1.0)"]
-        }
-        mock_entry_with_trips.runtime_data["trip_score_go"] = mock_trip_score
+        from bikersentinel.coordinator import EntrySnapshot
+        from bikersentinel.engine import TripResult
+        mock_coordinator.data = EntrySnapshot(trip_go=TripResult(
+            7.0, ("Home: Rain (-1.5)", "Home: Humidity 90.0% (-0.5)", "Office: Cold 6.4°C (-1.0)"),
+        ))
         
         reasoning = trip_reasoning_go.native_value
         # Should show -3.0 (10.0 - 7.0)
         assert "-3.0" in reasoning
 
-    def test_trip_reasoning_return_matches_score_drop(self, mock_hass, mock_entry_with_trips, trip_reasoning_return):
+    def test_trip_reasoning_return_matches_score_drop(self, mock_coordinator, trip_reasoning_return):
         """Test that trip reasoning total matches score drop from 10.0."""
-        # Mock trip score entity
-        mock_trip_score = MagicMock()
-        mock_trip_score.native_value = 7.0
-        mock_trip_score.extra_state_attributes = {
-            "reasons": ["Office: Rain (-1.5)", "Home: Humidity 90.0% (-0.5)", "Home: Cold 6.4°C (-1.0)"]
-        }
-        mock_entry_with_trips.runtime_data["trip_score_return"] = mock_trip_score
+        from bikersentinel.coordinator import EntrySnapshot
+        from bikersentinel.engine import TripResult
+        mock_coordinator.data = EntrySnapshot(trip_return=TripResult(
+            7.0, ("Office: Rain (-1.5)", "Home: Humidity 90.0% (-0.5)", "Home: Cold 6.4°C (-1.0)"),
+        ))
         
         reasoning = trip_reasoning_return.native_value
         # Should show -3.0 (10.0 - 7.0)
@@ -642,3 +720,1724 @@ class TestTripReasoningEntities:
 
 
 
+class TestScoringKernel:
+    """Test cases for the pure evaluate() kernel and snapshot memoization."""
+
+    @pytest.fixture
+    def profile(self):
+        """Create a default rider profile."""
+        from bikersentinel.engine import RiderProfile
+        return RiderProfile.build(175, 80, "Roadster", "Standard", 3, "road")
+
+    def test_evaluate_is_pure(self, profile):
+        """Same inputs give equal results and inputs are left untouched."""
+        from bikersentinel.engine import ScoreInputs, evaluate
+        inputs = ScoreInputs(temperature=10, wind_speed=50, rain=2, weather="rainy", humidity=80)
+        first = evaluate(inputs, profile)
+        second = evaluate(inputs, profile)
+        assert first == second
+        assert inputs.surface_water == 0.0
+        with pytest.raises(AttributeError):
+            first.score = 5.0
+
+    def test_evaluate_factors_explain_score(self, profile):
+        """The factor list sums to the score drop when not clamped."""
+        from bikersentinel.engine import ScoreInputs, evaluate
+        result = evaluate(ScoreInputs(temperature=20, wind_speed=45, weather="fog"), profile)
+        total = sum(factor.malus for factor in result.factors)
+        assert result.score == round(10 + total, 1)
+        assert any(reason.startswith("Fog") for reason in result.reasons)
+
+    def test_evaluate_veto(self, profile):
+        """Vetoes return 0.0 with the veto as the only reason."""
+        from bikersentinel.engine import ScoreInputs, evaluate
+        result = evaluate(ScoreInputs(temperature=15, wind_speed=90), profile)
+        assert result.score == 0.0
+        assert result.veto == "Storm Winds"
+        assert result.reasons == ["Storm Winds"]
+
+    def test_native_value_memoized(self):
+        """Repeated cycles on an unchanged snapshot do not ingest history again."""
+        from bikersentinel import coordinator as coordinator_module
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+        from bikersentinel.sensor import BikerSentinelScore
+
+        hass = MagicMock()
+        hass.data = {}
+        entry = MagicMock()
+        entry.entry_id = "memo"
+        entry.data = {
+            CONF_SENSOR_TEMP: "sensor.temp",
+            CONF_SENSOR_WIND: "sensor.wind",
+            CONF_SENSOR_RAIN: "sensor.rain",
+        }
+        entry.options = {}
+        states = {
+            "sensor.temp": MockState("20"),
+            "sensor.wind": MockState("10"),
+            "sensor.rain": MockState("2"),
+        }
+        hass.states.get.side_effect = states.get
+        coordinator = BikerSentinelCoordinator(hass, entry)
+        entity = BikerSentinelScore(coordinator)
+
+        with patch.object(coordinator_module, "evaluate", wraps=coordinator_module.evaluate) as spy:
+            coordinator.async_refresh()
+            first = entity.native_value
+            coordinator.async_refresh()
+            assert entity.native_value == first
+            assert entity.native_value == first
+            assert spy.call_count == 1
+
+        # Ingested once: the 2 mm/h rate is recorded, no time has elapsed to wet the road yet
+        assert coordinator.history.surface.rain == 2.0
+        assert coordinator.history.surface.water == 0.0
+
+
+class TestCoordinator:
+    """Test cases for the per-entry coordinator update triggers."""
+
+    @pytest.fixture
+    def mock_entry(self):
+        """Create a config entry with trips enabled."""
+        entry = MagicMock()
+        entry.entry_id = "push"
+        entry.data = {
+            CONF_SENSOR_TEMP: "sensor.temp",
+            CONF_SENSOR_WIND: "sensor.wind",
+            CONF_SENSOR_RAIN: "sensor.rain",
+            CONF_WEATHER_ENTITY: "weather.home",
+            CONF_TRIP_ENABLED: True,
+            CONF_TRIP_HOME_WEATHER: "weather.home",
+            CONF_TRIP_OFFICE_WEATHER: "weather.office",
+            CONF_TRIP_DEPART_TIME: "08:00",
+            CONF_TRIP_RETURN_TIME: "18:00",
+        }
+        entry.options = {}
+        return entry
+
+    def test_subscribes_to_inputs_only(self, mock_entry):
+        """The coordinator tracks exactly its input entities, without duplicates."""
+        from bikersentinel import coordinator as coordinator_module
+
+        from bikersentinel import hub as hub_module
+
+        hass = MagicMock()
+        hass.data = {}
+        coordinator = coordinator_module.BikerSentinelCoordinator(hass, mock_entry)
+        with patch.object(hub_module, "async_track_state_change_event") as track:
+            coordinator.async_start()
+        assert [call.args[1] for call in track.call_args_list] == [
+            ["sensor.temp"], ["sensor.wind"], ["sensor.rain"], ["weather.home"], ["weather.office"],
+        ]
+
+    @pytest.fixture
+    def coordinator(self, mock_entry, event_loop):
+        """Create a coordinator on a real event loop with fast scheduling."""
+        from bikersentinel.const import CONF_UPDATE_QUIET_PERIOD, CONF_UPDATE_MAX_DELAY
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.loop = event_loop
+        hass.states.get.side_effect = {
+            "sensor.temp": MockState("20"),
+            "sensor.wind": MockState("10"),
+            "sensor.rain": MockState("0"),
+        }.get
+        mock_entry.options = {CONF_UPDATE_QUIET_PERIOD: 0.02, CONF_UPDATE_MAX_DELAY: 0.05}
+        return BikerSentinelCoordinator(hass, mock_entry)
+
+    def test_state_change_triggers_refresh(self, coordinator, event_loop):
+        """An input state change recomputes and notifies listeners."""
+        import asyncio
+
+        listener = MagicMock()
+        coordinator.async_add_listener(listener)
+
+        coordinator._handle_state_change(MagicMock())
+        event_loop.run_until_complete(asyncio.sleep(0.05))
+        assert coordinator.data.score is not None
+        listener.assert_called_once()
+
+    def test_burst_is_coalesced(self, coordinator, event_loop):
+        """A burst of N changes yields one evaluation and one write."""
+        import asyncio
+
+        listener = MagicMock()
+        coordinator.async_add_listener(listener)
+
+        for _ in range(5):
+            coordinator._handle_state_change(MagicMock())
+        event_loop.run_until_complete(asyncio.sleep(0.1))
+        listener.assert_called_once()
+        stats = coordinator.stats
+        assert (stats["requested"], stats["coalesced"], stats["executed"]) == (5, 4, 1)
+
+    def test_counters_in_diagnostics(self, coordinator, event_loop):
+        """The update and cache counters of the entry are exposed through the diagnostics."""
+        import asyncio
+        from bikersentinel.diagnostics import async_get_config_entry_diagnostics
+
+        for _ in range(3):
+            coordinator._handle_state_change(MagicMock())
+        event_loop.run_until_complete(asyncio.sleep(0.1))
+        coordinator.entry.runtime_data = {"coordinator": coordinator}
+        diagnostics = event_loop.run_until_complete(
+            async_get_config_entry_diagnostics(coordinator.hass, coordinator.entry)
+        )
+        counters = diagnostics["coordinator"]
+        assert (counters["requested"], counters["coalesced"], counters["executed"]) == (3, 2, 1)
+        assert {"analysis_hits", "analysis_misses", "writes", "writes_skipped"} <= set(counters)
+        assert diagnostics["forecasts"] == {"fetches": 0, "failures": 0}
+
+    def test_burst_respects_max_delay(self, coordinator, event_loop):
+        """A never-ending burst still evaluates once max_delay has elapsed."""
+        import asyncio
+
+        async def chatter():
+            for _ in range(10):
+                coordinator._handle_state_change(MagicMock())
+                await asyncio.sleep(0.01)
+
+        event_loop.run_until_complete(chatter())
+        # 0.1 s of changes every 10 ms with a 50 ms ceiling -> at least one run mid-burst
+        assert coordinator.stats["executed"] >= 1
+
+    def test_unchanged_state_is_not_written(self, coordinator):
+        """A cycle that changes nothing visible does not write state."""
+        from bikersentinel.sensor import BikerSentinelScore, BikerSentinelStatus
+
+        entities = [BikerSentinelScore(coordinator), BikerSentinelStatus(coordinator)]
+        for entity in entities:
+            entity.async_write_ha_state = MagicMock()
+            coordinator.async_add_listener(entity._handle_coordinator_update)
+
+        coordinator.async_refresh()
+        coordinator.async_refresh()
+        for entity in entities:
+            entity.async_write_ha_state.assert_called_once()
+        assert coordinator.stats["writes_skipped"] == 2
+
+    def test_score_epsilon(self, coordinator):
+        """Score moves below the epsilon are not written."""
+        from bikersentinel.engine import ScoreResult
+        from bikersentinel.sensor import BikerSentinelScore
+        from bikersentinel.coordinator import EntrySnapshot
+
+        coordinator.score_epsilon = 0.3
+        entity = BikerSentinelScore(coordinator)
+        entity.async_write_ha_state = MagicMock()
+        for score in (7.0, 7.2, 7.4):
+            coordinator.data = EntrySnapshot(score=ScoreResult(score))
+            entity._handle_coordinator_update()
+        # 7.0 written, 7.2 filtered, 7.4 is 0.4 away from the written 7.0
+        assert entity.async_write_ha_state.call_count == 2
+
+    def test_bootstrap_from_recorder(self, coordinator, event_loop):
+        """One recorder query in its executor fills the windows before the first evaluation."""
+        import sys
+        from datetime import timedelta
+
+        now = datetime.now().astimezone()
+        temp_rows = [MagicMock(state=str(15 - i), last_changed=now - timedelta(minutes=50 - 10 * i)) for i in range(5)]
+        rain_rows = [
+            MagicMock(state="2.0", last_changed=now - timedelta(hours=3)),
+            MagicMock(state="0.0", last_changed=now - timedelta(hours=2)),
+            MagicMock(state="unavailable", last_changed=now - timedelta(hours=1)),
+        ]
+        recorder = MagicMock()
+        recorder.history.get_significant_states.return_value = {"sensor.temp": temp_rows, "sensor.rain": rain_rows}
+
+        async def run_in_executor(func, *args):
+            return func(*args)
+
+        recorder.get_instance.return_value.async_add_executor_job = run_in_executor
+        with patch.dict(sys.modules, {"homeassistant.components.recorder": recorder}):
+            event_loop.run_until_complete(coordinator.async_bootstrap())
+
+        recorder.history.get_significant_states.assert_called_once()
+        assert recorder.history.get_significant_states.call_args[0][3] == ["sensor.temp", "sensor.rain"]
+        assert coordinator.history_ready
+        # 2 mm/h for an hour, three hours ago: partly dried but the road is still damp
+        assert 0.05 < coordinator.history.surface.water < 2.0
+        assert coordinator.history.temperature.rate == pytest.approx(-6.0)
+
+    def test_bootstrap_without_recorder(self, coordinator, event_loop):
+        """Without a usable recorder the history starts empty but is still marked ready."""
+        event_loop.run_until_complete(coordinator.async_bootstrap())
+        assert coordinator.history_ready
+        assert coordinator.history.surface.water == 0.0
+
+    def test_profile_hot_swap(self, coordinator):
+        """New ratios are applied in place: one re-evaluation, history and subscriptions kept."""
+        from dataclasses import replace
+        from bikersentinel import hub as hub_module
+
+        coordinator.hass.states.get.side_effect = {
+            "sensor.temp": MockState("5"),
+            "sensor.wind": MockState("20"),
+            "sensor.rain": MockState("0"),
+        }.get
+        with patch.object(hub_module, "async_track_state_change_event") as track:
+            coordinator.async_start()
+        coordinator.async_refresh()
+        history = coordinator.history
+        subscriptions = coordinator._hub.subscriptions
+        before = coordinator.data.score.score
+        listener = MagicMock()
+        coordinator.async_add_listener(listener)
+
+        assert coordinator.async_set_profile(replace(coordinator.profile, cold_ratio=0.0))
+        listener.assert_called_once()
+        assert coordinator.data.score.score > before
+        assert coordinator.history is history
+        assert coordinator._hub.subscriptions == subscriptions
+        track.return_value.assert_not_called()  # Nothing unsubscribed
+
+        assert not coordinator.async_set_profile(replace(coordinator.profile))
+        listener.assert_called_once()
+
+    def test_dwell_expiry_reevaluates(self, coordinator):
+        """A status held back by the dwell time is taken when the dwell ends, without a new input change."""
+        from bikersentinel import coordinator as coordinator_module
+        from bikersentinel.engine import ScoreResult
+
+        coordinator._classifiers["status"].min_dwell = 60.0
+        with patch.object(coordinator_module, "async_call_later") as call_later:
+            with patch.object(coordinator_module.time, "monotonic", return_value=1000.0), \
+                    patch.object(coordinator, "_compute_score", return_value=ScoreResult(8.0)):
+                coordinator.async_refresh()
+            call_later.assert_not_called()
+            with patch.object(coordinator_module.time, "monotonic", return_value=1030.0), \
+                    patch.object(coordinator, "_compute_score", return_value=ScoreResult(3.0)):
+                coordinator.async_refresh()
+            assert coordinator.data.status == "optimal"
+            _, delay, action = call_later.call_args.args
+            assert delay == 30.0  # Due when the optimal status has been held for 60 s
+            with patch.object(coordinator_module.time, "monotonic", return_value=1060.0), \
+                    patch.object(coordinator, "_compute_score", return_value=ScoreResult(3.0)):
+                action(datetime.now())
+            assert coordinator.data.status == "degraded"
+            assert call_later.call_count == 1  # Nothing pending any more
+
+    def test_options_update_listener(self, coordinator, event_loop):
+        """Saving options swaps the ratios into the running coordinator instead of reloading."""
+        from bikersentinel import async_update_options
+
+        entry = coordinator.entry
+        entry.runtime_data = {"coordinator": coordinator}
+        entry.options = {**entry.options, CONF_COLD_RATIO: 0.25}
+        event_loop.run_until_complete(async_update_options(coordinator.hass, entry))
+        assert coordinator.profile.cold_ratio == 0.25
+        coordinator.hass.config_entries.async_reload.assert_not_called()
+
+    def test_options_update_reapplies_tuning(self, coordinator, event_loop):
+        """Saved tuning options reach the scheduler, the score filter, the classifiers and the planner."""
+        from bikersentinel import async_update_options
+        from bikersentinel.const import (
+            CONF_RIDE_DURATION, CONF_SCORE_EPSILON, CONF_STATUS_HYSTERESIS, CONF_STATUS_MIN_DWELL,
+            CONF_UPDATE_MAX_DELAY, CONF_UPDATE_QUIET_PERIOD,
+        )
+
+        entry = coordinator.entry
+        entry.runtime_data = {"coordinator": coordinator}
+        classifier = coordinator._classifiers["status"]
+        classifier.update(8.0, 0.0)
+        entry.options = {
+            **entry.options, CONF_UPDATE_QUIET_PERIOD: 3.0, CONF_UPDATE_MAX_DELAY: 1.0, CONF_SCORE_EPSILON: 0.2,
+            CONF_STATUS_HYSTERESIS: 0.5, CONF_STATUS_MIN_DWELL: 300.0, CONF_RIDE_DURATION: 90.0,
+        }
+        with patch.object(coordinator, "async_refresh") as refresh:
+            event_loop.run_until_complete(async_update_options(coordinator.hass, entry))
+            refresh.assert_called_once()  # Same ratios: the tuning change alone re-evaluates
+            assert not coordinator.apply_settings()
+        assert (coordinator._scheduler.quiet_period, coordinator._scheduler.max_delay) == (3.0, 3.0)
+        assert coordinator.score_epsilon == 0.2
+        assert coordinator.ride_minutes == 90
+        assert (classifier.hysteresis, classifier.min_dwell) == (0.5, 300.0)
+        assert classifier.status == "optimal"  # State kept across the change
+
+    def test_set_malus_ratios_writes_option_keys(self, coordinator, event_loop):
+        """The service stores ratios under the option keys the entry reads."""
+        from bikersentinel.sensor import BikerSentinelConfigService
+
+        hass = coordinator.hass
+        entry = coordinator.entry
+        entry.entry_id = "rider"
+        hass.config_entries.async_entries.return_value = [entry]
+        call = MagicMock()
+        call.data = {"entry_id": "rider", "cold_ratio": 0.5, "rain_ratio": 2.0}
+        event_loop.run_until_complete(BikerSentinelConfigService(hass).async_handle_set_malus_ratios(call))
+        options = hass.config_entries.async_update_entry.call_args.kwargs["options"]
+        assert options[CONF_COLD_RATIO] == 0.5
+        assert options[CONF_RAIN_RATIO] == 2.0
+
+
+class TestHistory:
+    """Test cases for the history buffers."""
+
+    def test_surface_water_dries_after_shower(self):
+        """A morning shower wets the road, which then dries over the following hours."""
+        from datetime import timedelta
+        from bikersentinel.engine import classify_road
+        from bikersentinel.history import SurfaceWater
+
+        surface = SurfaceWater()
+        start = datetime(2024, 6, 1, 7, 0)
+        surface.add(start, 6.0, temperature=15, wind_speed=10, sun_elevation=20)  # 6 mm/h for an hour
+        surface.add(start + timedelta(hours=1), 0.0, temperature=15, wind_speed=10, sun_elevation=30)
+        assert classify_road(surface.water, 15) == "wet"
+        surface.add(start + timedelta(hours=4), 0.0, temperature=20, wind_speed=10, sun_elevation=45)
+        assert classify_road(surface.water, 20) == "damp"
+        surface.add(start + timedelta(hours=11), 0.0, temperature=22, wind_speed=10, sun_elevation=60)
+        assert surface.water == 0.0
+        assert classify_road(surface.water, 22) == "dry"
+
+    def test_surface_water_drying_drivers(self):
+        """Warmth, wind and sun each speed up drying; rain beyond the maximum runs off."""
+        from datetime import timedelta
+        from bikersentinel.const import ROAD_WATER_MAX
+        from bikersentinel.engine import classify_road
+        from bikersentinel.history import SurfaceWater
+
+        rate = SurfaceWater.drying_rate
+        assert rate(20, 0, None) > rate(0, 0, None)
+        assert rate(0, 30, None) > rate(0, 0, None)
+        assert rate(0, 0, 60) > rate(0, 0, -5) == rate(0, 0, None)
+
+        surface = SurfaceWater()
+        start = datetime(2024, 1, 1)
+        for minute in range(0, 61, 5):
+            surface.add(start + timedelta(minutes=minute), 25.0, temperature=-2)  # Downpour, 25 mm/h
+        assert classify_road(surface.water, -2) == "icy"
+        assert surface.water == ROAD_WATER_MAX
+
+    def test_surface_water_independent_of_sampling_rate(self):
+        """A rain rate held for an hour gives the same film whether sampled hourly or every minute."""
+        from bikersentinel.engine import ScoreInputs
+        from bikersentinel.history import EngineHistory
+
+        start = datetime(2024, 1, 1, 12, 0)
+        films = []
+        for step in (60, 5, 1):
+            history = EngineHistory()
+            for minute in range(0, 61, step):
+                history.ingest(ScoreInputs(temperature=10.0, wind_speed=5.0, rain=0.5), start + timedelta(minutes=minute))
+            films.append(history.surface.water)
+        assert films[0] == pytest.approx(films[1]) == pytest.approx(films[2])
+        assert 0.05 < films[0] < 0.5  # Damp: 0.5 mm fell, some of it already dried
+
+        # Recorder replay (one sample per state change) ends on the same film
+        replayed = EngineHistory()
+        replayed.replay([(start, 10.0), (start + timedelta(hours=1), 10.0)], [(start, 0.5)])
+        assert replayed.surface.water == pytest.approx(films[0], rel=0.2)  # Replay dries without wind
+
+    def test_cumulative_rain_sensor(self):
+        """An accumulated-precipitation sensor is differenced over time into the same film as a rate sensor."""
+        from bikersentinel.engine import ScoreInputs
+        from bikersentinel.history import EngineHistory
+        from bikersentinel.hub import SensorHub
+
+        hass = MagicMock()
+        hass.data = {}
+        states = {
+            "sensor.temp": MockState("10"),
+            "sensor.wind": MockState("5"),
+            "sensor.rain_rate": MockState("0.1", {"unit_of_measurement": "in/h"}),
+            "sensor.rain_today": MockState("0.1", {"unit_of_measurement": "in", "state_class": "total_increasing"}),
+        }
+        hass.states.get.side_effect = states.get
+        hub = SensorHub(hass)
+        assert not hub.get("sensor.rain_rate").cumulative and hub.get("sensor.rain_today").cumulative
+        rate = hub.read_inputs(("sensor.temp", "sensor.wind", "sensor.rain_rate", None))
+        total = hub.read_inputs(("sensor.temp", "sensor.wind", "sensor.rain_today", None))
+        assert (rate.rain, rate.rain_total) == (pytest.approx(2.54), None)
+        assert (total.rain, total.rain_total) == (0.0, pytest.approx(2.54))  # Not a rain rate of 2.54 mm/h
+
+        # 2 mm/h for half an hour, then 4 mm/h; the daily counter resets at the end
+        start = datetime(2024, 1, 1, 12, 0)
+        rates, totals = EngineHistory(), EngineHistory()
+        for minute, rain, rain_total in ((0, 2.0, 10.0), (30, 4.0, 11.0), (60, 0.0, 13.0)):
+            when = start + timedelta(minutes=minute)
+            rates.ingest(ScoreInputs(temperature=10.0, wind_speed=5.0, rain=rain), when)
+            enriched = totals.ingest(ScoreInputs(temperature=10.0, wind_speed=5.0, rain_total=rain_total), when)
+        assert totals.surface.water == pytest.approx(rates.surface.water)
+        assert enriched.rain == pytest.approx(4.0)  # Mean rate over the last interval
+        enriched = totals.ingest(ScoreInputs(temperature=10.0, wind_speed=5.0, rain_total=0.5), start + timedelta(minutes=90))
+        assert enriched.rain == pytest.approx(1.0)  # Reset to 0 then 0.5 mm in half an hour
+
+        # The counter survives a restart; replay differences recorded totals as well
+        restored = EngineHistory()
+        restored.restore(totals.as_dict())
+        assert restored.surface.total == 0.5
+        replayed = EngineHistory()
+        replayed.replay([(start, 10.0)], [(start, 10.0), (start + timedelta(minutes=30), 11.0)], cumulative=True)
+        assert replayed.surface.rain == pytest.approx(2.0)
+
+    def test_temperature_trend_slope_and_drop(self):
+        """A steady fall is reported in °C/h with its drop below the window maximum."""
+        from datetime import timedelta
+        from bikersentinel.history import TemperatureTrend
+
+        trend = TemperatureTrend()
+        start = datetime(2024, 1, 1, 6, 0)
+        for minute in range(0, 61, 5):
+            trend.add(start + timedelta(minutes=minute), 12.0 - minute * 0.1)  # -6 °C/h
+        assert trend.rate == pytest.approx(-6.0)
+        assert trend.drop == pytest.approx(5.5)  # window (55 min] -> 11.5 down to 6.0
+
+    def test_temperature_trend_window_expiry(self):
+        """Samples older than the window no longer affect the trend."""
+        from datetime import timedelta
+        from bikersentinel.history import TemperatureTrend
+
+        trend = TemperatureTrend()
+        start = datetime(2024, 1, 1)
+        trend.add(start, 20.0)
+        for minute in range(120, 181, 10):
+            trend.add(start + timedelta(minutes=minute), 10.0)
+        assert trend.rate == pytest.approx(0.0)
+        assert trend.drop == 0.0
+        assert trend.spread == 0.0
+
+    def test_dropping_trend_applies_malus(self):
+        """A dropping trend now reaches the score as a malus."""
+        from bikersentinel.engine import RiderProfile, ScoreInputs, evaluate
+
+        profile = RiderProfile.build(175, 80, "Roadster", "Standard", 3, "road")
+        result = evaluate(ScoreInputs(temperature=8, wind_speed=5, temp_rate=-7.0, temp_drop=6.0), profile)
+        assert result.temperature_trend == "dropping"
+        assert any(reason.startswith("Temp Dropping") for reason in result.reasons)
+
+    def test_history_storage_round_trip(self):
+        """Saved buffers restore to the same road water and trend, through JSON."""
+        import json
+        from datetime import timedelta
+        from bikersentinel.engine import ScoreInputs
+        from bikersentinel.history import EngineHistory
+
+        history = EngineHistory()
+        start = datetime(2024, 1, 1, 6, 0)
+        for minute in range(0, 61, 5):
+            when = start + timedelta(minutes=minute)
+            rain = 0.2 if minute < 60 else 0.0  # Drizzle that stops at the last sample
+            history.ingest(ScoreInputs(temperature=12.0 - minute * 0.1, wind_speed=5, rain=rain), when)
+
+        restored = EngineHistory()
+        restored.restore(json.loads(json.dumps(history.as_dict())))
+        assert restored.surface.water == pytest.approx(history.surface.water)
+        assert restored.temperature.rate == pytest.approx(history.temperature.rate, rel=1e-4)
+        assert restored.temperature.drop == pytest.approx(history.temperature.drop, abs=1e-4)
+
+        # Restored state keeps evolving as new samples arrive
+        later = start + timedelta(hours=25)
+        restored.ingest(ScoreInputs(temperature=5.0, wind_speed=5, rain=0.0), later)
+        assert restored.surface.water == 0.0
+
+    def test_history_restore_ignores_empty_data(self):
+        """Missing data leaves the buffers empty."""
+        from bikersentinel.history import EngineHistory
+
+        history = EngineHistory()
+        history.restore({})
+        assert history.surface.water == 0.0
+        assert history.temperature.rate is None
+
+
+class TestForecast:
+    """Test cases for forecast-driven trip scoring."""
+
+    @staticmethod
+    def hourly(start, conditions):
+        """Hourly forecast rows starting at ``start``."""
+        from datetime import timedelta
+        return [
+            {"datetime": (start + timedelta(hours=i)).isoformat(), "condition": condition, "temperature": 15}
+            for i, condition in enumerate(conditions)
+        ]
+
+    @pytest.fixture
+    def hass(self, event_loop):
+        """Create a hass whose weather.get_forecasts answers from hass.responses after hass.delays."""
+        import asyncio
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.async_create_task = event_loop.create_task
+        hass.states.get.return_value = MockState("sunny")
+        hass.responses = {}
+        hass.delays = {}
+
+        async def async_call(domain, service, data, blocking=False, return_response=False):
+            await asyncio.sleep(hass.delays.get(data["entity_id"], 0))
+            return {data["entity_id"]: {"forecast": hass.responses[data["entity_id"]]}}
+
+        hass.services.async_call = MagicMock(side_effect=async_call)
+        return hass
+
+    def make_coordinator(self, hass, entry_id, depart="08:00", waypoints=None):
+        from bikersentinel.const import CONF_TRIP_WAYPOINTS
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+
+        entry = MagicMock()
+        entry.entry_id = entry_id
+        entry.data = {
+            CONF_TRIP_ENABLED: True,
+            CONF_TRIP_HOME_WEATHER: "weather.home",
+            CONF_TRIP_OFFICE_WEATHER: "weather.office",
+            CONF_TRIP_DEPART_TIME: depart,
+            CONF_TRIP_RETURN_TIME: "18:00",
+            CONF_TRIP_WAYPOINTS: waypoints or [],
+        }
+        entry.options = {}
+        return BikerSentinelCoordinator(hass, entry)
+
+    def test_forecast_row_lookup(self):
+        """The row of the hour containing the time is returned, None outside the forecast."""
+        from datetime import timedelta
+        from bikersentinel.forecast import HourlyForecast
+
+        start = datetime(2024, 6, 1, 8, 0).astimezone()
+        forecast = HourlyForecast(self.hourly(start, ["sunny", "rainy", "cloudy"]))
+        assert forecast.at(start + timedelta(minutes=90))["condition"] == "rainy"
+        assert forecast.at(start - timedelta(minutes=1)) is None
+        assert forecast.at(start + timedelta(hours=3)) is None
+
+    def test_trip_scored_on_forecast_hour(self, hass, event_loop):
+        """Current sunshine does not hide the rain forecast at departure time."""
+        from bikersentinel.coordinator import _next_occurrence
+
+        depart = _next_occurrence("08:00")
+        start = depart.replace(minute=0)
+        hass.responses = {
+            "weather.home": self.hourly(start, ["rainy"] * 12),
+            "weather.office": self.hourly(start, ["rainy"] * 12),
+        }
+        coordinator = self.make_coordinator(hass, "forecast")
+        event_loop.run_until_complete(coordinator.async_update_forecasts())
+        coordinator.async_refresh()
+
+        trip = coordinator.data.trip_go
+        assert trip.forecast_time == depart.isoformat()
+        assert any("Rain" in reason for reason in trip.reasons)
+        assert trip.score < 10.0
+
+    def test_forecast_rows_in_integration_units(self, hass, event_loop):
+        """Rows of an imperial weather entity are converted before the trip rules see them."""
+        from bikersentinel.coordinator import _next_occurrence
+        from bikersentinel.forecast import get_forecast_cache
+        from bikersentinel.planner import minute_scores
+
+        hass.states.get.return_value = MockState(
+            "sunny", {"temperature_unit": "°F", "wind_speed_unit": "mph", "precipitation_unit": "in"}
+        )
+        start = _next_occurrence("08:00").replace(minute=0)
+        rows = [{**row, "wind_speed": 30, "precipitation": 0.1} for row in self.hourly(start, ["sunny"] * 12)]
+        for row in rows:
+            row["temperature"] = 23
+        hass.responses = {"weather.home": rows, "weather.office": rows}
+        coordinator = self.make_coordinator(hass, "imperial")
+        event_loop.run_until_complete(coordinator.async_update_forecasts())
+
+        forecast = get_forecast_cache(hass).get("weather.home")
+        row = forecast.at(start)
+        assert row["temperature"] == pytest.approx(-5.0)
+        assert row["wind_speed"] == pytest.approx(48.28, abs=0.01)
+        assert row["precipitation"] == pytest.approx(2.54)
+        assert rows[0]["temperature"] == 23  # The service response is not modified
+
+        coordinator.async_refresh()
+        reasons = coordinator.data.trip_go.reasons
+        assert any("Cold -5.0°C" in reason for reason in reasons)
+        assert any("Wind 48.28" in reason for reason in reasons)
+        scores, _ = minute_scores(forecast, coordinator.profile)
+        assert scores[0] == pytest.approx(10.0 - 1.0 - 0.7)
+
+    def test_forecast_shared_between_entries(self, hass, event_loop):
+        """Entries using the same weather entities share one fetch until the TTL or a state change."""
+        now = datetime.now().astimezone()
+        hass.responses = {"weather.home": self.hourly(now, ["sunny"]), "weather.office": self.hourly(now, ["sunny"])}
+        first = self.make_coordinator(hass, "first")
+        second = self.make_coordinator(hass, "second", depart="09:00")
+        assert first._forecasts is second._forecasts
+
+        event_loop.run_until_complete(first.async_update_forecasts())
+        event_loop.run_until_complete(second.async_update_forecasts())
+        assert hass.services.async_call.call_count == 2  # home + office, once
+
+        # A new provider state makes the cached forecast stale (revalidated in the background)
+        import asyncio
+        hass.states.get.return_value = MockState("rainy")
+        event_loop.run_until_complete(second.async_update_forecasts())
+        event_loop.run_until_complete(asyncio.sleep(0.01))
+        assert hass.services.async_call.call_count == 4
+
+    def test_fetches_are_concurrent_and_single_flight(self, hass, event_loop):
+        """Entities are fetched in parallel, and simultaneous requests share one call."""
+        import asyncio
+        from bikersentinel.forecast import get_forecast_cache
+
+        now = datetime.now().astimezone()
+        entities = [f"weather.provider_{i}" for i in range(5)]
+        hass.responses = {entity_id: self.hourly(now, ["sunny"]) for entity_id in entities}
+        hass.delays = {entity_id: 0.05 for entity_id in entities}
+        cache = get_forecast_cache(hass)
+
+        async def many_entries():
+            return await asyncio.gather(*(cache.async_get_many(entities) for _ in range(3)))
+
+        started = event_loop.time()
+        results = event_loop.run_until_complete(many_entries())
+        elapsed = event_loop.time() - started
+        assert hass.services.async_call.call_count == 5
+        assert all(result[entity_id] is not None for result in results for entity_id in entities)
+        assert elapsed < 0.2  # bounded by the slowest provider, not the sum (0.75 s)
+
+    def test_slow_provider_serves_stale(self, hass, event_loop):
+        """A provider timing out keeps its cached forecast and does not delay the others."""
+        import asyncio
+        from bikersentinel.forecast import get_forecast_cache
+
+        now = datetime.now().astimezone()
+        hass.responses = {"weather.fast": self.hourly(now, ["sunny"]), "weather.slow": self.hourly(now, ["cloudy"])}
+        cache = get_forecast_cache(hass)
+        cache.timeout = 0.05
+        event_loop.run_until_complete(cache.async_get_many(["weather.fast", "weather.slow"]))
+        stale = cache.get("weather.slow")
+
+        # Both providers publish new states; the slow one now hangs
+        hass.states.get.return_value = MockState("rainy")
+        hass.delays = {"weather.slow": 1.0}
+        updated = MagicMock()
+        cache.async_add_listener(["weather.fast", "weather.slow"], updated)
+        result = event_loop.run_until_complete(cache.async_get_many(["weather.fast", "weather.slow"]))
+        assert result["weather.slow"] is stale  # served at once while revalidating
+        event_loop.run_until_complete(asyncio.sleep(0.1))
+        assert updated.call_count == 1  # fast provider refreshed, slow one timed out
+        assert cache.get("weather.slow") is stale
+        assert cache.failures == 1
+
+
+    def test_route_weighted_by_segment_time(self):
+        """A long rainy pass weighs more than the sunny ends and is reported as worst segment."""
+        from bikersentinel.engine import RiderProfile, RouteLeg, evaluate_trip
+
+        profile = RiderProfile.build(175, 80, "Roadster", "Standard", 3, "road")
+        sunny = MockState("sunny")
+        result = evaluate_trip(
+            sunny, sunny, profile,
+            waypoints=[RouteLeg("weather.pass", MockState("rainy"), 40), RouteLeg("weather.coast", sunny, 30)],
+        )
+        # Rain -1.5 over 40 of 90 minutes, plus the wet road malus
+        assert result.score == pytest.approx(round(10 - 1.5 * 40 / 90 - 0.5, 1))
+        assert result.worst_segment == "weather.pass"
+        assert evaluate_trip(sunny, sunny, profile).worst_segment is None
+
+    def test_waypoints_sampled_at_arrival(self, hass, event_loop):
+        """Each waypoint uses the forecast hour the rider reaches it, from the shared cache."""
+        from bikersentinel.coordinator import _next_occurrence
+
+        depart = _next_occurrence("08:00")
+        start = depart.replace(minute=0)
+        sunny = self.hourly(start, ["sunny"] * 12)
+        hass.responses = {
+            "weather.home": sunny,
+            "weather.office": sunny,
+            # Rain only from 09:00: the pass is reached at 08:10, the coast at 09:10
+            "weather.pass": self.hourly(start, ["sunny"] + ["rainy"] * 11),
+            "weather.coast": self.hourly(start, ["sunny"] + ["rainy"] * 11),
+        }
+        coordinator = self.make_coordinator(hass, "route", waypoints=[
+            {"entity_id": "weather.pass", "minutes": 60},
+            {"entity_id": "weather.coast", "minutes": 30},
+        ])
+        event_loop.run_until_complete(coordinator.async_update_forecasts())
+        coordinator.async_refresh()
+
+        assert hass.services.async_call.call_count == 4  # one fetch per entity, shared by both trips
+        trip = coordinator.data.trip_go
+        assert trip.worst_segment == "weather.coast"
+        assert any(reason.startswith("weather.coast: Rain") for reason in trip.reasons)
+        assert not any(reason.startswith("weather.pass: Rain") for reason in trip.reasons)
+
+    def test_parse_waypoints(self):
+        """Waypoints keep their order; minutes default to the endpoint weight and must be positive and finite."""
+        from bikersentinel.engine import parse_waypoints
+
+        assert parse_waypoints(" weather.pass:25, weather.coast , ") == [
+            {"entity_id": "weather.pass", "minutes": 25.0},
+            {"entity_id": "weather.coast", "minutes": 10.0},
+        ]
+        assert parse_waypoints("") == []
+        for text in ("sensor.pass:25", "weather.pass:0", "weather.pass:-5", "weather.pass:nan",
+                     "weather.pass:inf", "weather.pass:soon"):
+            with pytest.raises(ValueError):
+                parse_waypoints(text)
+
+    def test_analysis_shared_across_trips_and_entries(self, hass):
+        """Go, return and a second entry reuse one analysis per weather state and ratio set."""
+        weather = {"state": MockState("rainy", {"temperature": 3})}
+        hass.states.get.side_effect = lambda entity_id: weather["state"] if str(entity_id).startswith("weather.") else None
+        first = self.make_coordinator(hass, "first")
+        second = self.make_coordinator(hass, "second")
+        first.async_refresh()
+        assert (first.stats["analysis_hits"], first.stats["analysis_misses"]) == (2, 2)  # return reuses go
+        second.async_refresh()
+        assert (second.stats["analysis_hits"], second.stats["analysis_misses"]) == (6, 2)
+
+        # A new state (new last_updated) is analyzed again
+        weather["state"] = MockState("rainy", {"temperature": 3})
+        first.async_refresh()
+        assert first.stats["analysis_misses"] == 4
+
+    def test_analysis_cache_keys_and_eviction(self):
+        """Different ratio sets do not share results; the least recently used entry is evicted."""
+        from bikersentinel.engine import AnalysisCache
+
+        cache = AnalysisCache(maxsize=2)
+        state = MockState("fog")
+        default = (1.0,) * 7
+        double_fog = (1.0, 2.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+        assert cache.analyze(("weather.home", 1), state, "Home", default)["malus"] == -1.0
+        assert cache.analyze(("weather.home", 1), state, "Home", double_fog)["malus"] == -2.0
+        assert cache.analyze(("weather.home", 1), state, "Home", default)["malus"] == -1.0
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        cache.analyze(("weather.office", 1), state, "Office", default)  # evicts the double_fog entry
+        cache.analyze(("weather.home", 1), state, "Home", double_fog)
+        assert (cache.hits, cache.misses) == (1, 4)
+        # Without a source the analysis is never cached
+        cache.analyze(None, state, "Home", default)
+        assert (cache.hits, cache.misses) == (1, 4)
+
+class TestDeparturePlanner:
+    """Test cases for the best departure window optimizer."""
+
+    @pytest.fixture
+    def profile(self):
+        """Create a default rider profile."""
+        from bikersentinel.engine import RiderProfile
+        return RiderProfile.build(175, 80, "Roadster", "Standard", 3, "road")
+
+    @staticmethod
+    def forecast(start, rows):
+        from bikersentinel.forecast import HourlyForecast
+        return HourlyForecast([
+            {"datetime": (start + timedelta(hours=i)).isoformat(), **row} for i, row in enumerate(rows)
+        ])
+
+    def test_minute_scores_match_trip_rules(self, profile):
+        """The vectorized malus equals analyze_weather_conditions on every forecast hour."""
+        from bikersentinel.engine import WeatherSnapshot, analyze_weather_conditions
+        from bikersentinel.planner import minute_scores
+
+        start = datetime(2024, 6, 1, 6, 0).astimezone()
+        rows = [
+            {"condition": "rainy", "temperature": 3, "wind_speed": 50, "humidity": 90},
+            {"condition": "fog", "temperature": 12, "wind_speed": 10, "humidity": 60},
+            {"condition": "cloudy", "temperature": 33, "wind_speed": 45, "humidity": 40},
+            {"condition": "sunny", "temperature": 20, "wind_speed": 5},
+        ]
+        forecast = self.forecast(start, rows)
+        scores, dangerous = minute_scores(forecast, profile)
+        assert not dangerous.any()
+        for hour, row in enumerate(forecast.rows):
+            expected = analyze_weather_conditions(WeatherSnapshot.from_forecast(row), "Home")["malus"]
+            assert scores[hour * 60] == pytest.approx(10.0 + expected)
+
+    def test_clear_night_scores_below_clear_afternoon(self, profile):
+        """With a sun table, each minute carries the kernel's night and glare malus."""
+        from bikersentinel.planner import DepartureOptimizer, minute_scores
+        from bikersentinel.sun import SunTable
+
+        sun = SunTable(*TestSun.PARIS)
+        start = datetime(2024, 6, 21, 0, 0, tzinfo=timezone(timedelta(hours=2)))
+        forecast = self.forecast(start, [{"condition": "sunny", "temperature": 20, "wind_speed": 5}] * 24)
+        scores, _ = minute_scores(forecast, profile, sun)
+        night, afternoon = scores[1 * 60], scores[15 * 60]
+        assert night < afternoon
+        assert night == 10.0 - 5.0 * profile.night_ratio  # Sun far below the horizon: full night malus
+        # Without a sun table the clear hours are all equal
+        assert minute_scores(forecast, profile)[0].min() == 10.0
+
+        plan = DepartureOptimizer(forecast, profile, ride_minutes=45, sun=sun).plan(start)
+        departure = sun.position(plan.best.departure)
+        assert departure.elevation > 10
+
+    def test_sun_malus_matches_classifiers(self, profile):
+        """The vectorized malus equals the scalar classifiers, including at every threshold."""
+        from bikersentinel.const import NIGHT_MODE_MALUS, SOLAR_BLINDNESS_MALUS
+        from bikersentinel.engine import classify_glare, classify_night
+        import numpy as np
+        from bikersentinel.planner import sun_malus
+
+        elevations = [-90, -6.0001, -6, -5.9999, 0, 0.0001, 5, 5.0001, 10, 10.0001, 45]
+        azimuths = [0, 90, 120, 120.0001, 150, 150.0001, 180, 209.9999, 210, 239.9999, 240, 270, 359.9, 360, 540]
+        grid = np.array([(e, a) for e in elevations for a in azimuths], dtype=float)
+        sun = MagicMock()
+        sun.positions.return_value = (grid[:, 0], grid[:, 1])
+
+        malus = sun_malus(np.zeros(len(grid)), sun, profile)
+        expected = [
+            NIGHT_MODE_MALUS[classify_night(e)] * profile.night_ratio
+            + SOLAR_BLINDNESS_MALUS[classify_glare(e, a)] * profile.night_ratio
+            for e, a in grid.tolist()
+        ]
+        assert malus.tolist() == expected
+
+    def test_best_window_and_runner_up(self, profile):
+        """The dry gap between showers wins; the runner-up does not overlap it."""
+        from bikersentinel.planner import DepartureOptimizer
+
+        start = datetime(2024, 6, 1, 6, 0).astimezone()
+        conditions = ["rainy", "rainy", "sunny", "sunny", "rainy", "cloudy", "cloudy", "rainy"]
+        forecast = self.forecast(start, [{"condition": c, "temperature": 18} for c in conditions])
+        optimizer = DepartureOptimizer(forecast, profile, ride_minutes=45)
+        plan = optimizer.plan(start)
+
+        assert plan.best.departure == start + timedelta(hours=2)
+        assert plan.best.arrival == start + timedelta(hours=2, minutes=45)
+        assert plan.best.score == 10.0
+        assert abs(plan.runner_up.departure - plan.best.departure) >= timedelta(minutes=45)
+        assert plan.runner_up.score <= plan.best.score
+
+        # Later in the morning the sunny gap is gone; the cloudy hours are best
+        later = optimizer.plan(start + timedelta(hours=4))
+        assert later.best.departure == start + timedelta(hours=5)
+        assert later.best.score == pytest.approx(9.7)
+
+    def test_ride_through_danger_is_vetoed(self, profile):
+        """A ride crossing a dangerous hour scores 0, even if most of it is sunny."""
+        from bikersentinel.planner import DepartureOptimizer
+
+        start = datetime(2024, 6, 1, 6, 0).astimezone()
+        forecast = self.forecast(start, [{"condition": c} for c in ("sunny", "hail", "sunny")])
+        optimizer = DepartureOptimizer(forecast, profile, ride_minutes=30)
+        assert optimizer.scores[40] == 0.0  # 06:40-07:10 crosses the hail hour
+        assert optimizer.scores[0] == 10.0
+
+    def test_recomputed_only_when_forecast_changes(self, profile):
+        """The coordinator reuses the scored forecast until the cache replaces it."""
+        from bikersentinel import coordinator as coordinator_module
+        from bikersentinel.forecast import get_forecast_cache
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.states.get.return_value = None
+        entry = MagicMock()
+        entry.entry_id = "departure"
+        entry.data = {CONF_WEATHER_ENTITY: "weather.home"}
+        entry.options = {}
+        coordinator = coordinator_module.BikerSentinelCoordinator(hass, entry)
+        cache = get_forecast_cache(hass)
+        now = datetime.now().astimezone()
+        cache._forecasts["weather.home"] = self.forecast(now, [{"condition": "sunny"}] * 13)
+
+        with patch.object(coordinator_module, "DepartureOptimizer", wraps=coordinator_module.DepartureOptimizer) as spy:
+            coordinator.async_refresh()
+            coordinator.async_refresh()
+            assert spy.call_count == 1
+            cache._forecasts["weather.home"] = self.forecast(now, [{"condition": "cloudy"}] * 13)
+            coordinator.async_refresh()
+            assert spy.call_count == 2
+        assert coordinator.data.departure.best.score == pytest.approx(9.7)
+
+
+class TestSun:
+    """Test the local sun table."""
+
+    PARIS = (48.8566, 2.3522)
+
+    def test_paris_summer_solstice_events(self):
+        """Sunrise, sunset and civil twilight match the almanac within a few minutes."""
+        from bikersentinel.sun import SunTable
+
+        tz = timezone(timedelta(hours=2))
+        day = SunTable(*self.PARIS).day(datetime(2024, 6, 21, 12, 0, tzinfo=tz))
+        for event, expected in (
+            (day.dawn, (5, 4)), (day.sunrise, (5, 47)), (day.sunset, (21, 58)), (day.dusk, (22, 40)),
+        ):
+            minutes = event.hour * 60 + event.minute
+            assert abs(minutes - (expected[0] * 60 + expected[1])) <= 3
+        noon = day.position(datetime(2024, 6, 21, 13, 50, tzinfo=tz))
+        assert noon.elevation == pytest.approx(64.6, abs=0.5)
+        assert noon.azimuth == pytest.approx(180, abs=5)
+
+    def test_polar_day_has_no_events(self):
+        """North of the polar circle in June the sun never sets."""
+        from bikersentinel.sun import SunTable
+
+        day = SunTable(78.2, 15.6).day(datetime(2024, 6, 21, 12, 0).astimezone())
+        assert day.sunrise is None and day.sunset is None
+        assert day.as_attributes()["sunset"] is None
+
+    def test_night_check_uses_the_date(self):
+        """A trip time is judged on its own day, not on today's sun times."""
+        from bikersentinel.sun import SunTable
+
+        tz = timezone(timedelta(hours=1))
+        table = SunTable(*self.PARIS)
+        # 07:30 is night in late December but daylight in June
+        assert table.is_night(datetime(2024, 12, 21, 7, 30, tzinfo=tz))
+        assert not table.is_night(datetime(2024, 6, 21, 7, 30, tzinfo=tz))
+        assert not table.is_night(datetime(2024, 12, 21, 13, 0, tzinfo=tz))
+
+    def test_days_are_computed_once_and_pruned(self):
+        """Each day is built once; the midnight refresh drops past days and prepares tomorrow."""
+        from bikersentinel import sun as sun_module
+
+        table = sun_module.SunTable(*self.PARIS)
+        now = datetime(2024, 3, 1, 12, 0).astimezone()
+        with patch.object(sun_module, "SunDay", wraps=sun_module.SunDay) as spy:
+            table.position(now)
+            table.position(now + timedelta(hours=3))
+            assert spy.call_count == 1
+            table.refresh(now + timedelta(days=1))
+            assert spy.call_count == 3
+        assert sorted(table._days) == [(now + timedelta(days=1)).date(), (now + timedelta(days=2)).date()]
+
+    def test_shared_table_requires_a_location(self):
+        """The table is shared in hass.data and skipped without a configured location."""
+        from bikersentinel.sun import get_sun_table
+
+        hass = MagicMock()
+        hass.data = {}
+        assert get_sun_table(hass) is None
+        hass.config.latitude, hass.config.longitude = self.PARIS
+        assert get_sun_table(hass) is get_sun_table(hass)
+
+
+class TestFleet:
+    """Test fleet mode (many profiles scored in one vectorized pass)."""
+
+    PROFILES = [
+        ("Roadster", "Standard", 3, "road", 175, 80, {}),
+        ("Sportive", "Minimal", 5, "highway", 160, 55, {"cold_ratio": 2.0}),
+        ("GT", "Heated", 1, "city", 190, 100, {"night_ratio": 0.0, "rain_ratio": 0.5}),
+        ("Trail", "Advanced", 4, "mixed", 180, 75, {"road_state_ratio": 3.0, "wind_ratio": 1.7}),
+    ]
+
+    INPUTS = [
+        dict(temperature=20, wind_speed=10),
+        dict(temperature=4, wind_speed=50, rain=2.0, weather="fog", humidity=90, surface_water=6.0),
+        dict(temperature=12, wind_speed=30, sun_elevation=3, sun_azimuth=190, temp_rate=-2.0, temp_drop=4.0),
+        dict(temperature=-2, wind_speed=10),
+        dict(temperature=20, wind_speed=10, weather="hail"),
+    ]
+
+    @pytest.fixture
+    def profiles(self):
+        from bikersentinel.engine import RiderProfile
+
+        return [
+            RiderProfile.build(height, weight, bike, equipment, sensitivity, context, **ratios)
+            for bike, equipment, sensitivity, context, height, weight, ratios in self.PROFILES
+        ]
+
+    def test_matches_scalar_kernel(self):
+        """Every row of the vectorized pass equals evaluate() for that profile, on random data."""
+        import random
+        from bikersentinel.engine import evaluate
+        from bikersentinel.fleet import ProfileArrays, evaluate_fleet
+
+        rng = random.Random(18)
+        profiles = [random_profile(rng) for _ in range(200)]
+        arrays = ProfileArrays()
+        for index, profile in enumerate(profiles):
+            arrays.set(f"rider_{index}", profile)
+        for _ in range(300):
+            inputs = random_inputs(rng)
+            scores = evaluate_fleet(inputs, arrays)
+            for index, profile in enumerate(profiles):
+                expected = evaluate(inputs, profile)
+                result = scores.result(arrays.index(f"rider_{index}"))
+                assert result.score == expected.score
+                assert result.reasons == expected.reasons
+                assert result.categories == expected.categories
+
+    def test_profile_arrays_swap_remove(self, profiles):
+        """Removing a profile moves the last one into its row; columns follow."""
+        from bikersentinel.fleet import ProfileArrays
+
+        arrays = ProfileArrays()
+        for index, profile in enumerate(profiles):
+            arrays.set(f"rider_{index}", profile)
+        version = arrays.version
+        arrays.remove("rider_1")
+        assert arrays.keys == ["rider_0", "rider_3", "rider_2"]
+        assert arrays.index("rider_3") == 1
+        assert arrays.columns["coef"][1] == profiles[3].coef
+        assert arrays.version > version
+        arrays.set("rider_0", profiles[0])  # Unchanged profile: no rebuild
+        assert arrays.version == version + 1
+
+    def test_members_share_one_pass_and_subscription(self, profiles):
+        """A snapshot is ingested and scored once for the fleet; each entry reads its row."""
+        from bikersentinel import hub as hub_module
+        from bikersentinel.const import CONF_FLEET_MODE
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+        from bikersentinel.engine import evaluate
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.states.get.side_effect = {
+            "sensor.temp": MockState("8"),
+            "sensor.wind": MockState("40"),
+            "sensor.rain": MockState("0"),
+        }.get
+        coordinators = []
+        for index, (bike, equipment, sensitivity, context, height, weight, _) in enumerate(self.PROFILES):
+            entry = MagicMock()
+            entry.entry_id = f"rider_{index}"
+            entry.data = {
+                CONF_SENSOR_TEMP: "sensor.temp", CONF_SENSOR_WIND: "sensor.wind", CONF_SENSOR_RAIN: "sensor.rain",
+                CONF_BIKE_TYPE: bike, CONF_EQUIPMENT: equipment, CONF_SENSITIVITY: sensitivity,
+                CONF_RIDING_CONTEXT: context, CONF_HEIGHT: height, CONF_WEIGHT: weight, CONF_FLEET_MODE: True,
+            }
+            entry.options = {}
+            coordinators.append(BikerSentinelCoordinator(hass, entry))
+
+        fleet = coordinators[0]._fleet
+        assert all(coordinator._fleet is fleet for coordinator in coordinators)
+        with patch.object(hub_module, "async_track_state_change_event") as track:
+            for coordinator in coordinators:
+                coordinator.async_start()
+        assert [call.args[1] for call in track.call_args_list] == [["sensor.temp"], ["sensor.wind"], ["sensor.rain"]]
+
+        for coordinator in coordinators:
+            coordinator.async_refresh()
+        assert fleet.passes == 1
+        assert fleet.history.temperature._n == 1  # Ingested once for everyone
+        for coordinator in coordinators:
+            assert coordinator.data.score.score == pytest.approx(
+                evaluate(coordinator._inputs, coordinator.profile).score
+            )
+
+        for coordinator in coordinators:
+            coordinator.async_shutdown()
+        assert track.return_value.call_count == 3
+        assert hass.data["bikersentinel"]["fleets"] == {}
+
+    def test_fleet_samples_sun_once_per_tick(self, profiles):
+        """One sun tick reads one snapshot for the fleet, however late each member refreshes after it."""
+        from bikersentinel import fleet as fleet_module
+        from bikersentinel import hub as hub_module
+        from bikersentinel.const import CONF_FLEET_MODE
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+        from bikersentinel.engine import evaluate
+        from bikersentinel.sun import SunPosition
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.loop.time.return_value = 0.0
+        hass.states.get.side_effect = {
+            "sensor.temp": MockState("8"),
+            "sensor.wind": MockState("40"),
+            "sensor.rain": MockState("0"),
+        }.get
+        coordinators = []
+        for index in range(20):
+            entry = MagicMock()
+            entry.entry_id = f"rider_{index}"
+            entry.data = {
+                CONF_SENSOR_TEMP: "sensor.temp", CONF_SENSOR_WIND: "sensor.wind", CONF_SENSOR_RAIN: "sensor.rain",
+                CONF_FLEET_MODE: True,
+            }
+            entry.options = {}
+            coordinators.append(BikerSentinelCoordinator(hass, entry))
+            coordinators[-1].async_set_profile(profiles[index % len(profiles)])
+        fleet = coordinators[0]._fleet
+        # The sun moves between two reads: a member sampling it on its own would get a new snapshot
+        sun = fleet._sun = MagicMock()
+        sun.position.side_effect = lambda when: SunPosition(2.0 + sun.position.call_count, 180.0)
+
+        with patch.object(hub_module, "async_track_state_change_event"), \
+                patch.object(fleet_module, "async_track_time_interval") as tick, \
+                patch.object(fleet_module, "async_track_time_change"):
+            for coordinator in coordinators:
+                coordinator.async_start()
+        tick.assert_called_once()  # One sun timer for the fleet, none per member
+        passes, ingested = fleet.passes, fleet.history.temperature._n
+
+        tick.call_args.args[1](datetime.now())
+        assert all(coordinator._scheduler.requested == 1 for coordinator in coordinators)
+        for coordinator in coordinators:  # Each member refreshes at its own time after the tick
+            coordinator.async_refresh()
+        assert fleet.passes - passes == 1
+        assert fleet.history.temperature._n - ingested == 1
+        assert len({coordinator._inputs for coordinator in coordinators}) == 1
+        for coordinator in coordinators:
+            assert coordinator.data.score.score == evaluate(coordinator._inputs, coordinator.profile).score
+
+
+    def test_fleet_flag_from_options_and_one_history_file(self, event_loop):
+        """Options override the setup flag; members save the shared history to one fleet-level file."""
+        from unittest.mock import AsyncMock
+        from bikersentinel import coordinator as coordinator_module
+        from bikersentinel import fleet as fleet_module
+        from bikersentinel.const import CONF_FLEET_MODE
+        from bikersentinel.coordinator import BikerSentinelCoordinator
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.states.get.side_effect = {
+            "sensor.temp": MockState("8"),
+            "sensor.wind": MockState("40"),
+            "sensor.rain": MockState("0"),
+        }.get
+        sensors = {CONF_SENSOR_TEMP: "sensor.temp", CONF_SENSOR_WIND: "sensor.wind", CONF_SENSOR_RAIN: "sensor.rain"}
+
+        def make_entry(entry_id, data, options):
+            entry = MagicMock()
+            entry.entry_id = entry_id
+            entry.data = {**sensors, **data}
+            entry.options = options
+            return entry
+
+        with patch.object(fleet_module, "Store") as fleet_store, \
+                patch.object(coordinator_module, "Store") as entry_store:
+            fleet_store.return_value.async_load = AsyncMock(return_value=None)
+            entry_store.return_value.async_load = AsyncMock(return_value=None)
+            members = [
+                BikerSentinelCoordinator(hass, make_entry(f"rider_{index}", {}, {CONF_FLEET_MODE: True}))
+                for index in range(3)
+            ]
+            solo = BikerSentinelCoordinator(hass, make_entry("solo", {CONF_FLEET_MODE: True}, {CONF_FLEET_MODE: False}))
+            event_loop.run_until_complete(members[0].async_restore())
+            for coordinator in (*members, solo):
+                coordinator.async_refresh()
+
+        fleet = members[0]._fleet
+        assert solo._fleet is None
+        assert all(coordinator._fleet is fleet and coordinator._store is fleet.store for coordinator in members)
+        assert fleet_store.call_count == 1  # One file for the fleet, whatever the number of members
+        assert fleet_store.call_args.args[2].startswith("bikersentinel.fleet_")
+        assert fleet.store.async_delay_save.call_args.args[0] == fleet.history.as_dict
+        fleet.store.async_delay_save.assert_called_once()  # Saved by the fleet, not once per member
+        # Nothing saved for the fleet yet: the history a member saved on its own is restored
+        entry_store.return_value.async_load.assert_awaited_once()
+
+
+class TestSensorHub:
+    """Test the shared sensor subscription hub."""
+
+    @pytest.fixture
+    def hass(self):
+        hass = MagicMock()
+        hass.data = {}
+        hass.states.get.side_effect = {
+            "sensor.temp": MockState("68", {"unit_of_measurement": "°F"}),
+            "sensor.wind": MockState("10", {"unit_of_measurement": "mph"}),
+            "sensor.rain": MockState("unavailable"),
+            "weather.home": MockState("sunny", {"temperature": 50, "temperature_unit": "°F", "humidity": 40}),
+        }.get
+        return hass
+
+    def test_readings_are_normalized(self, hass):
+        """Numeric states and weather attributes are converted to °C, km/h and mm."""
+        from bikersentinel.hub import get_sensor_hub
+
+        hub = get_sensor_hub(hass)
+        assert hub.get("sensor.temp").value == pytest.approx(20.0)
+        assert hub.get("sensor.wind").value == pytest.approx(16.09344)
+        assert hub.get("sensor.rain").value is None
+        assert not hub.get("sensor.rain").available
+        assert hub.get("weather.home").attributes["temperature"] == pytest.approx(10.0)
+        assert hub.get("sensor.missing") is None
+
+    def test_one_subscription_and_parse_per_source(self, hass):
+        """Entries sharing a source share its subscription and its parsed reading."""
+        from bikersentinel import hub as hub_module
+
+        hub = hub_module.get_sensor_hub(hass)
+        first, second = MagicMock(), MagicMock()
+        with patch.object(hub_module, "async_track_state_change_event") as track:
+            release_first = hub.async_register("first", ["sensor.temp", "sensor.wind"], first)
+            release_second = hub.async_register("second", ["sensor.temp", "weather.home"], second)
+        assert hub.subscriptions == ["sensor.temp", "sensor.wind", "weather.home"]
+        assert track.call_count == 3
+
+        parsed = hub.parsed
+        event = MagicMock()
+        event.data = {"entity_id": "sensor.temp", "new_state": MockState("12")}
+        hub._handle_state_change(event)
+        assert hub.parsed == parsed + 1
+        first.assert_called_once_with(event)
+        second.assert_called_once_with(event)
+        assert hub.get("sensor.temp").value == 12.0
+        assert hub.parsed == parsed + 1  # Served from the reading
+
+        release_first()
+        assert hub.subscriptions == ["sensor.temp", "weather.home"]
+        release_second()
+        assert hub.subscriptions == []
+        assert track.return_value.call_count == 3
+
+
+class TestRideGroup:
+    """Test the club ride aggregate."""
+
+    def test_running_stats(self):
+        """Min, mean, count above threshold and limiting member follow each update."""
+        from bikersentinel.group import RideGroupStats
+
+        stats = RideGroupStats(threshold=4.0)
+        assert stats.minimum is None and stats.mean is None
+        stats.update("alice", 8.0)
+        stats.update("bob", 3.0)
+        stats.update("carol", None)  # Not scored yet
+        assert (stats.minimum, stats.limiting, stats.above, stats.count) == (3.0, "bob", 1, 2)
+        assert stats.mean == pytest.approx(5.5)
+
+        assert stats.update("bob", 9.0)
+        assert not stats.update("bob", 9.0)  # Unchanged
+        assert (stats.minimum, stats.limiting, stats.above) == (8.0, "alice", 2)
+        stats.update("carol", 2.0)
+        stats.remove("carol")
+        assert (stats.minimum, stats.limiting, stats.count) == (8.0, "alice", 2)
+        assert stats.mean == pytest.approx(8.5)
+
+    def test_many_members_stay_bounded(self):
+        """Hundreds of members updated many times: the heap is compacted, results stay exact."""
+        import random
+
+        from bikersentinel.group import RideGroupStats
+
+        rng = random.Random(7)
+        stats = RideGroupStats(threshold=5.0)
+        scores = {}
+        for _ in range(5000):
+            key = f"rider_{rng.randrange(150)}"
+            scores[key] = round(rng.uniform(0, 10), 1)
+            stats.update(key, scores[key])
+        assert len(stats._heap) <= 2 * len(scores) + 16
+        assert stats.minimum == min(scores.values())
+        assert stats.above == sum(score > 5.0 for score in scores.values())
+        assert stats.mean == pytest.approx(sum(scores.values()) / len(scores))
+
+    def test_follows_member_coordinators(self):
+        """Members attach whether they start before or after the group, and detach on unload."""
+        from bikersentinel.const import CONF_GROUP_MEMBERS, CONF_GROUP_THRESHOLD
+        from bikersentinel.coordinator import get_coordinators
+        from bikersentinel.engine import ScoreResult
+        from bikersentinel.group import RideGroupCoordinator
+
+        hass = MagicMock()
+        hass.data = {}
+
+        def member(entry_id, score):
+            coordinator = MagicMock()
+            coordinator.entry.entry_id = entry_id
+            coordinator.entry.title = f"BikerSentinel ({entry_id})"
+            coordinator.data.score = ScoreResult(score)
+            return coordinator
+
+        early, late, outsider = member("early", 7.0), member("late", 3.0), member("outsider", 0.0)
+        get_coordinators(hass).update(early=early, outsider=outsider)
+
+        entry = MagicMock()
+        entry.entry_id = "club"
+        entry.data = {CONF_GROUP_MEMBERS: ["early", "late"], CONF_GROUP_THRESHOLD: 5.0}
+        entry.options = {}
+        group = RideGroupCoordinator(hass, entry)
+        listener = MagicMock()
+        group.async_add_listener(listener)
+        group.async_start()
+        assert group.stats.minimum == 7.0
+
+        # A member starting later attaches itself
+        group.async_attach(late)
+        assert (group.stats.minimum, group.titles[group.stats.limiting]) == (3.0, "BikerSentinel (late)")
+        assert group.stats.above == 1
+
+        # Member refresh -> one incremental update through its listener
+        late.data.score = ScoreResult(6.0)
+        late.async_add_listener.call_args[0][0]()
+        assert (group.stats.minimum, group.stats.above) == (6.0, 2)
+
+        group.async_detach("late")
+        late.async_add_listener.return_value.assert_called_once()
+        assert group.stats.count == 1
+        group.async_shutdown()
+        assert hass.data["bikersentinel"]["groups"] == {}
+
+    def test_options_override_members_and_threshold(self, event_loop):
+        """Group options replace the members and threshold from setup; a change reloads the entry."""
+        from unittest.mock import AsyncMock
+        from bikersentinel import async_update_options
+        from bikersentinel.const import CONF_GROUP_MEMBERS, CONF_GROUP_THRESHOLD
+        from bikersentinel.group import RideGroupCoordinator
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.config_entries.async_reload = AsyncMock()
+        entry = MagicMock()
+        entry.entry_id = "club"
+        entry.data = {CONF_GROUP_MEMBERS: ["early", "late"], CONF_GROUP_THRESHOLD: 5.0}
+        entry.options = {CONF_GROUP_MEMBERS: ["late"], CONF_GROUP_THRESHOLD: 6.5}
+        group = RideGroupCoordinator(hass, entry)
+        assert (group.members, group.stats.threshold) == (["late"], 6.5)
+
+        entry.runtime_data = {"group": group}
+        event_loop.run_until_complete(async_update_options(hass, entry))
+        hass.config_entries.async_reload.assert_awaited_once_with("club")
+
+
+class TestEvaluateService:
+    """Test the bikersentinel.evaluate response service."""
+
+    ROWS = [
+        {"temperature": 20.0, "wind_speed": 10.0},
+        {"temperature": 8.0, "wind_speed": 45.0, "weather": "fog", "humidity": 90.0},
+        {"temperature": 20.0, "wind_speed": 10.0, "weather": "hail"},
+        {"temperature": 20.0, "wind_speed": 10.0},
+    ]
+
+    @pytest.fixture
+    def service(self):
+        from unittest.mock import AsyncMock
+        from bikersentinel.sensor import BikerSentinelConfigService
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
+        return BikerSentinelConfigService(hass)
+
+    def call(self, **data):
+        call = MagicMock()
+        call.data = data
+        return call
+
+    def run(self, event_loop, coroutine):
+        return event_loop.run_until_complete(coroutine)
+
+    def test_inline_profile_batch(self, service, event_loop):
+        """Every row is scored with its factor breakdown; identical rows are evaluated once."""
+        from bikersentinel import engine
+        from bikersentinel.engine import RiderProfile, ScoreInputs, evaluate
+
+        with patch.object(engine, "evaluate", wraps=engine.evaluate) as spy:
+            response = self.run(event_loop, service.async_handle_evaluate(
+                self.call(profile={CONF_BIKE_TYPE: "GT", "cold_ratio": 2.0}, rows=self.ROWS)
+            ))
+        assert spy.call_count == 3
+        service.hass.async_add_executor_job.assert_awaited_once()  # Scored off the event loop
+        results = response["results"]
+        assert len(results) == 4
+        profile = RiderProfile.build(DEFAULT_HEIGHT_CM, DEFAULT_WEIGHT_KG, "GT", DEFAULT_EQUIPMENT,
+                                     DEFAULT_SENSITIVITY, DEFAULT_RIDING_CONTEXT, cold_ratio=2.0)
+        expected = evaluate(ScoreInputs(**self.ROWS[1]), profile)
+        assert results[1]["score"] == expected.score
+        assert [factor["label"] for factor in results[1]["factors"]] == [factor.label for factor in expected.factors]
+        assert results[2]["veto"] == "Dangerous Weather"
+        assert results[2]["status"] == "dangerous"
+        assert results[0] == results[3]
+
+    def test_entry_profile_uses_live_coordinator(self, service, event_loop):
+        """An entry id scores with the running coordinator profile; unknown ids are rejected."""
+        from homeassistant.exceptions import ServiceValidationError
+        from bikersentinel.engine import RiderProfile
+
+        entry = MagicMock()
+        entry.domain = "bikersentinel"
+        entry.data = {}
+        entry.runtime_data = {"coordinator": MagicMock(profile=RiderProfile(cold_ratio=0.0))}
+        service.hass.config_entries.async_get_entry.side_effect = {"rider": entry}.get
+
+        response = self.run(event_loop, service.async_handle_evaluate(
+            self.call(entry_id="rider", rows=[{"temperature": 2.0, "wind_speed": 30.0}])
+        ))
+        assert response["entry_id"] == "rider"
+        assert response["results"][0]["score"] == 10.0  # Cold ignored by the live ratios
+
+        with pytest.raises(ServiceValidationError):
+            self.run(event_loop, service.async_handle_evaluate(self.call(entry_id="missing", rows=self.ROWS)))
+
+
+class TestBacktest:
+    """Test the backtest replay and the bikersentinel.backtest service."""
+
+    SOURCES = {"temperature": "sensor.temp", "wind": "sensor.wind", "rain": "sensor.rain", "weather": "weather.home"}
+    START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+    def reading(self, entity_id, state, **attributes):
+        from bikersentinel.hub import SensorReading
+
+        return SensorReading.from_state(entity_id, MockState(state, attributes))
+
+    def test_summary_hours_and_vetoes(self):
+        """Ticks are scored with the readings known at the time and summarized in hours."""
+        from bikersentinel.backtest import Backtest
+        from bikersentinel.engine import RiderProfile
+
+        backtest = Backtest(RiderProfile(), self.SOURCES, self.START, timedelta(hours=1))
+        at = lambda hours: self.START + timedelta(hours=hours)
+        backtest.feed(at(0.5), self.reading("sensor.temp", "20"))
+        backtest.feed(at(0.5), self.reading("sensor.wind", "5"))
+        backtest.feed(at(0.5), self.reading("sensor.rain", "0"))
+        backtest.feed(at(4.5), self.reading("weather.home", "hail"))
+        backtest.feed(at(6.5), self.reading("weather.home", "sunny"))
+        backtest.advance(at(10))
+
+        summary = backtest.summary.as_dict()
+        assert summary["skipped"] == 1  # 00:00, before any temperature
+        assert summary["samples"] == 9
+        assert summary["hours"] == 9.0
+        assert summary["vetoes"] == {"Dangerous Weather": 2}  # 05:00 and 06:00
+        assert summary["veto_hours"] == {"Dangerous Weather": 2.0}
+        assert summary["rideable_hours"] == 7.0
+        assert summary["min"] == 0.0
+        assert summary["max"] == 10.0
+        assert summary["distribution"]["10-11"] == 7.0
+        assert summary["status_hours"]["dangerous"] == 2.0
+
+    def test_rain_wets_the_road_until_it_dries(self):
+        """Past rain goes through the road model, so later ticks still see a wet road."""
+        from bikersentinel.backtest import Backtest
+        from bikersentinel.engine import RiderProfile
+
+        backtest = Backtest(RiderProfile(), self.SOURCES, self.START, timedelta(minutes=30))
+        at = lambda hours: self.START + timedelta(hours=hours)
+        backtest.feed(at(0), self.reading("sensor.temp", "20"))
+        backtest.feed(at(0), self.reading("sensor.wind", "5"))
+        backtest.feed(at(0), self.reading("sensor.rain", "4"))
+        backtest.feed(at(1), self.reading("sensor.rain", "0"))
+        backtest.advance(at(1.5))
+        assert backtest.history.surface.water > 0.5
+        assert backtest.summary.rideable_hours == 1.5
+        assert backtest.summary.maximum < 10.0  # Raining, then a wet road
+
+    def test_service_pages_the_recorder(self, event_loop):
+        """The period is read one page at a time in the recorder executor, then summarized."""
+        import sys
+        from bikersentinel.const import BACKTEST_PAGE_HOURS
+        from bikersentinel.engine import RiderProfile
+        from bikersentinel.sensor import BikerSentinelConfigService
+
+        pages = []
+
+        def significant_states(hass, start, end, entity_ids, **kwargs):
+            pages.append((start, end, kwargs["include_start_time_state"]))
+            if kwargs["include_start_time_state"]:
+                return {
+                    "sensor.temp": [MockState("18", last_updated=start)],
+                    "sensor.wind": [MockState("10", last_updated=start)],
+                    "sensor.rain": [MockState("0", last_updated=start)],
+                }
+            return {"sensor.temp": [MockState("unavailable", last_updated=start + timedelta(hours=1))]}
+
+        recorder = MagicMock()
+        recorder.history.get_significant_states.side_effect = significant_states
+
+        async def run_in_executor(func, *args):
+            return func(*args)
+
+        recorder.get_instance.return_value.async_add_executor_job = run_in_executor
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.config.latitude = None
+        entry = MagicMock()
+        entry.domain = "bikersentinel"
+        entry.data = {CONF_SENSOR_TEMP: "sensor.temp", CONF_SENSOR_WIND: "sensor.wind", CONF_SENSOR_RAIN: "sensor.rain"}
+        entry.runtime_data = {"coordinator": MagicMock(profile=RiderProfile())}
+        hass.config_entries.async_get_entry.side_effect = {"rider": entry}.get
+        service = BikerSentinelConfigService(hass)
+        call = MagicMock()
+        call.data = {"entry_id": "rider", "start": "2026-03-01T00:00:00+00:00", "end": "2026-03-04T00:00:00+00:00",
+                     "step_minutes": 60, "threshold": 4.0}
+
+        with patch.dict(sys.modules, {"homeassistant.components.recorder": recorder}):
+            response = event_loop.run_until_complete(service.async_handle_backtest(call))
+
+        assert len(pages) == 72 // BACKTEST_PAGE_HOURS
+        assert [first for _, _, first in pages] == [True] + [False] * (len(pages) - 1)
+        assert all(end - start == timedelta(hours=BACKTEST_PAGE_HOURS) for start, end, _ in pages)
+        assert response["entry_id"] == "rider"
+        assert response["samples"] == 72
+        assert response["rideable_hours"] == 72.0  # Unavailable readings keep the last value
+
+    def test_service_rejects_bad_periods(self, event_loop):
+        """Reversed or unparsable periods are rejected before touching the recorder."""
+        from homeassistant.exceptions import ServiceValidationError
+        from bikersentinel.engine import RiderProfile
+        from bikersentinel.sensor import BikerSentinelConfigService
+
+        hass = MagicMock()
+        hass.data = {}
+        entry = MagicMock()
+        entry.domain = "bikersentinel"
+        entry.data = {}
+        entry.runtime_data = {"coordinator": MagicMock(profile=RiderProfile())}
+        hass.config_entries.async_get_entry.side_effect = {"rider": entry}.get
+        service = BikerSentinelConfigService(hass)
+        for start, end in (("2026-03-02", "2026-03-01"), ("yesterday", None), ("2020-01-01", "2026-01-01")):
+            call = MagicMock()
+            call.data = {"entry_id": "rider", "start": start, "end": end, "step_minutes": 60, "threshold": 4.0}
+            with pytest.raises(ServiceValidationError):
+                event_loop.run_until_complete(service.async_handle_backtest(call))
+
+
+class TestRatioSweep:
+    """Test the vectorized ratio sweep and the bikersentinel.sweep service."""
+
+    ROWS = [
+        {"temperature": 20.0, "wind_speed": 10.0},
+        {"temperature": 6.0, "wind_speed": 50.0, "rain": 1.2, "weather": "fog", "humidity": 90.0},
+        {"temperature": 12.0, "wind_speed": 20.0, "sun_elevation": -10.0, "surface_water": 0.6, "temp_rate": -5.0},
+        {"temperature": 20.0, "wind_speed": 10.0, "weather": "hail"},
+        {"temperature": 25.0, "wind_speed": 5.0, "sun_elevation": 8.0, "sun_azimuth": 95.0},
+    ]
+
+    @pytest.fixture
+    def rows(self):
+        from bikersentinel.engine import ScoreInputs
+
+        return [ScoreInputs(**row) for row in self.ROWS]
+
+    def test_matches_the_kernel(self):
+        """Every cell of the score matrix equals evaluate() with that ratio vector, on random data."""
+        import random
+        from bikersentinel.engine import evaluate
+        from bikersentinel.sweep import RATIO_NAMES, ratio_grid, sweep
+
+        rng = random.Random(23)
+        for _ in range(20):
+            profile = random_profile(rng)
+            rows = [random_inputs(rng) for _ in range(150)]
+            grid = {name: [round(rng.uniform(0.0, 3.0), 2) for _ in range(rng.randint(1, 2))] for name in RATIO_NAMES}
+            ratios = ratio_grid(grid, profile)
+            result = sweep(rows, ratios, profile, weights=0.5, keep_scores=True)
+            for index in range(len(ratios)):
+                vector_profile = result.profile(index, profile)
+                expected = [evaluate(row, vector_profile).score for row in rows]
+                assert result.scores[index].tolist() == expected
+                assert result.rideable_hours[index] == 0.5 * sum(score > 4.0 for score in expected)
+                assert result.mean[index] == pytest.approx(sum(expected) / len(expected))
+            assert result.hours == 75.0
+
+    def test_vectors_and_chunking(self, rows):
+        """Explicit vectors give the same results whatever the block size."""
+        import bikersentinel.sweep as sweep_module
+        from bikersentinel.engine import RiderProfile
+        from bikersentinel.sweep import ratio_vectors, sweep
+
+        profile = RiderProfile()
+        ratios = ratio_vectors([{}, {"cold_ratio": 0.0}, {"rain_ratio": 3.0, "fog_ratio": 0.0}], profile)
+        assert ratios[0].tolist() == [1.0] * 9
+        reference = sweep(rows, ratios, profile, keep_scores=True)
+        with patch.object(sweep_module, "SWEEP_CHUNK_CELLS", 1):
+            chunked = sweep(rows, ratios, profile, keep_scores=True)
+        assert chunked.scores.tolist() == reference.scores.tolist()
+        assert reference.scores[:, 3].tolist() == [0.0, 0.0, 0.0]  # Vetoed whatever the ratios
+        assert reference.rideable_hours[1] >= reference.rideable_hours[0]
+
+    def test_service_grid_over_rows(self, event_loop):
+        """The service scores the grid off the event loop and points at the best vector."""
+        from bikersentinel.sensor import BikerSentinelConfigService
+
+        hass = MagicMock()
+        hass.data = {}
+
+        async def run_in_executor(func, *args):
+            return func(*args)
+
+        hass.async_add_executor_job = run_in_executor
+        service = BikerSentinelConfigService(hass)
+        call = MagicMock()
+        call.data = {
+            "profile": {},
+            "grid": {"cold_ratio": [2.0, 0.0], "rain_ratio": [1.0, 0.0]},
+            "rows": [{"temperature": 5.0, "wind_speed": 20.0}, {"temperature": 18.0, "wind_speed": 5.0, "rain": 2.0}],
+            "step_minutes": 30,
+            "threshold": 8.0,
+            "include_scores": True,
+        }
+        response = event_loop.run_until_complete(service.async_handle_sweep(call))
+        assert response["samples"] == 2
+        assert response["hours"] == 1.0
+        assert len(response["vectors"]) == 4
+        best = response["vectors"][response["best"]]
+        assert best["ratios"]["cold_ratio"] == 0.0 and best["ratios"]["rain_ratio"] == 0.0
+        assert best["rideable_hours"] == 1.0
+        assert best["scores"] == [10.0, 10.0]
+
+    def test_service_rejects_oversized_grid_before_building_it(self, event_loop):
+        """A grid over SWEEP_MAX_VECTORS is refused from its size alone."""
+        from homeassistant.exceptions import ServiceValidationError
+        from bikersentinel.sensor import BikerSentinelConfigService
+        from bikersentinel.sweep import RATIO_NAMES
+
+        hass = MagicMock()
+        hass.data = {}
+        service = BikerSentinelConfigService(hass)
+        call = MagicMock()
+        call.data = {
+            "profile": {},
+            "grid": {name: [float(value) for value in range(10)] for name in RATIO_NAMES},  # 10**9 vectors
+            "rows": [{"temperature": 5.0, "wind_speed": 20.0}],
+            "step_minutes": 30,
+            "threshold": 4.0,
+        }
+        with patch("bikersentinel.sensor.ratio_grid") as ratio_grid:
+            with pytest.raises(ServiceValidationError, match="1000000000 ratio vectors"):
+                event_loop.run_until_complete(service.async_handle_sweep(call))
+        ratio_grid.assert_not_called()
+
+
+class TestBulkRatioUpdate:
+    """Test set_malus_ratios on several entries at once."""
+
+    @pytest.fixture
+    def service(self):
+        from bikersentinel.sensor import BikerSentinelConfigService
+
+        hass = MagicMock()
+        hass.data = {}
+        entries = []
+        for entry_id, bike_type in (("a", "GT"), ("b", "Trail"), ("c", "GT")):
+            entry = MagicMock()
+            entry.entry_id = entry_id
+            entry.data = {CONF_BIKE_TYPE: bike_type}
+            entry.options = {CONF_RAIN_RATIO: 1.5}
+            entries.append(entry)
+        group = MagicMock()
+        group.entry_id = "group"
+        group.data = {"group_members": ["a", "b"]}
+        entries.append(group)
+        hass.config_entries.async_entries.return_value = entries
+        return BikerSentinelConfigService(hass)
+
+    def updated(self, service):
+        return {
+            call.args[0].entry_id: call.kwargs["options"]
+            for call in service.hass.config_entries.async_update_entry.call_args_list
+        }
+
+    def run(self, event_loop, service, **data):
+        call = MagicMock()
+        call.data = data
+        event_loop.run_until_complete(service.async_handle_set_malus_ratios(call))
+
+    def test_entry_ids(self, service, event_loop):
+        """Listed entries are looked up in one pass and each updated once."""
+        self.run(event_loop, service, entry_ids=["a", "b", "a"], cold_ratio=0.5)
+        service.hass.config_entries.async_entries.assert_called_once()
+        assert self.updated(service) == {
+            "a": {CONF_RAIN_RATIO: 1.5, CONF_COLD_RATIO: 0.5},
+            "b": {CONF_RAIN_RATIO: 1.5, CONF_COLD_RATIO: 0.5},
+        }
+        assert service.hass.config_entries.async_update_entry.call_count == 2
+
+    def test_bike_type_selector(self, service, event_loop):
+        """A bike type selects every rider entry of that type, never a group."""
+        self.run(event_loop, service, bike_type="GT", wind_ratio=2.0)
+        assert set(self.updated(service)) == {"a", "c"}
+
+    def test_unknown_entry_updates_nothing(self, service, event_loop):
+        """One unknown id rejects the whole call."""
+        self.run(event_loop, service, entry_ids=["a", "missing"], wind_ratio=2.0)
+        service.hass.config_entries.async_update_entry.assert_not_called()
+        self.run(event_loop, service, entry_id="group", wind_ratio=2.0)
+        service.hass.config_entries.async_update_entry.assert_not_called()